@@ -0,0 +1,248 @@
+import json, threading
+from multiprocessing.managers import BaseManager
+from time import monotonic, sleep
+
+STRATEGIES = ("round_robin", "least_loaded")
+# Name of the single account of an old-style accounts.json
+DEFAULT_ACCOUNT = "default"
+
+
+def load_accounts(path="accounts.json") -> list:
+    """
+    Reads the accounts of an accounts.json file.
+
+    The file holds either a single account (the original format) or a list of accounts:
+    {"accounts": [{"name": "a", "testmail": ..., "testpassword": ..., "canvaimage": ..., "canvavideo": ...,
+                   "max_concurrency": 2, "rate_limit": 30}, ...]}
+
+    'max_concurrency' (jobs running at once) and 'rate_limit' (jobs per minute) are optional.
+    'canvaimage' and 'canvavideo' may hold a list of designs, one per tab of a TabPool.
+
+    Returns:
+    - list: Account dictionaries, each with a unique 'name'.
+    """
+    with open(path, "r") as file:
+        data = json.load(file)
+
+    if "accounts" not in data:
+        return [dict(data, name=data.get("name", DEFAULT_ACCOUNT))]
+
+    accounts = []
+    for index, account in enumerate(data["accounts"], 1):
+        accounts.append(dict(account, name=account.get("name") or "account{}".format(index)))
+    names = [account["name"] for account in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("Account names in {} are not unique".format(path))
+    return accounts
+
+
+class AccountScheduler:
+    def __init__(self, accounts, strategy="round_robin", max_concurrency=None, rate_limit=None) -> None:
+        """
+        AccountScheduler assigns bots to Canva accounts, so parallel workers spread over several
+        accounts instead of colliding on one.
+
+        Every account has a concurrency limit (slots held at once) and a rate limit (jobs per minute),
+        taken from the account ('max_concurrency', 'rate_limit') or the scheduler defaults. Accounts whose
+        login fails are taken out of rotation with mark_failed.
+
+        Use shared_scheduler to share one scheduler between the worker processes of JobRunner.
+
+        Args:
+        - accounts: Account dictionaries as returned by load_accounts.
+        - strategy: "round_robin" cycles through the accounts, "least_loaded" picks the account with the fewest slots held.
+        - max_concurrency: Default number of slots per account, unlimited if None.
+        - rate_limit: Default number of jobs per minute and account, unlimited if None.
+
+        Example:
+        >>> scheduler = AccountScheduler(load_accounts(), strategy="least_loaded", max_concurrency=2)
+        >>> account = scheduler.acquire()
+        >>> bot = CanvaImage(account=account)
+        >>> scheduler.throttle(account["name"])
+        >>> bot.change_text("New Text Content")
+        >>> scheduler.release(account["name"])
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("Unknown strategy {}, use one of {}".format(strategy, ", ".join(STRATEGIES)))
+        if not accounts:
+            raise ValueError("No accounts to schedule")
+        self.strategy = strategy
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self._accounts = {account["name"]: account for account in accounts}
+        self._order = [account["name"] for account in accounts]
+        self._state = {name: {"active": 0, "acquired": 0, "failures": 0, "failed_until": None, "next_slot": 0.0} for name in self._order}
+        # Slots held per holder, e.g. per worker process, so the slots of a dead holder can be freed
+        self._holders = {}
+        self._cursor = 0
+        self._condition = threading.Condition()
+
+    def _limit(self, name):
+        return self._accounts[name].get("max_concurrency", self.max_concurrency)
+
+    def _in_rotation(self, name, now) -> bool:
+        failed_until = self._state[name]["failed_until"]
+        return failed_until is None or failed_until <= now
+
+    def _free(self, name, now) -> bool:
+        limit = self._limit(name)
+        return self._in_rotation(name, now) and (limit is None or self._state[name]["active"] < limit)
+
+    def _pick(self, now):
+        candidates = []
+        for i in range(len(self._order)):
+            name = self._order[(self._cursor + i) % len(self._order)]
+            if self._free(name, now):
+                candidates.append(name)
+        if not candidates:
+            return None
+
+        if self.strategy == "least_loaded":
+            # Load relative to the limit, ties keep the round robin order
+            def load(name):
+                limit = self._limit(name)
+                return self._state[name]["active"] / limit if limit else self._state[name]["active"]
+            name = min(candidates, key=load)
+        else:
+            name = candidates[0]
+        self._cursor = (self._order.index(name) + 1) % len(self._order)
+        return name
+
+    def acquire(self, timeout=None, name=None, holder=None) -> dict:
+        """
+        Reserves a slot on an account and returns the account. Blocks while every account is at its concurrency limit.
+
+        Args:
+        - timeout: Seconds to wait for a free slot, forever if None.
+        - name: Reserve a slot on this account only, e.g. the account a bot is already logged in with.
+        - holder: Identifies who holds the slot, e.g. a worker pid, so release_holder can free it if the holder dies.
+
+        Raises:
+        - TimeoutError: Raised if no account has a free slot within 'timeout' seconds.
+        - RuntimeError: Raised if every account, or the account 'name', is permanently out of rotation.
+        """
+        account = name
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            while True:
+                now = monotonic()
+                if account is None:
+                    name = self._pick(now)
+                else:
+                    name = account if self._free(account, now) else None
+                if name is not None:
+                    self._state[name]["active"] += 1
+                    self._state[name]["acquired"] += 1
+                    if holder is not None:
+                        held = self._holders.setdefault(holder, {})
+                        held[name] = held.get(name, 0) + 1
+                    return dict(self._accounts[name])
+
+                if account is not None and self._state[account]["failed_until"] == float("inf"):
+                    raise RuntimeError("Account {} is out of rotation".format(account))
+                cooldowns = [state["failed_until"] for state in self._state.values() if state["failed_until"] is not None]
+                if len(cooldowns) == len(self._order) and all(until == float("inf") for until in cooldowns):
+                    raise RuntimeError("Every account is out of rotation")
+
+                # Wake up for released slots, and for accounts coming back from a cooldown
+                wait = min([until - now for until in cooldowns if now < until < float("inf")], default=None)
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("No account slot became free within {} seconds".format(timeout))
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+
+    def release(self, name, holder=None) -> None:
+        """
+        Frees a slot reserved by acquire, with the same 'holder' it was acquired with.
+        """
+        with self._condition:
+            held = self._holders.get(holder, {})
+            if name in held:
+                held[name] -= 1
+                if not held[name]:
+                    del held[name]
+                if not held:
+                    del self._holders[holder]
+            self._state[name]["active"] = max(0, self._state[name]["active"] - 1)
+            self._condition.notify_all()
+
+    def release_holder(self, holder) -> int:
+        """
+        Frees every slot still held by 'holder', e.g. a worker process that was killed during a job, and returns their number.
+        """
+        with self._condition:
+            held = self._holders.pop(holder, {})
+            for name, count in held.items():
+                self._state[name]["active"] = max(0, self._state[name]["active"] - count)
+            self._condition.notify_all()
+            return sum(held.values())
+
+    def throttle(self, name) -> float:
+        """
+        Blocks until the rate limit of the account allows the next job and returns the seconds waited.
+        """
+        rate = self._accounts[name].get("rate_limit", self.rate_limit)
+        if not rate:
+            return 0.0
+        with self._condition:
+            # Reserve the next free start time, jobs of one account start at least 60 / rate seconds apart
+            now = monotonic()
+            slot = max(now, self._state[name]["next_slot"])
+            self._state[name]["next_slot"] = slot + 60.0 / rate
+        if slot > now:
+            sleep(slot - now)
+        return slot - now
+
+    def mark_failed(self, name, cooldown=None) -> None:
+        """
+        Takes an account out of rotation after a failed login, for 'cooldown' seconds or until restore is called.
+        """
+        with self._condition:
+            state = self._state[name]
+            state["failures"] += 1
+            state["failed_until"] = float("inf") if cooldown is None else monotonic() + cooldown
+            self._condition.notify_all()
+        print("Account {} taken out of rotation".format(name))
+
+    def restore(self, name) -> None:
+        """
+        Puts an account taken out by mark_failed back into rotation.
+        """
+        with self._condition:
+            self._state[name]["failed_until"] = None
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Returns per account: slots held ('active'), slots handed out ('acquired'), 'failures' and whether it is 'in_rotation'.
+        """
+        with self._condition:
+            now = monotonic()
+            return {
+                name: {
+                    "active": state["active"],
+                    "acquired": state["acquired"],
+                    "failures": state["failures"],
+                    "in_rotation": self._in_rotation(name, now),
+                }
+                for name, state in self._state.items()
+            }
+
+
+class _SchedulerManager(BaseManager):
+    pass
+
+
+_SchedulerManager.register("AccountScheduler", AccountScheduler)
+
+
+def shared_scheduler(accounts, **kwargs):
+    """
+    Starts an AccountScheduler in a manager process and returns (manager, proxy). The proxy can be passed
+    to worker processes, which then share its slots and rate limits. Call manager.shutdown() when done.
+    """
+    manager = _SchedulerManager()
+    manager.start()
+    return manager, manager.AccountScheduler(accounts, **kwargs)
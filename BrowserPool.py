@@ -0,0 +1,123 @@
+import queue, threading
+from contextlib import contextmanager
+
+
+class BrowserPool:
+    def __init__(self, bot_class, size=2, **bot_kwargs) -> None:
+        """
+        BrowserPool keeps 'size' logged-in CanvaImage or CanvaVideo instances parked on their design,
+        so the cost of starting Chrome, logging in and loading the editor is paid once per bot instead of once per job.
+
+        Args:
+        - bot_class: CanvaImage, CanvaVideo or another CanvaBot subclass.
+        - size: Number of bots kept in the pool.
+        - bot_kwargs: Keyword arguments passed to 'bot_class'.
+
+        Leased bots are health checked and reset to the starting state when they are returned.
+        Bots that fail the check are closed and replaced on the next lease.
+
+        Example:
+        >>> pool = BrowserPool(CanvaImage, size=2)
+        >>> with pool.leased() as bot:
+        ...     bot.change_text("New Text Content")
+        ...     result = bot.change_photo("path/to/image.jpg")
+        >>> pool.close()
+        """
+        self.bot_class = bot_class
+        self.bot_kwargs = bot_kwargs
+        self.size = size
+        self._idle = queue.Queue()
+        self._leased = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Bots are started one after another, undetected_chromedriver patches a shared driver binary
+        for _ in range(size):
+            self._idle.put(self._new_bot())
+
+    def _new_bot(self):
+        """
+        Starts a new bot, returns None if the start failed so the slot is retried on the next lease.
+        """
+        try:
+            return self.bot_class(**self.bot_kwargs)
+        except Exception as e:
+            print(e)
+            return None
+
+    def lease(self, timeout=None):
+        """
+        Takes a ready bot out of the pool, waiting up to 'timeout' seconds for one to be returned.
+
+        Returns:
+        - A logged-in bot parked on its design.
+
+        Raises:
+        - queue.Empty: Raised if no bot is returned within 'timeout'.
+        - RuntimeError: Raised if the pool is closed or a replacement bot can not be started.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+
+        bot = self._idle.get(timeout=timeout)
+        if bot is None:
+            bot = self._new_bot()
+            if bot is None:
+                self._idle.put(None)
+                raise RuntimeError("Failed to start a replacement bot")
+
+        with self._lock:
+            self._leased.add(bot)
+        return bot
+
+    def release(self, bot) -> None:
+        """
+        Returns a leased bot to the pool after a health check and a reset to its starting state.
+        A bot failing either is closed and its slot is refilled on the next lease.
+        """
+        with self._lock:
+            self._leased.discard(bot)
+
+        if not self._closed and bot.is_healthy() and bot.reset():
+            self._idle.put(bot)
+            return
+
+        self._close_bot(bot)
+        if not self._closed:
+            self._idle.put(None)
+
+    @contextmanager
+    def leased(self, timeout=None):
+        """
+        Context manager leasing a bot and returning it to the pool on exit.
+        """
+        bot = self.lease(timeout)
+        try:
+            yield bot
+        finally:
+            self.release(bot)
+
+    def _close_bot(self, bot) -> None:
+        try:
+            bot.Close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """
+        Closes every idle bot. Bots still leased are closed when they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                bot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if bot is not None:
+                self._close_bot(bot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
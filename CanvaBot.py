@@ -1,61 +1,218 @@
 import undetected_chromedriver as uc
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import ElementNotVisibleException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver import Keys, ActionChains
-from bs4 import BeautifulSoup
 from selenium.webdriver.common.actions.action_builder import ActionBuilder
-import sys, shutil, json, os
-from time import sleep
+import sys, shutil, json, os, threading
+from contextlib import contextmanager
+from functools import partial
+from time import time
+import Waits
+from DomQuery import query
+from DownloadManager import DownloadManager
+from MediaValidator import validate_media, MediaValidationError
+from MediaPreprocess import MediaPreprocessor
+from AccountScheduler import load_accounts, DEFAULT_ACCOUNT
+from ResultCache import ResultCache
+from Recovery import Checkpoints, DEFAULT_POLICY, RETRY, RELOAD
+import Instrumentation
+from Instrumentation import traced
+
+# Reads the labelled inputs of the position panel and the element height input in one round trip
+_GEOMETRY_SCRIPT = """
+const fields = {};
+for (const row of document.querySelectorAll('div.x6XCCg')) {
+    const label = row.querySelector('span');
+    const input = row.querySelector('input');
+    if (label && input) fields[label.innerText.trim()] = {id: input.id, value: input.value};
+}
+const height = document.querySelector('div.Wrk03w.c7zhBg.HMkvaQ input');
+return {fields: fields, height: height ? height.value : null};
+"""
+
+class LoginError(RuntimeError):
+    """
+    Raised when Google Sign-In rejects the credentials of the account, as opposed to a browser or network failure.
+    """
+
 
 class CanvaBot:
-    def __init__(self, headless=True) -> None:
+    def __init__(self, headless=True, session_file="session.json", timeouts=None, download_dir=None, tracer=None, login_hook=None, design_url=None, preprocess=None, account=None, browser=None, cache=None, recovery=None) -> None:
         """
         CanvaBot class automates login to canva.com by opening a new browser window,
         navigating to canva.com/login, and performing Google Sign-In using preconfigured account details.
         
+        Cookies and local storage of a successful login are saved to 'session_file' and restored
+        by later instances, so the Google Sign-In flow only runs when the saved session has expired.
+        Pass session_file=None to always perform a full login.
+        
+        Every UI step waits for a named readiness condition instead of sleeping. 'timeouts' overrides
+        the timeout in seconds of individual steps, see Waits.DEFAULT_TIMEOUTS for the step names.
+        
+        Downloads go to 'download_dir', by default a new directory under "downloads/" per instance,
+        so several bots on one host never overwrite each other's files.
+        
+        Driver start, login, editor load and every editor operation are recorded as spans of 'tracer',
+        by default the shared Instrumentation.tracer (see Instrumentation.Tracer).
+        
+        'login_hook' replaces the Canva login: it is called with the bot once the browser is started,
+        e.g. to inject a test session or to skip login against a local mock editor (see benchmark/bench.py).
+        'design_url' overrides the design URL from "accounts.json" that subclasses open.
+        
+        'account' is the account to log in with, as returned by AccountScheduler.load_accounts or
+        AccountScheduler.acquire. By default the first account of "accounts.json" is used. Accounts other than
+        the default one save their session to "session_<name>.json".
+        
+        With 'preprocess' (a MediaPreprocess.MediaPreprocessor, or True for the default one) media is shrunk
+        to the design size ('media_size') before it is uploaded.
+        
+        With 'cache' (a ResultCache.ResultCache, its file path, or True for the default one) renders are looked up
+        before the browser is touched, and a render repeating an earlier one returns the stored result.
+        
+        With 'browser' (a TabPool.TabBrowser) the bot opens a tab in that already logged-in browser instead of
+        starting Chrome and logging in. It shares the account, downloads and by default the tracer of the browser,
+        and Close only closes its tab. See TabPool for running several tabs at once.
+        
+        Editor operations run as checkpointed steps. A failing step is retried, then retried after an editor reload,
+        and only then after a browser restart, as 'recovery' (a Recovery.RecoveryPolicy) allows. An operation that
+        still fails keeps the bot usable, and running it again with the same arguments resumes after its last completed step.
+        
         Attributes:
-        - acc_dict (dict): Dictionary containing account information loaded from the "accounts.json" file.
+        - acc_dict (dict): Dictionary containing account information, 'account' or the first account of the "accounts.json" file.
         - continuewithgoogle (str): XPath for the "Continue with Google" button.
         - googletitle (str): Expected title for the Google Sign-In page.
         - option (webdriver.ChromeOptions): Chrome options for configuring the Chrome webdriver.
         - driver (webdriver.Chrome): Chrome webdriver instance.
+        - session_file (str): Path of the JSON file holding the saved login session.
+        - timeouts (dict): Timeout in seconds of every named wait step.
+        - downloads (DownloadManager): Download directory of the browser and completion detection.
+        - tracer (Instrumentation.Tracer): Records durations, WebDriver command counts and outcomes of the bot steps.
+        - design_url (str): Design opened instead of the one in "accounts.json", None to use the account's design.
+        - preprocess (MediaPreprocessor): Shrinks media before upload, None to upload the original files.
+        - media_size (tuple): Width and height in px media is shrunk to, set by the subclasses.
+        - browser (TabBrowser): Shared browser the bot runs in as a tab, None if it owns its browser.
+        - cache (ResultCache): Results of earlier renders, None to always render.
+        - recovery (RecoveryPolicy): How failed steps are recovered, Recovery.DEFAULT_POLICY by default.
         
         Usage:
         - Create an instance of CanvaBot to initiate the automated login process on canva.com.
         
         Raises:
         - AssertionError: Raised if there are issues in opening a new window or connecting to Google.
+        - LoginError: Raised if Google Sign-In rejects the account's credentials. Other sign-in failures raise other exceptions.
         - Exception: Raised for any unexpected errors during initialization.
         
         Example:
         >>> bot = CanvaBot()
         """
-        # Load account information from the JSON file
-        with open("accounts.json", "r") as account:
-            self.acc_dict = json.load(account)
+        # Tabs use the account the shared browser is logged in with
+        self.browser = browser
+        if browser is not None:
+            account = browser.bot.acc_dict
+
+        # Load account information from the JSON file, a login hook does not need it
+        if account is not None:
+            self.acc_dict = account
+        elif login_hook is None or os.path.exists("accounts.json"):
+            self.acc_dict = load_accounts("accounts.json")[0]
+        else:
+            self.acc_dict = {}
+
+        # Every account keeps its own saved session
+        name = self.acc_dict.get("name", DEFAULT_ACCOUNT)
+        if session_file == "session.json" and name != DEFAULT_ACCOUNT:
+            session_file = "session_{}.json".format(name)
+        self.login_hook = login_hook
+        self.design_url = design_url
+        self.preprocess = MediaPreprocessor() if preprocess is True else preprocess
+        if cache is True:
+            cache = ResultCache()
+        elif isinstance(cache, str):
+            cache = ResultCache(cache)
+        self.cache = cache
+        # Text last set on the design, part of the cache key of renders
+        self._last_text = None
+        self.recovery = recovery or DEFAULT_POLICY
+        # Checkpoints of failed operations by name, and the operation running in the current thread
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._local = threading.local()
 
         # XPath for "Continue with Google" button and Google Sign-In page title
         self.continuewithgoogle = "//*[text()='Continue with Google']"
         self.googletitle = "Sign in - Google Accounts"
 
         # Configure Chrome options
-        self.option = webdriver.ChromeOptions()
-        if headless:
-            self.option.add_argument("--headless")
-        self.option.add_argument("--mute-audio")
-        self.option.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36")
+        self.headless = headless
+        self.option = self._chrome_options()
+
+        self.timeouts = dict(Waits.DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.session_file = session_file
+        if browser is not None:
+            # Open a tab in the shared browser, it is already logged in
+            self.tracer = tracer or browser.bot.tracer
+            self.driver = browser.open_tab()
+            self.downloads = browser.downloads
+            self.wait = self._wait("page")
+            return
 
         # Start Chrome webdriver
-        self.driver = uc.Chrome(options=self.option)
+        self.tracer = tracer or Instrumentation.tracer
+        self.driver = self._start_driver()
 
-        self.wait = WebDriverWait(self.driver, 30, 1, (ElementNotVisibleException))
+        self.downloads = DownloadManager(self.driver, download_dir)
+        self.wait = self._wait("page")
+
+        try:
+            self._login()
+        except Exception:
+            # The instance is never returned, do not leave its browser running
+            self.driver.quit()
+            raise
+
+    def _chrome_options(self) -> webdriver.ChromeOptions:
+        """
+        Returns new Chrome options for a browser of the bot. undetected_chromedriver refuses to start
+        a browser with options an earlier browser was started with.
+        """
+        option = webdriver.ChromeOptions()
+        if self.headless:
+            option.add_argument("--headless")
+        option.add_argument("--mute-audio")
+        option.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36")
+        return option
+
+    def _start_driver(self):
+        """
+        Starts a new Chrome webdriver with fresh options and counts its commands in the tracer.
+        """
+        self.option = self._chrome_options()
+        with self.tracer.span("bot.driver_start"):
+            driver = uc.Chrome(options=self.option)
+        self.tracer.attach(driver)
+        return driver
+
+    @traced("bot.login")
+    def _login(self) -> bool:
+        """
+        Logs in to Canva, with the saved session if it is still valid and with Google Sign-In otherwise.
+        """
+        if self.login_hook is not None:
+            self.login_hook(self)
+            return True
 
         # Navigate to the specified folder URL
         self.driver.get("https://www.canva.com/login")
+
+        # Reuse a previously saved login if it is still valid
+        self.tracer.phase("restore_session")
+        if self._restore_session():
+            print("Restored saved session")
+            return True
         
+        self.tracer.phase("google_sign_in")
         # Store the original window handle for later use
         original_window = self.driver.current_window_handle
         
@@ -65,49 +222,276 @@ class CanvaBot:
         
         print("Attempting to log in to Google")
 
-        # Perform Google sign-in
-        if not self._connect_google():
-            raise BaseException("Failed to perform Google Sign-In.")
+        # Perform Google sign-in, raises LoginError if Google rejects the credentials
+        self._connect_google()
         
         print("Login successful!")
         
         # Switch back to the original window
         self.driver.switch_to.window(original_window)
 
+        # Save the session once Canva has left the login page
+        self._save_session()
+        return True
+
+    # Size of the design in px, larger media is shrunk to it when preprocessing is enabled
+    media_size = (1920, 1920)
+    # Account key of the design URL, set by the subclasses
+    design_key = None
+    # Where the Uploads panel shows the newest upload, set by the subclasses
+    upload_thumbnail = None
+
+    def _prepare_media(self, path: str) -> str:
+        """
+        Returns the path to upload for 'path', a smaller cached copy when preprocessing is enabled.
+        """
+        if not self.preprocess:
+            return path
+        self.tracer.phase("preprocess")
+        return self.preprocess.process(path, self.media_size)
+
+    def _design(self, key: str) -> str:
+        """
+        Returns 'design_url', or the design the account lists under 'key'. Accounts may list several designs
+        for the tabs of a TabPool, a bot of its own opens the first one.
+        """
+        url = self.design_url or self.acc_dict[key]
+        return url[0] if isinstance(url, list) else url
+
+    def cached(self, kind: str, text, media=None, **options):
+        """
+        Looks up the result of an earlier render of 'text' and the media file 'media' on the design of the bot.
+
+        A render whose text is not known, because the design keeps whatever text it shows, is never cached:
+        the same None text stands for different texts over the life of a bot.
+
+        Args:
+        - kind: Kind of render, "image" or "video".
+        - text: Text of the design, None if it is not known.
+        - media: Path of the image or video, None for the media of the template.
+        - options: Further render settings the result depends on, e.g. folder="...".
+
+        Returns:
+        - dict: The stored result with 'cached' set to True, None if there is none or the bot has no cache.
+        """
+        if self.cache is None or text is None:
+            return None
+        self.tracer.phase("cache")
+        try:
+            result = self.cache.get(self._cache_key(kind, text, media, **options))
+        except Exception as e:
+            print(e)
+            return None
+        return dict(result, cached=True) if result else None
+
+    def _remember(self, kind: str, text, media, result: dict, **options) -> None:
+        """
+        Stores the result of a render for 'cached', unless its text is not known.
+        """
+        if self.cache is None or text is None:
+            return
+        try:
+            self.cache.put(self._cache_key(kind, text, media, **options), result)
+        except Exception as e:
+            print(e)
+
+    def _cache_key(self, kind, text, media, **options) -> str:
+        design = self.design_url or self.acc_dict.get(self.design_key)
+        if isinstance(design, list):
+            design = design[0]
+        return self.cache.key(design, kind, text, media, **options)
+
+    def _download_stem(self):
+        """
+        Returns the file name of the next export without extension, the design title, when the downloads
+        are shared with other tabs. Canva names downloads after the design title.
+        """
+        if self.browser is None:
+            return None
+        return self.driver.find_element(By.CLASS_NAME, 'YjmJuQ').text.strip() or None
+
+    def _wait(self, step: str) -> Waits.AdaptiveWait:
+        """
+        Returns an adaptive wait using the configured timeout of the named step.
+        """
+        return Waits.AdaptiveWait(self.driver, self.timeouts.get(step, self.timeouts["default"]))
+
+    def inspect_position(self) -> dict:
+        """
+        Reads the geometry fields of the selected element from the position panel with a single script call.
+
+        Returns:
+        - dict: {'height': float, 'fields': {label: float}, 'ids': {label: input id}}, where 'fields' holds
+          every labelled input of the panel (e.g. 'X', 'Y') and 'height' the element height input.
+          Values that can not be read are None.
+
+        Example Usage:
+        >>> bot.inspect_position()["fields"]["Y"]
+        -221.0
+        """
+        geometry = self.driver.execute_script(_GEOMETRY_SCRIPT)
+
+        def to_float(value):
+            try:
+                return float(value.replace("px", "").strip())
+            except (AttributeError, ValueError):
+                return None
+
+        return {
+            "height": to_float(geometry["height"]),
+            "fields": {label: to_float(field["value"]) for label, field in geometry["fields"].items()},
+            "ids": {label: field["id"] for label, field in geometry["fields"].items()},
+        }
+
+    def _upload(self, upload_path: str) -> None:
+        """
+        Uploads a media file through the Uploads panel and waits until the panel lists it as a new item,
+        shown first at 'upload_thumbnail'.
+        """
+        self._wait("element").until(Waits.element_with_text('.Ve4yyQ', 'Uploads')).click()
+        upload = self._wait("menu").until(Waits.element_present(By.CLASS_NAME, 'bpyLaw'))
+        # Count the earlier uploads once their thumbnails stopped loading in, best effort for a panel that never settles
+        self._wait("menu").settle(Waits.uploads_loaded())
+        before = Waits.upload_count(self.driver)
+
+        upload.send_keys(upload_path)
+        print("Clicked on Upload file")
+        self.tracer.phase("upload_wait")
+        self._wait("upload").until(Waits.upload_shown(before))
+
+    def _session_valid(self, timeout=10) -> bool:
+        """
+        Checks whether the browser is logged in to Canva.
+
+        Canva redirects authenticated users away from canva.com/login, so the session is
+        considered valid when the login page is left within 'timeout' seconds.
+
+        Returns:
+        - bool: True if the browser is logged in, False otherwise.
+        """
+        try:
+            Waits.AdaptiveWait(self.driver, timeout).until(lambda x: "/login" not in x.current_url)
+            return True
+        except Exception:
+            return False
+
+    def _save_session(self) -> bool:
+        """
+        Saves cookies and local storage of the logged-in Canva session to 'session_file'.
+
+        Returns:
+        - bool: True if the session is saved, False otherwise.
+        """
+        if not self.session_file:
+            return False
+        driver = self.driver
+        try:
+            if not self._session_valid(timeout=30):
+                print("Login did not complete, session is not saved")
+                return False
+
+            session = {
+                "saved": time(),
+                "cookies": driver.get_cookies(),
+                "local_storage": driver.execute_script("return Object.assign({}, window.localStorage);"),
+            }
+            with open(self.session_file, "w") as file:
+                json.dump(session, file)
+            # The file holds authentication cookies, keep it private
+            os.chmod(self.session_file, 0o600)
+            return True
+
+        except Exception as e:
+            print(e)
+            return False
+
+    def _restore_session(self) -> bool:
+        """
+        Restores a session saved by '_save_session' and checks that it is still valid.
+
+        Expired cookies are skipped. When the restored session is not accepted by Canva,
+        the browser cookies are cleared and the login page is reloaded for a full Google Sign-In.
+
+        Returns:
+        - bool: True if the browser is logged in with the restored session, False otherwise.
+        """
+        if not self.session_file or not os.path.exists(self.session_file):
+            return False
+        driver = self.driver
+        try:
+            with open(self.session_file, "r") as file:
+                session = json.load(file)
+
+            now = time()
+            for cookie in session.get("cookies", []):
+                if cookie.get("expiry") and cookie["expiry"] < now:
+                    continue
+                try:
+                    driver.add_cookie(cookie)
+                except Exception:
+                    pass
+            driver.execute_script(
+                "for (const [key, value] of Object.entries(arguments[0])) window.localStorage.setItem(key, value);",
+                session.get("local_storage", {}),
+            )
+
+            driver.get("https://www.canva.com/login")
+            if self._session_valid():
+                return True
+
+            print("Saved session has expired")
+            driver.delete_all_cookies()
+            driver.execute_script("window.localStorage.clear();")
+            driver.get("https://www.canva.com/login")
+            return False
+
+        except Exception as e:
+            print(e)
+            return False
+
 
     def _connect_google(self) -> bool:
         """
-        Performs Google sign-in using stored account credentials.
+        Performs Google sign-in using stored account credentials and waits for Google's answer.
 
         Returns:
-        - bool: True if the sign-in is successful, False otherwise.
+        - bool: True once the sign-in window has left Google.
+
+        Raises:
+        - LoginError: Raised if Google rejects the email or the password.
+        - Exception: Any other failure, e.g. a timeout or a page that did not load, says nothing about the account and is raised as is.
         """
-        # Function to perform Google sign-in
         driver = self.driver
         try:
             # Find and fill in the email field
-            driver.find_element(By.ID, 'identifierId').send_keys(self.acc_dict["testmail"])
+            self._wait("page").until(Waits.element_present(By.ID, 'identifierId')).send_keys(self.acc_dict["testmail"])
             
             # Click on the "Next" button
             driver.find_element(By.ID, 'identifierNext').click()
             
-            # Wait for the password input field to be visible
             driver.implicitly_wait(10)
+
+            # Wait for the password input field, or for Google not knowing the email
+            password = self._wait("page").until(EC.any_of(Waits.sign_in_rejected, Waits.element_present(By.CSS_SELECTOR, '#password input')))
+            if isinstance(password, str):
+                raise LoginError(password)
             
             # Fill in the password
-            driver.find_element(By.ID, 'password').find_element(By.TAG_NAME, "input").send_keys(self.acc_dict["testpassword"])
+            password.send_keys(self.acc_dict["testpassword"])
             
             # Click on the "Next" button for password
             driver.find_element(By.ID, 'passwordNext').click()
 
+            # Google either lets the window go back to Canva or says the password is wrong
+            signed_in = self._wait("page").until(EC.any_of(Waits.sign_in_rejected, Waits.signed_in))
+            if isinstance(signed_in, str):
+                raise LoginError(signed_in)
             return True
 
         except Exception as e:
-            # Handle exceptions, save screenshot, and quit the driver
-            print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
-            return False
+            # Save a screenshot, _login raises and the caller decides about the browser and the account
+            self._failed(e)
+            raise
             
     def _new_window(self) -> bool:
         """
@@ -119,7 +503,8 @@ class CanvaBot:
         # Function to open a new browser window
         driver = self.driver
         try:
-            sleep(3)
+            # Wait for the login page to render the "Continue with Google" button
+            continue_button = self._wait("page").until(EC.element_to_be_clickable((By.XPATH, self.continuewithgoogle)))
             
             # Store the original window handle
             original_window = driver.current_window_handle
@@ -128,7 +513,7 @@ class CanvaBot:
             assert len(driver.window_handles) == 1
             
             # Click on "Continue with Google" button to open a new window
-            driver.find_element(By.XPATH, self.continuewithgoogle).click()
+            continue_button.click()
             
             # Wait until there are two windows open
             self.wait.until(EC.number_of_windows_to_be(2))
@@ -145,33 +530,212 @@ class CanvaBot:
             return True
         
         except Exception as e:
-            # Handle exceptions, save screenshot, and quit the driver
-            print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
+            # Handle exceptions and save screenshot, _login raises and the caller decides about the browser
+            self._failed(e)
             return False
         
+    def _open_design(self) -> None:
+        """
+        Navigates to the workspace of the bot. Subclasses open their Canva design and wait until it is editable.
+        """
+        self.driver.get("https://www.canva.com/")
+
+    def _view_only(self, driver) -> bool:
+        """
+        Returns True while the opened workspace is not editable yet.
+        """
+        return False
+
+    def is_healthy(self) -> bool:
+        """
+        Checks that the browser is still running and logged in to Canva.
+
+        Returns:
+        - bool: True if the bot can be reused, False otherwise.
+        """
+        try:
+            return "/login" not in self.driver.current_url
+        except Exception:
+            return False
+
+    def reset(self, reload=False) -> bool:
+        """
+        Returns the bot to the starting state of its workspace.
+
+        Open menus and selections are dismissed with the Escape key. The workspace is reloaded
+        when that is not enough or when 'reload' is True.
+
+        Args:
+        - reload: Always reload the workspace.
+
+        Returns:
+        - bool: True if the workspace is ready for the next job, False otherwise.
+        """
+        driver = self.driver
+        try:
+            if not reload:
+                ActionChains(driver).send_keys(Keys.ESCAPE).send_keys(Keys.ESCAPE).perform()
+                try:
+                    if not self._view_only(driver):
+                        return True
+                except Exception as e:
+                    # The editor can not be checked, reload it rather than hand it out broken
+                    print(e)
+
+            self._open_design()
+            return True
+
+        except Exception as e:
+            print(e)
+            return False
+
+    def restart(self) -> bool:
+        """
+        Replaces the browser of the bot with a new one, logged in with the saved session, and reopens the workspace.
+        A bot running as a tab of a shared browser reopens its tab instead. Downloads keep going to the same directory.
+
+        The new browser is started before the old one is quit, a bot whose restart fails keeps its old browser.
+
+        Returns:
+        - bool: True if the workspace is ready again, False otherwise.
+        """
+        try:
+            driver = self.browser.open_tab() if self.browser is not None else self._start_driver()
+        except Exception as e:
+            print(e)
+            return False
+
+        previous, self.driver = self.driver, driver
+        try:
+            previous.quit()
+        except Exception:
+            pass
+
+        try:
+            if self.browser is None:
+                self.downloads.attach(self.driver)
+            self.wait = self._wait("page")
+            if self.browser is None:
+                self._login()
+            self._open_design()
+            return True
+
+        except Exception as e:
+            print(e)
+            return False
+
+    def recover(self, action, step=None) -> bool:
+        """
+        Brings the bot back to a state a failed step can be retried from.
+
+        Args:
+        - action: "retry" dismisses open menus, "reload" reloads the workspace and "restart" restarts the browser (see restart).
+        - step: Name of the failed step, recorded with the "bot.recover" span.
+
+        Returns:
+        - bool: True if the action succeeded, False otherwise.
+        """
+        with self.tracer.span("bot.recover", action=action, step=step) as record:
+            if action == RETRY:
+                recovered = self.reset()
+            elif action == RELOAD:
+                recovered = self.reset(reload=True)
+            else:
+                recovered = self.restart()
+            if not recovered:
+                record["outcome"] = "failed"
+            return recovered
+
+    @contextmanager
+    def _operation(self, name, *key, browser=True):
+        """
+        Context manager yielding the Checkpoints of a run of the operation 'name' with the arguments 'key'.
+
+        A run of the same operation and arguments that failed before is resumed, other runs start over. Starting an
+        operation that uses the browser drops the checkpoints of the other browser operations, the editor has moved on.
+        An operation called by another operation, e.g. render_video by change_video, shares the checkpoints of the outer one.
+        """
+        active = getattr(self._local, "operation", None)
+        if active is not None:
+            try:
+                yield active
+            except BaseException:
+                active.failed = True
+                raise
+            return
+
+        # VideoPipeline runs publish_video on another thread than the browser operations of the same bot
+        with self._pending_lock:
+            pending = self._pending.pop(name, None)
+            if browser:
+                for other in [other for other, checkpoints in self._pending.items() if checkpoints.browser]:
+                    del self._pending[other]
+        if pending is None or pending.key != key:
+            pending = Checkpoints(self, name, key, browser)
+        else:
+            print("Resuming {} after step '{}'".format(name, list(pending.done)[-1] if pending.done else None))
+        pending.failed = False
+
+        self._local.operation = pending
+        try:
+            yield pending
+        except BaseException:
+            pending.failed = True
+            raise
+        finally:
+            self._local.operation = None
+            if pending.failed:
+                with self._pending_lock:
+                    self._pending[name] = pending
+
+    def _failed(self, error) -> None:
+        """
+        Reports a failed operation and saves a screenshot of the browser to "error.png".
+        """
+        print(error)
+        try:
+            self.driver.save_screenshot('error.png')
+        except Exception:
+            pass
+
     def Close(self):
         self.driver.quit()
         
 
 class CanvaImage(CanvaBot):
-    def __init__(self) -> None:
+    def __init__(self, **kwargs) -> None:
         """
         CanvaVideo class extends CanvaBot and represents a specialized instance for working with Canva's image workspace.
         Upon initialization, it inherits the login automation features from CanvaBot and navigates to the Canva image workspace.
 
+        Keyword arguments are passed to CanvaBot.
+
         Usage:
         - Create an instance of CanvaImage to automate login and access the image workspace on canva.com.
 
         Example:
         >>> image_bot = CanvaImage()
         """
-        super().__init__()
-        self.driver.get(self.acc_dict["canvaimage"])
+        super().__init__(**kwargs)
+        self._open_design()
+
+    # Size of the design in px, larger media is shrunk to it when preprocessing is enabled
+    media_size = (1080, 1080)
+    # Account key of the design URL
+    design_key = "canvaimage"
+    # Where the Uploads panel shows the newest upload
+    upload_thumbnail = {'x': 105, 'y': 467}
+
+    @traced("bot.editor_load", failed=None)
+    def _open_design(self) -> None:
+        self.driver.get(self._design(self.design_key))
         self.driver.implicitly_wait(0)
-        self.wait.until_not(lambda x: x.find_element(By.XPATH, '//button[@aria-describedby=":rq:0"]').text.lower() == "view only")
+        self.wait.until_not(self._view_only)
+
+    def _view_only(self, driver) -> bool:
+        return driver.find_element(By.XPATH, '//button[@aria-describedby=":rq:0"]').text.lower() == "view only"
 
+    @traced("change_text")
     def change_text(self, text: str) -> bool:
         """
         Change the text content on a Canva design element.
@@ -188,102 +752,92 @@ class CanvaImage(CanvaBot):
         3. Replaces the existing text with the provided 'text'.
         4. Retrieves and adjusts the Y-coordinate of the text element.
 
-        Note: The method returns True upon successful execution and False if an exception occurs.
+        Note: The method returns True upon successful execution and False if the text can not be set
+        within the recovery policy of the bot.
 
         Example Usage:
         >>> bot = CanvaImage()
         >>> success = bot.change_text("New Text Content")
         """
-        driver = self.driver
         try:
-            txt = text
-            sleep(3)
-            print("Starting to change a text")
-            valuee = float(-221.0)
-            # Changing a text---------------------------------------------------------------------------[START]
-            driver.implicitly_wait(15)
-
-            # Locate all span elements on the page
-            spans = driver.find_elements(By.TAG_NAME, 'span')
-            txtp = None
-
-            # Iterate over spans to find the element with text "@happynewsup"
-            for j, i in enumerate(spans):
-                if i.text == "@happynewsup":
-                    txtp = spans[j+1]
-                    break
-            divtxt = txtp
-            
-            # Continue navigating up the DOM until a 'div' tag is encountered
-            while divtxt.tag_name != 'div':
-                drv2 = divtxt.find_element(By.XPATH, '..')
-                divtxt = drv2
-
-            # Double-click on the design element to activate the editable area
-            ActionChains(driver).double_click(divtxt).perform()
-                
-            # Define keyboard shortcuts based on the platform (Mac or others)
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("ax")\
-                .key_up(cmd_ctrl)\
-                .send_keys(txt)\
-                .perform()
-        
-            # Perform additional interactions with the Canva UI to confirm text change
-            driver.find_element(By.XPATH, '//*[@id=":r0:0"]/div/div/div/main/div[1]/div/div/div/div[1]/div[9]/div/button/span').click()
-            sleep(4)
-
-            # Extract information about the design element from the updated page source
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            simagle_html = soup.find_all('div', class_='Wrk03w c7zhBg HMkvaQ')
-            ordinata_html = soup.find_all('div', class_='Wrk03w c7zhBg')
-            ordinata_div = soup.find_all('div', class_='x6XCCg')
-            ordinata_id = 0
-            for i in ordinata_div:
-                if i.find('span').text == 'Y':
-                    ordinata_id = i 
-            ordinata_id_filtered = ordinata_id.find('input')['id']
-            
-            # Extract and calculate updated Y-coordinate and design element size
-            ordinata_y = float(ordinata_html[2].find('input')['value'].rstrip(' px'))
-            simagle = float(simagle_html[0].find('input')['value'].rstrip(" px"))
-            
-            axali_ordinata = valuee - simagle
-            
-            # Use keyboard shortcuts to update the Y-coordinate of the design element
-            driver.find_element(By.ID, ordinata_id_filtered).click()
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("ax")\
-                .key_up(cmd_ctrl)\
-                .send_keys(axali_ordinata)\
-                .send_keys(Keys.ENTER)\
-                .perform()
-            sleep(1)
-            
-            # Perform additional interactions with the Canva UI to finalize the text change
-            driver.find_element(By.CLASS_NAME, 'YjmJuQ').click()
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("ax")\
-                .key_up(cmd_ctrl)\
-                .send_keys(text)\
-                .perform()
-            sleep(2)
-
-        
+            with self._operation("change_text", text) as steps:
+                steps.run("text_set", partial(self._set_text, text))
             print('Text Have Successfully Changed...\r')
             return True
         except Exception as e:
-            print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
+            self._failed(e)
             return False
+
+    def _set_text(self, text: str) -> None:
+        """
+        Replaces the headline of the design with 'text', moves it above the image and renames the design after it.
+        """
+        driver = self.driver
+        txt = text
+        print("Starting to change a text")
+        valuee = float(-221.0)
+        # Changing a text---------------------------------------------------------------------------[START]
+        self.tracer.phase("edit")
+        driver.implicitly_wait(15)
+
+        # Wait for the span following the "@happynewsup" element and take its closest 'div'
+        divtxt = self._wait("element").until(
+            lambda x: query(x, 'span', "@happynewsup", offset=1, closest='div') or False
+        )
+
+        # Double-click on the design element to activate the editable area
+        ActionChains(driver).double_click(divtxt).perform()
             
+        # Define keyboard shortcuts based on the platform (Mac or others)
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("ax")\
+            .key_up(cmd_ctrl)\
+            .send_keys(txt)\
+            .perform()
+        
+        # Perform additional interactions with the Canva UI to confirm text change
+        driver.find_element(By.XPATH, '//*[@id=":r0:0"]/div/div/div/main/div[1]/div/div/div/div[1]/div[9]/div/button/span').click()
+
+        # Wait for the position panel to render the geometry inputs
+        self.tracer.phase("position")
+        self._wait("menu").until(Waits.element_present(By.CSS_SELECTOR, 'div.Wrk03w.c7zhBg.HMkvaQ input'))
+
+        # Read the Y input and the size of the design element from the position panel
+        geometry = self.inspect_position()
+        ordinata_id_filtered = geometry["ids"]["Y"]
+        simagle = geometry["height"]
+        
+        # Calculate updated Y-coordinate
+        axali_ordinata = valuee - simagle
+        
+        # Use keyboard shortcuts to update the Y-coordinate of the design element
+        driver.find_element(By.ID, ordinata_id_filtered).click()
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("ax")\
+            .key_up(cmd_ctrl)\
+            .send_keys(axali_ordinata)\
+            .send_keys(Keys.ENTER)\
+            .perform()
+        self._wait("element").until(Waits.input_value_near(By.ID, ordinata_id_filtered, axali_ordinata))
+        
+        # Perform additional interactions with the Canva UI to finalize the text change
+        self.tracer.phase("title")
+        driver.find_element(By.CLASS_NAME, 'YjmJuQ').click()
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("ax")\
+            .key_up(cmd_ctrl)\
+            .send_keys(text)\
+            .perform()
+        self._wait("settle").settle(EC.text_to_be_present_in_element((By.CLASS_NAME, 'YjmJuQ'), text))
+        self._last_text = text
+        
+    @traced("change_photo", failed=lambda result: result["imagelink"] is False)
     def change_photo(self, pictures: str) -> dict:
         """
         Change the photo on a Canva design by uploading and downloading a new image.
@@ -292,250 +846,459 @@ class CanvaImage(CanvaBot):
         - pictures: The path to the image file to be uploaded.
 
         Returns:
-        - A dictionary containing download link of edited image.
+        - A dictionary containing download link ('imagelink') and local path ('imagepath') of edited image,
+          and the metadata of the uploaded image ('media', see MediaValidator.validate_media).
+          'imagelink' is False if the image is invalid or a step fails within the recovery policy of the bot.
+
+        The steps (uploaded, placed, exported, downloaded) are checkpointed: calling change_photo again with
+        the same image after a failure resumes after the last completed step.
 
         Example Usage:
         >>> bot = CanvaImage()
         >>> success = bot.change_photo("~path/to/your/image.jpg")
         """
-        driver = self.driver
+        # Reject missing, truncated or corrupt images before the browser is touched
+        self.tracer.phase("validate")
         try:
-            sleep(2)
+            media = validate_media(pictures, kinds=("jpeg", "png"))
+        except MediaValidationError as e:
+            print(e)
+            return {'imagelink': False, 'imagepath': None}
 
-            # Find and click the 'Uploads' button on the Canva page.
-            upload_button = driver.find_elements(By.CLASS_NAME, 'Ve4yyQ')
-            for j in upload_button:
-                if j.text == 'Uploads':
-                    j.click()
-        
-            picture_path = pictures # Set the path to the image file.
-            sleep(2)
+        # The same text and image on this design have been rendered before
+        cached = self.cached("image", self._last_text, pictures)
+        if cached:
+            print("Returning the cached render of {}".format(pictures))
+            return cached
+        upload_path = self._prepare_media(pictures)
 
-            # Locate the element for uploading the image and send the file path.
-            driver.find_element(By.CLASS_NAME, 'bpyLaw').send_keys(picture_path)
-            print("Clicked on Upload file")
-            sleep(2)
-            
-            draggable = {'x': 105, 'y': 467} # Define the starting position for dragging and dropping.
-            droppable = driver.find_element(By.CLASS_NAME, 'Zp7NQw').location # Get the location for dropping.
-            
-            action = ActionBuilder(driver) # Create an ActionChains object for performing complex actions.
-
-            # Move to the starting position, click and hold the mouse, move to the dropping position, and release.
-            action.pointer_action.move_to_location(draggable['x'], draggable['y'])
-            action.pointer_action.click_and_hold()
-            action.pointer_action.move_to_location(droppable['x'], droppable['y'])
-            action.pointer_action.release()
-            action.perform()
-        
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL # Determine the platform-specific key.
-            
-            # Use ActionChains to simulate keyboard shortcuts (Cmd+A) for selecting all elements.
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("a")\
-                .key_up(cmd_ctrl)\
-                .perform()
-            
-            # Find and click the 'More' button on the Canva page to reveal additional options.
-            morebutton = None
-            for but in reversed(driver.find_elements(By.TAG_NAME, 'button')):
-                try:
-                    if but.get_attribute("aria-label") == 'More':
-                        morebutton = but
-                        break
-                except:
-                    pass
-            morebutton.click()
-            sleep(2)
-            
-            # Find and click the 'Download selection' option from the revealed options.
-            download_selection_li = None
-            for m in reversed(driver.find_elements(By.TAG_NAME, 'li')):
-                if m.text == "Download selection":
-                    download_selection_li = m
-                    break
-            download_selection_button = download_selection_li.find_element(By.TAG_NAME, 'button')
-            download_selection_button.click()
-            sleep(2)
-            
-            
+        try:
+            with self._operation("change_photo", pictures) as steps:
+                steps.run("uploaded", partial(self._upload_photo, upload_path))
+                # The upload is dragged from the Uploads panel, which a reload closes
+                steps.run("placed", self._place_photo, needs=("uploaded",))
+                export = steps.run("exported", self._export_selection)
+                image_path = steps.run("downloaded", lambda: self._download_export(steps.done["exported"]), needs=("exported",))
+
+                # Return to starting point
+                steps.run("returned", self._return_to_start)
+            exported = {'imagelink': export['imagelink'], 'imagepath': image_path, 'media': media}
+            self._remember("image", self._last_text, pictures, exported)
+            print("Done...")
+            return exported
+        except Exception as e:
+            self._failed(e)
+            return {'imagelink': False, 'imagepath': None}
+
+    @traced("render_variants", failed=lambda results: any(result["imagelink"] is False for result in results))
+    def render_variants(self, variants) -> list:
+        """
+        Render many variants of the open design in one session, applying the text and image of every variant and exporting it.
+
+        Variants sharing an image are rendered one after another, so every image is uploaded and placed once.
+        Variants without an image come first, on the image the design already shows. The download settings
+        are adjusted for the first export only, Canva keeps them with 'Save download settings'.
+        With a cache, variants with a text that have been rendered before are taken from it. Their text is still
+        set when the variant run after them has no text and shows it.
+        Every upload, text and export is a checkpointed step, calling render_variants again with the same
+        variants after a failure resumes after the last completed step.
+
+        Args:
+        - variants: List of (text, image path) pairs, or dictionaries with 'text' and 'media'.
+          A None image keeps the current image. A None text keeps the current text, which is the text of the variant
+          run before it: variants run grouped by image, not in the order of 'variants', e.g. in
+          [("A", "a.jpg"), ("B", "b.jpg"), (None, "a.jpg")] the third variant shows "A", not "B".
+
+        Returns:
+        - list: One result per variant, in the order of 'variants', as returned by change_photo:
+          {'imagelink', 'imagepath', 'media'}. 'imagelink' is False for variants with an invalid image
+          and for variants not rendered because a step failed within the recovery policy of the bot.
+
+        Example Usage:
+        >>> bot = CanvaImage()
+        >>> results = bot.render_variants([("First headline", "a.jpg"), ("Second headline", "a.jpg"), ("Third headline", None)])
+        >>> links = [result["imagelink"] for result in results]
+        """
+        results = [{'imagelink': False, 'imagepath': None} for _ in variants]
+
+        # Group the variants by image, in the order the images first appear
+        groups = {}
+        for index, variant in enumerate(variants):
+            text, pictures = (variant.get("text"), variant.get("media")) if isinstance(variant, dict) else variant
+            groups.setdefault(pictures, []).append((index, text))
+
+        # Reject invalid images before the browser is touched, only their own variants fail
+        self.tracer.phase("validate")
+        media = {}
+        for pictures in list(groups):
+            if pictures is None:
+                continue
+            try:
+                media[pictures] = validate_media(pictures, kinds=("jpeg", "png"))
+            except MediaValidationError as e:
+                print(e)
+                del groups[pictures]
+
+        # Variants without an image run first, then the images in the order they first appear
+        order = sorted(groups, key=lambda pictures: pictures is not None)
+
+        # Variants without a text show the text set by the variant run before them, whose text is set even if it is cached
+        inherited = set()
+        last = None
+        for pictures in order:
+            for index, text in groups[pictures]:
+                if text is not None:
+                    last = index
+                elif last is not None:
+                    inherited.add(last)
+
+        # Variants without a text are never cached, see cached. A pending variant is (index, text, render)
+        for pictures in order:
+            pending = []
+            for index, text in groups[pictures]:
+                cached = self.cached("image", text, pictures)
+                if cached:
+                    results[index] = cached
+                if not cached or index in inherited:
+                    pending.append((index, text, not cached))
+            if pending:
+                groups[pictures] = pending
+            else:
+                del groups[pictures]
+
+        configure = True
+        try:
+            with self._operation("render_variants", json.dumps(variants, default=str)) as steps:
+                for pictures in [pictures for pictures in order if pictures in groups]:
+                    # A group left with text steps only does not need its image
+                    if pictures is not None and any(render for _, _, render in groups[pictures]):
+                        uploaded = "uploaded:{}".format(pictures)
+                        steps.run(uploaded, partial(self._upload_photo, self._prepare_media(pictures)))
+                        steps.run("placed:{}".format(pictures), self._place_photo, needs=(uploaded,))
+
+                    for index, text, render in groups[pictures]:
+                        if text is not None:
+                            steps.run("text_set:{}".format(index), partial(self._set_text, text))
+                        if not render:
+                            continue
+                        exported = "exported:{}".format(index)
+                        export = steps.run(exported, partial(self._export_selection, configure))
+                        image_path = steps.run("downloaded:{}".format(index),
+                                               lambda exported=exported: self._download_export(steps.done[exported]), needs=(exported,))
+                        results[index] = {'imagelink': export['imagelink'], 'imagepath': image_path, 'media': media.get(pictures)}
+                        self._remember("image", text, pictures, results[index])
+                        configure = False
+                        steps.run("returned:{}".format(index), self._return_to_start)
+            print("Rendered {} variants".format(len(variants)))
+            return results
+        except Exception as e:
+            self._failed(e)
+            return results
+
+    def _upload_photo(self, upload_path: str) -> None:
+        """
+        Uploads an image through the Uploads panel and waits until Canva has processed it.
+        """
+        self.tracer.phase("upload")
+        self._upload(upload_path)
+
+    def _place_photo(self) -> None:
+        """
+        Drags the most recent upload onto the image frame of the design.
+        """
+        self.tracer.phase("place")
+        draggable = self.upload_thumbnail # The newest upload is dragged from its thumbnail.
+        droppable = self._wait("element").until(Waits.element_present(By.CLASS_NAME, 'Zp7NQw')).location # Get the location for dropping.
+
+        action = ActionBuilder(self.driver) # Create an ActionChains object for performing complex actions.
+
+        # Move to the starting position, click and hold the mouse, move to the dropping position, and release.
+        action.pointer_action.move_to_location(draggable['x'], draggable['y'])
+        action.pointer_action.click_and_hold()
+        action.pointer_action.move_to_location(droppable['x'], droppable['y'])
+        action.pointer_action.release()
+        action.perform()
+
+    def _export_selection(self, configure=True) -> dict:
+        """
+        Selects every element and downloads the selection, see _download_export for the exported file.
+
+        Args:
+        - configure: Set the file type to JPG and save the download settings. Once saved, later exports can skip it.
+
+        Returns:
+        - dict: {'imagelink': download link or None, 'since': download directory before the export, 'stem': expected file name}.
+        """
+        driver = self.driver
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL # Determine the platform-specific key.
+
+        # Use ActionChains to simulate keyboard shortcuts (Cmd+A) for selecting all elements.
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("a")\
+            .key_up(cmd_ctrl)\
+            .perform()
+
+        # Find and click the 'More' button on the Canva page to reveal additional options.
+        self.tracer.phase("download_settings")
+        self._wait("element").until(Waits.button_with_label('More')).click()
+
+        # Find and click the 'Download selection' option from the revealed options.
+        download_selection_li = self._wait("menu").until(Waits.menu_open("Download selection"))
+        download_selection_button = download_selection_li.find_element(By.TAG_NAME, 'button')
+        download_selection_button.click()
+
+        types = self._wait("menu").until(Waits.download_settings_rendered)
+        if configure:
             # adjust download settings (file type and save settings).
-            for types in driver.find_elements(By.TAG_NAME, 'p'):
-                try:
-                    type_txt = types.text
-                except:
-                    continue
-                if type_txt == 'File type':
-                    file_type = types.find_element(By.XPATH, '..').find_element(By.TAG_NAME, "div").text.split('\n')[0]
-                    if file_type == "PNG":
-                        types.click()
-                        sleep(0.1)
-                        # Find and click the 'JPG' button for setting the file type to JPG.
-                        for l in driver.find_element(By.CLASS_NAME, 'k__oiw').find_elements(By.TAG_NAME, 'div'):
-                            if l.text == 'JPG':
-                                l.click()
-                                break
-                    else:
-                        break
-            
+            file_type = types.find_element(By.XPATH, '..').find_element(By.TAG_NAME, "div").text.split('\n')[0]
+            if file_type == "PNG":
+                types.click()
+                # Find and click the 'JPG' button for setting the file type to JPG.
+                self._wait("menu").until(Waits.element_with_text('.k__oiw div', 'JPG')).click()
+
             check_box = driver.find_element(By.CLASS_NAME, "mq8XRA").find_element(By.TAG_NAME, "span")
             # Equals to 3 if check box is not checked
             if len(check_box.get_attribute("class").split(" ")) == 3:
                 check_box.click()
             # End of download settings adjustment
-            
-            sleep(1)
 
-            # Find and click the 'Download' button to initiate the download process.
-            Download_button = None
-            for dwnbutton in driver.find_elements(By.TAG_NAME, 'span'):
-                if dwnbutton.text == "Download":
-                    Download_button = dwnbutton
-                    break
-        
-            Download_button.click()
+        # Find and click the 'Download' button to initiate the download process.
+        self.tracer.phase("export")
+        stem = self._download_stem()
+        before = self.downloads.snapshot()
+        self._wait("element").until(Waits.element_with_text('span', "Download")).click()
 
-            sleep(2)
+        # Wait until the image is downloaded and check the completion status.
+        self._wait("export").until(Waits.download_completed('ahXO_w'))
+        print("Canva img Downloaded...\r")
 
-            # Wait until the image is downloaded and check the completion status.
-            downloading = driver.find_element(By.CLASS_NAME, 'ahXO_w')
-            while True:
-                downloading_status = downloading.find_elements(By.TAG_NAME, 'p')[-1]
-                if downloading_status.text == 'Completed':
-                    print("Canva img Downloaded...\r")
-                    break
-                sleep(3)
+        # Find and extract the image link if the download hasn't started.
+        image_link = self._wait("element").settle(
+            lambda x: query(x, 'span', "If your download hasn't started", contains=True, inner='a', prop='href') or False
+        ) or None
+        return {'imagelink': image_link, 'since': before, 'stem': stem}
 
-            sleep(2)
+    def _download_export(self, export: dict):
+        """
+        Waits for the file of an export started by _export_selection and returns its path.
 
-            # Find and extract the image link if the download hasn't started.
-            image_link = None
-            for dwnbutton in driver.find_elements(By.TAG_NAME, 'span'):
-                if "If your download hasn't started" in dwnbutton.text:
-                    image_link = dwnbutton.find_element(By.TAG_NAME, 'a').get_attribute('href')
-                    break
-            
-            sleep(2)
+        When Canva offered the download link because its download had not started, the file may never arrive:
+        it is only waited for if it starts within the "download_start" timeout, otherwise None is returned and
+        the link is the result.
+        """
+        # The exported file itself lands in the download directory of this bot
+        self.tracer.phase("download")
+        if export['imagelink']:
+            try:
+                self._wait("download_start").until(self.downloads.started(export['since'], stem=export['stem']))
+            except TimeoutException:
+                print("The export was not downloaded, returning its link only")
+                return None
+        return self.downloads.wait(since=export['since'], timeout=self.timeouts["download"], stem=export['stem'])
 
-            # Return to starting point
-            action.pointer_action.move_to_location(610, 680)
-            action.pointer_action.click()
-            action.perform()
-            print("Done...")
-            return {'imagelink': image_link}
-        except Exception as e:
-            print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
-            return {'imagelink': False}
+    def _return_to_start(self) -> None:
+        """
+        Clicks an empty spot of the editor, which closes open panels and clears the selection.
+        """
+        action = ActionBuilder(self.driver)
+        action.pointer_action.move_to_location(610, 680)
+        action.pointer_action.click()
+        action.perform()
 
 
 class CanvaVideo(CanvaBot):
-    def __init__(self) -> None:
+    def __init__(self, **kwargs) -> None:
         """
         CanvaVideo class extends CanvaBot and represents a specialized instance for working with Canva's video workspace.
         Upon initialization, it inherits the login automation features from CanvaBot and navigates to the Canva video workspace.
 
+        Keyword arguments are passed to CanvaBot.
+
         Usage:
         - Create an instance of CanvaVideo to automate login and access the video workspace on canva.com.
 
         Example:
         >>> video_bot = CanvaVideo()
         """
-        super().__init__()
-        self.driver.get(self.acc_dict["canvavideo"])
+        super().__init__(**kwargs)
+        self._open_design()
+
+    # Size of the design in px, larger media is shrunk to it when preprocessing is enabled
+    media_size = (1080, 1920)
+    # Account key of the design URL
+    design_key = "canvavideo"
+    # Where the Uploads panel shows the newest upload
+    upload_thumbnail = {'x': 105, 'y': 273}
+
+    @traced("bot.editor_load", failed=None)
+    def _open_design(self) -> None:
+        self.driver.get(self._design(self.design_key))
         self.driver.implicitly_wait(0)
-        self.wait.until_not(lambda x: x.find_element(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.Eph8Hg.NT2yCg.Qkd66A.tYI0Vw.lsXp_w.cwOZMg.zQlusQ.uRvRjQ.ETF18w').text.lower() == "view only")
+        self.wait.until_not(self._view_only)
+
+    def _view_only(self, driver) -> bool:
+        return driver.find_element(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.Eph8Hg.NT2yCg.Qkd66A.tYI0Vw.lsXp_w.cwOZMg.zQlusQ.uRvRjQ.ETF18w').text.lower() == "view only"
+
+    # Height in px the caption is fitted to, and how far above it the closest font size may end up
+    font_target_height = 170.0
+    font_tolerance = 7.0
+    font_input = 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.YPTJew.Qkd66A.tYI0Vw.HySjhA.cwOZMg.zQlusQ.uRvRjQ._0A9tDQ._8gR0WA input'
 
-    def change_video_text(self, text: str) -> bool:
+    @traced("change_video_text")
+    def change_video_text(self, text: str, target_height=None, tolerance=None) -> bool:
         """
         Change the text caption of a video element in Canva, adjusting font size as needed.
 
         Args:
         - text: The new text to be set as the caption.
+        - target_height: Height in px the caption is fitted to, defaults to 'font_target_height'.
+        - tolerance: Largest overshoot in px of 'target_height', defaults to 'font_tolerance'.
 
         Returns:
-        - True if the text caption is successfully changed, False otherwise.
+        - True if the text caption is successfully changed, False if it can not be changed within the recovery policy of the bot.
 
         Example Usage:
         >>> video_bot = CanvaImage()
         >>> success = video_bot.change_video_text("New Text Content")
         """
-        driver = self.driver
         try:
-            driver.implicitly_wait(5)
-
-            # Click on the video caption element
-            caption = driver.find_element(By.CLASS_NAME, 'YjmJuQ')
-            caption.click()
-            
-            # Use keyboard shortcuts to select and replace the existing text with the new one   
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("ax")\
-                .key_up(cmd_ctrl)\
-                .send_keys(text.replace(' ', '_'))\
-                .perform()
-            sleep(2)
-
-            # Find the video frame element to narrow working space
-            video_frame = driver.find_element(By.CLASS_NAME, 'pTC3Qw')
-
-            text_element = video_frame.find_element(By.TAG_NAME, "span")
-
-            # Double-click on the design element to activate the editable area
-            ActionChains(driver).double_click(text_element).perform()
-
-            # Define keyboard shortcuts based on the platform (Mac or others)
-            cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
-            ActionChains(driver)\
-                .key_down(cmd_ctrl)\
-                .send_keys("ax")\
-                .key_up(cmd_ctrl)\
-                .send_keys(text)\
-                .perform()
-
-            # Click on the "Position" button to access font size settings
-            for i2 in driver.find_elements(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.YPTJew.Qkd66A.tYI0Vw.HySjhA.cwOZMg.zQlusQ.uRvRjQ.JxsLWw'):
-                if i2.find_element(By.TAG_NAME, 'span').text == 'Position':
-                    i2.click()
-            sleep(2)
-
-            # Set the font size to 25
-            font_size = driver.find_element(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.YPTJew.Qkd66A.tYI0Vw.HySjhA.cwOZMg.zQlusQ.uRvRjQ._0A9tDQ._8gR0WA').find_element(By.TAG_NAME, 'input')
-            font_size.clear()
-            font_size.send_keys(25)
-            
-            # Adjust font size to fit within a certain range
-            small_font = 0
-            big_font = 0
-            increase_button = driver.find_element(By.CSS_SELECTOR, 'button[aria-label="Increase font size"]')
-            increase_button.click()
-            
-            while True:
-                simagle_html = float(driver.find_element(By.CSS_SELECTOR, 'div.Wrk03w.c7zhBg.HMkvaQ').find_element(By.TAG_NAME, 'input').get_attribute('value').rstrip(" px"))
-                if simagle_html < 170.0:
-                    small_font = simagle_html
-                    increase_button.click()
-                else:
-                    big_font = simagle_html
-                    break
-            
-            # Check and adjust font size to fit in frame
-            if (abs(170.0 - big_font) > abs(170.0 - small_font)) or (big_font > 177):
-                decrease_button = driver.find_element(By.CSS_SELECTOR, 'button[aria-label="Decrease font size"]')
-                decrease_button.click()
-
+            with self._operation("change_video_text", text, target_height, tolerance) as steps:
+                steps.run("text_set", partial(self._set_video_text, text, target_height, tolerance))
             return True
-        
         except Exception as e:
-            print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
+            self._failed(e)
             return False
 
+    def _set_video_text(self, text: str, target_height, tolerance) -> None:
+        """
+        Renames the design after 'text', sets it as the caption and fits the caption height.
+        """
+        driver = self.driver
+        self.tracer.phase("title")
+        driver.implicitly_wait(5)
+
+        # Click on the video caption element
+        caption = driver.find_element(By.CLASS_NAME, 'YjmJuQ')
+        caption.click()
+        
+        # Use keyboard shortcuts to select and replace the existing text with the new one   
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("ax")\
+            .key_up(cmd_ctrl)\
+            .send_keys(text.replace(' ', '_'))\
+            .perform()
+        self._wait("settle").settle(EC.text_to_be_present_in_element((By.CLASS_NAME, 'YjmJuQ'), text.replace(' ', '_')))
+        self._last_text = text
+
+        # Find the video frame element to narrow working space
+        self.tracer.phase("edit")
+        video_frame = driver.find_element(By.CLASS_NAME, 'pTC3Qw')
+
+        text_element = video_frame.find_element(By.TAG_NAME, "span")
+
+        # Double-click on the design element to activate the editable area
+        ActionChains(driver).double_click(text_element).perform()
+
+        # Define keyboard shortcuts based on the platform (Mac or others)
+        cmd_ctrl = Keys.COMMAND if sys.platform == 'darwin' else Keys.CONTROL
+        ActionChains(driver)\
+            .key_down(cmd_ctrl)\
+            .send_keys("ax")\
+            .key_up(cmd_ctrl)\
+            .send_keys(text)\
+            .perform()
+
+        # Click on the "Position" button to access font size settings
+        self._wait("element").until(Waits.element_with_text('button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.YPTJew.Qkd66A.tYI0Vw.HySjhA.cwOZMg.zQlusQ.uRvRjQ.JxsLWw', 'Position')).click()
+
+        # Wait for the font size input, then fit the caption height to the target
+        self.tracer.phase("fit_font")
+        self._wait("menu").until(Waits.element_present(By.CSS_SELECTOR, self.font_input))
+        self._fit_font(
+            self.font_target_height if target_height is None else target_height,
+            self.font_tolerance if tolerance is None else tolerance,
+        )
+
+    def _set_font_size(self, size: int, previous_height) -> float:
+        """
+        Types 'size' into the font size input and returns the caption height once Canva has re-rendered it.
+        """
+        font_size = self._wait("element").until(Waits.element_present(By.CSS_SELECTOR, self.font_input))
+        font_size.clear()
+        font_size.send_keys(str(size), Keys.ENTER)
+        self._wait("font").settle(lambda x: self.inspect_position()["height"] not in (None, previous_height))
+        return self.inspect_position()["height"]
+
+    def _fit_font(self, target: float, tolerance: float, start=25, min_size=1, max_size=800, max_steps=20) -> int:
+        """
+        Finds the font size whose caption height is closest to 'target' with as few UI interactions as possible.
+
+        The search keeps the largest size measured below 'target' and the smallest size measured at or above it.
+        The next size is estimated from the measured heights, which grow roughly proportionally to the font size,
+        and the bracket is bisected when consecutive estimates fall outside it. When the search ends, the larger size is kept unless
+        the smaller one is closer to 'target' or the larger one overshoots 'target' by more than 'tolerance'.
+
+        Returns:
+        - int: The font size that is set.
+        """
+        heights = {}
+        current, height = None, None
+        lo, hi = None, None
+        clamped = False
+
+        def measure(size):
+            nonlocal current, height
+            height = heights[size] = self._set_font_size(size, height)
+            current = size
+            return height
+
+        if measure(start) < target:
+            lo = start
+        else:
+            hi = start
+
+        for _ in range(max_steps):
+            if lo is not None and hi is not None and hi - lo <= 1:
+                break
+            lower = lo + 1 if lo is not None else min_size
+            upper = hi - 1 if hi is not None else max_size
+            if lower > upper:
+                break
+
+            # Estimate the size reaching the target from the closest measurement
+            ref = lo if hi is None else hi if lo is None else (lo if target - heights[lo] < heights[hi] - target else hi)
+            if heights[ref]:
+                size = round(ref * target / heights[ref])
+            else:
+                size = ref * 2
+            bounded = min(max(size, lower), upper)
+            # An estimate outside the bracket twice in a row means the model is off, bisect instead
+            if bounded != size and clamped and lo is not None and hi is not None:
+                bounded = (lo + hi) // 2
+            clamped = bounded != size
+            size = bounded
+
+            if measure(size) < target:
+                lo = size
+            else:
+                hi = size
+
+        if hi is None:
+            best = lo
+        elif lo is None:
+            best = hi
+        else:
+            big, small = heights[hi], heights[lo]
+            best = lo if (abs(target - big) > abs(target - small)) or (big > target + tolerance) else hi
+
+        if best != current:
+            measure(best)
+        return best
+
+    @traced("change_video")
     def change_video(self, video_path: str, foldername=""):
         """
         Upload a video to Canva, set it as a background, and transfer the edited video to a designated folder.
@@ -547,133 +1310,213 @@ class CanvaVideo(CanvaBot):
         Returns:
         - True if the video is successfully processed and transferred, False otherwise.
 
+        Runs render_video and publish_video one after the other, see VideoPipeline to overlap them across videos.
+        With a cache, a video already rendered with the same caption and published to the same folder is skipped.
+        Their steps (uploaded, background_set, exported, downloaded, copied, synced, moved) are checkpointed together:
+        calling change_video again with the same video and folder after a failure resumes after the last completed step,
+        e.g. a failed Drive sync is retried without rendering the video again.
+
         Usage Example:
         >>> video_bot = CanvaVideo()
         >>> success = video_bot.change_video('~path/to/your/video.mp4', '')
         """
-        driver = self.driver
+        if self.cached("video", self._last_text, video_path, folder=foldername):
+            print("{} has been rendered before".format(video_path))
+            return True
+
+        # render_video and publish_video share the checkpoints of change_video
+        with self._operation("change_video", video_path, foldername):
+            rendered = self.render_video(video_path)
+            if not rendered:
+                return False
+            if not self.publish_video(rendered["path"], rendered["caption"], foldername):
+                return False
+
+        # Where publish_video has left the video
+        caption = rendered["caption"]
+        if foldername:
+            path = os.path.join("canvavideos", "{}.mp4".format(caption.replace(" ", "_")))
+        else:
+            path = os.path.join("tvideo", "{}.mp4".format(caption))
+        self._remember("video", self._last_text, video_path, {"path": os.path.abspath(path), "caption": caption}, folder=foldername)
+        return True
+
+    @traced("render_video")
+    def render_video(self, video_path: str):
+        """
+        Browser stage of change_video: upload a video to Canva, set it as a background, export it and wait for the download.
+
+        Args:
+        - video_path: The path to the video file to be uploaded.
+
+        Returns:
+        - dict: {'path': downloaded file, 'caption': caption text of the design, 'media': metadata of the uploaded
+          video (see MediaValidator.validate_media)}, or None if the video is invalid or a step fails within
+          the recovery policy of the bot.
+
+        The steps (uploaded, background_set, exported, downloaded) are checkpointed: calling render_video again with
+        the same video after a failure resumes after the last completed step.
+        """
+        # Reject missing, truncated or corrupt videos before the browser is touched
+        self.tracer.phase("validate")
         try:
-            sleep(2)
-            # Finding the upload button element by class name
-            upload_button = driver.find_elements(By.CLASS_NAME, 'Ve4yyQ')
-
-            # Looping through the found elements to find the 'Uploads' button and clicking it
-            for j in upload_button:
-                if j.text == 'Uploads':
-                    upload_button = j 
-                    j.click()
-
-            sleep(2)
-
-            # Checking the size of the provided video file
-            video_memory = os.path.getsize(video_path)
-            # If the video file size is less than 1000 bytes, raising an exception indicating a damaged MP4 file
-            if int(video_memory) < 1000:
-                raise MemoryError("Corrupt MP4 File")
-            
-            # Entering the video path into the file input field
-            driver.find_element(By.CLASS_NAME, 'bpyLaw').send_keys(video_path)
-            print("Clicked on Upload file")
-            sleep(5)
+            media = validate_media(video_path, kinds=("mp4",))
+        except MediaValidationError as e:
+            print(e)
+            return None
+        upload_path = self._prepare_media(video_path)
 
+        try:
+            with self._operation("render_video", video_path) as steps:
+                steps.run("uploaded", partial(self._upload_video, upload_path))
+                # The upload is clicked in the Uploads panel, which a reload closes
+                steps.run("background_set", self._set_background, needs=("uploaded",))
+                steps.run("exported", self._export_video)
+                source_file = steps.run("downloaded", lambda: self._download_video(steps.done["exported"]), needs=("exported",))
+                caption_text = steps.run("caption", self._read_caption)
+            return {'path': source_file, 'caption': caption_text, 'media': media}
 
-            try:
-                # Setting implicit wait to 0 to continue execution without waiting for an element
-                driver.implicitly_wait(0)
-                # Looping until an element with class '_7tmBZQ' is not found an exception occurs indicating that file is uploaded
-                while True:
-                    driver.find_element(By.CLASS_NAME, '_7tmBZQ')
-                    sleep(2)
-            except:
-                print("Uploaded")
-
-            # Resetting implicit wait to 5 seconds
-            driver.implicitly_wait(5)
-
-            # Defining a location on the page to perform a pointer action (click)
-            video_location = {'x': 105, 'y': 273}
-            # Creating an ActionBuilder object using the driver to perform pointer actions
-            action = ActionBuilder(driver)
-            # Moving the pointer to a specific location and performing a click action
-            action.pointer_action.move_to_location(video_location['x'], video_location['y'])
-            action.pointer_action.click()
-            action.perform()
-
-            sleep(3)
-            # Finding and clicking the 'More' button on the page
-            for more in reversed(driver.find_elements(By.TAG_NAME, 'button')):
-                try:
-                    if more.get_attribute("aria-label") == 'More':
-                        more.click()
-                        break
-                except:
-                    pass
+        except Exception as e:
+            self._failed(e)
+            return None
 
-            sleep(1.5)
-            # Finding and clicking a specific button related to setting the video as background
-            for background in reversed(driver.find_elements(By.TAG_NAME, 'li')):
-                if background.text in ["Set video as background", "Replace background"]:
-                    set_background = background
-                    break
-            download_selection_button = set_background.find_element(By.TAG_NAME, 'button')
-            download_selection_button.click()
-
-            # Finding and clicking share, download, and submit buttons successively
-            share_button = driver.find_element(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.Eph8Hg.EQcUPw.lsXp_w.cwOZMg.zQlusQ.uRvRjQ.qTzCnQ')
-            share_button.click()
-            sleep(2)
-            download_button1 = driver.find_element(By.CSS_SELECTOR, 'button[aria-label="Download"]')
-            download_button1.click()
-            sleep(5)
-            submit_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
-            submit_button.click()
-            sleep(2)
-
-            # Waiting for the download to complete
-            downloading = driver.find_element(By.CLASS_NAME, 'yt8_Ew')
-            while True:
-                downloading_status = downloading.find_elements(By.TAG_NAME, 'p')[-1]
-                if downloading_status.text == 'Completed':
-                    print("Downloaded...")
-                    break
-                sleep(2)
-
-            # Performing a pointer action by moving and clicking at starting position
-            action = ActionBuilder(driver)
-            action.pointer_action.move_to_location(610, 680)
-            action.pointer_action.click()
-            action.perform()
-
-            # Retrieving caption text and defining source and destination paths for the downloaded video file
-            caption_text = driver.find_element(By.CLASS_NAME, 'YjmJuQ').get_attribute("outerHTML").rstrip("</div>").split(">")[-1]
-            source_file = r"C:\Users\{}\Downloads\{}.mp4".format(os.getlogin(), caption_text.replace(" ", "_"))
-            destination_file = r"tvideo\{}.mp4".format(caption_text)
-            while not os.path.exists(source_file):
-                sleep(1)
-
-            # Moving the downloaded video file to a specified destination
-            shutil.copy(source_file, destination_file)
-
-            # Note: This is an additional add-on and requires the DriveUpload.py file.
-            #---------------------------------------------------------------------------------------
-            if foldername:
-                if os.path.exists(destination_file):
-                    import DriveUpload
-                    print("Video file transferred successfully.")
-                    DriveUpload.upload_folder_to_drive(file_path='tvideo', folder_name=foldername)
-                    sleep(3)
-                    shutil.move(destination_file, r'canvavideos\{}.mp4'.format(caption_text.replace(" ", "_")))
-                    os.remove(source_file)
-                else:
-                    print("Failed to transfer the video file.")
-            #---------------------------------------------------------------------------------------
+    def _upload_video(self, upload_path: str) -> None:
+        """
+        Uploads a video through the Uploads panel and waits until Canva has processed it.
+        """
+        self.tracer.phase("upload")
+        self._upload(upload_path)
+        print("Uploaded")
+
+    def _set_background(self) -> None:
+        """
+        Sets the most recent upload as the background of the design.
+        """
+        driver = self.driver
+        # Resetting implicit wait to 5 seconds
+        self.tracer.phase("background")
+        driver.implicitly_wait(5)
+
+        # The thumbnail of the newest upload is clicked
+        video_location = self.upload_thumbnail
+        # Creating an ActionBuilder object using the driver to perform pointer actions
+        action = ActionBuilder(driver)
+        # Moving the pointer to a specific location and performing a click action
+        action.pointer_action.move_to_location(video_location['x'], video_location['y'])
+        action.pointer_action.click()
+        action.perform()
+
+        # Finding and clicking the 'More' button on the page
+        self._wait("element").until(Waits.button_with_label('More')).click()
+
+        # Finding and clicking a specific button related to setting the video as background
+        set_background = self._wait("menu").until(Waits.menu_open("Set video as background", "Replace background"))
+        download_selection_button = set_background.find_element(By.TAG_NAME, 'button')
+        download_selection_button.click()
+
+    def _export_video(self) -> dict:
+        """
+        Exports the design as a video and waits until Canva has rendered it and the browser downloads it.
+
+        Returns:
+        - dict: {'since': download directory before the export, 'stem': expected file name}.
+        """
+        driver = self.driver
+        # Finding and clicking share, download, and submit buttons successively
+        self.tracer.phase("export")
+        share_button = driver.find_element(By.CSS_SELECTOR, 'button._1QoxDw.Qkd66A.tYI0Vw.o4TrkA.Eph8Hg.EQcUPw.lsXp_w.cwOZMg.zQlusQ.uRvRjQ.qTzCnQ')
+        share_button.click()
+        download_button1 = self._wait("menu").until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[aria-label="Download"]')))
+        download_button1.click()
+        submit_button = self._wait("menu").until(Waits.export_dialog_rendered)
+        stem = self._download_stem()
+        before = self.downloads.snapshot()
+        submit_button.click()
+
+        # Canva renders the video before the browser starts downloading it
+        self._wait("export").settle(self.downloads.started(before, stem))
+        return {'since': before, 'stem': stem}
+
+    def _download_video(self, export: dict) -> str:
+        """
+        Waits for the file of an export started by _export_video and returns its path.
+        """
+        # Waiting for the rendered video to be finalized in the download directory
+        self.tracer.phase("download")
+        source_file = self.downloads.wait(since=export['since'], suffix=".mp4", timeout=self.timeouts["export"] + self.timeouts["download"], stem=export['stem'])
+        print("Downloaded...")
+        return source_file
+
+    def _read_caption(self) -> str:
+        """
+        Returns to the starting position and returns the caption text of the design, it names the video file.
+        """
+        driver = self.driver
+        # Performing a pointer action by moving and clicking at starting position
+        action = ActionBuilder(driver)
+        action.pointer_action.move_to_location(610, 680)
+        action.pointer_action.click()
+        action.perform()
+
+        # Retrieving caption text of the design, it names the video file
+        return driver.find_element(By.CLASS_NAME, 'YjmJuQ').get_attribute("outerHTML").rstrip("</div>").split(">")[-1]
+
+    @traced("publish_video")
+    def publish_video(self, source_file: str, caption_text: str, foldername="") -> bool:
+        """
+        Post-processing stage of change_video: copy the downloaded video to "tvideo", sync it to Google Drive
+        and move it to "canvavideos". It does not use the browser, so it can run while the next video renders.
+
+        Args:
+        - source_file: Path of the downloaded video.
+        - caption_text: Caption text of the design, it names the video file.
+        - foldername: Name of the google drive folder, without it the video is only copied to "tvideo".
+
+        Returns:
+        - True if the video is successfully transferred, False otherwise.
+
+        Steps (copied, synced, moved) are retried as the recovery policy of the bot allows, and calling publish_video
+        again with the same arguments after a failure resumes after the last completed step.
+        """
+        try:
+            with self._operation("publish_video", source_file, caption_text, foldername, browser=False) as steps:
+                destination_file = os.path.join("tvideo", "{}.mp4".format(caption_text))
+                steps.run("copied", partial(self._copy_video, source_file, destination_file), browser=False)
+
+                # Note: This is an additional add-on and requires the DriveUpload.py file.
+                #---------------------------------------------------------------------------------------
+                if foldername:
+                    if os.path.exists(destination_file):
+                        print("Video file transferred successfully.")
+                        steps.run("synced", partial(self._sync_video, foldername), browser=False)
+                        steps.run("moved", partial(self._move_video, source_file, destination_file, caption_text), browser=False)
+                    else:
+                        print("Failed to transfer the video file.")
+                #---------------------------------------------------------------------------------------
             
             print("Success")
             return True
-        
+
         except Exception as e:
             print(e)
-            driver.save_screenshot('error.png')
-            driver.quit()
             return False
-        
\ No newline at end of file
+
+    def _copy_video(self, source_file: str, destination_file: str) -> None:
+        self.tracer.phase("copy")
+        # Copying the downloaded video file to a specified destination, under a temporary name
+        # first so a concurrent sync of the folder never uploads a partial copy
+        shutil.copy(source_file, destination_file + ".part")
+        os.replace(destination_file + ".part", destination_file)
+
+    def _sync_video(self, foldername: str) -> None:
+        import DriveUpload
+        self.tracer.phase("drive_sync")
+        synced = DriveUpload.sync_folder_to_drive(file_path='tvideo', folder_name=foldername)
+        if "error" in synced:
+            # The video stays in tvideo and is picked up by the next sync
+            raise RuntimeError("Drive sync failed: {}".format(synced["error"]))
+
+    def _move_video(self, source_file: str, destination_file: str, caption_text: str) -> None:
+        self.tracer.phase("move")
+        shutil.move(destination_file, os.path.join("canvavideos", "{}.mp4".format(caption_text.replace(" ", "_"))))
+        os.remove(source_file)
@@ -0,0 +1,226 @@
+import os, sys, sysconfig, threading
+from collections import Counter
+from time import perf_counter
+
+# Frames from these directories are library code, never a call site
+_LIBRARY_PATHS = tuple(
+    os.path.realpath(path) for key, path in sysconfig.get_paths().items() if key in ("stdlib", "platstdlib", "purelib", "platlib")
+)
+# The profiler and the tracer wrap driver.execute themselves
+_OWN_FILES = (os.path.realpath(__file__), os.path.join(os.path.dirname(os.path.realpath(__file__)), "Instrumentation.py"))
+
+
+class CommandBudgetExceeded(AssertionError):
+    """
+    Raised when an operation sent more WebDriver commands (or took longer) than its budget allows.
+    """
+
+
+class CommandProfiler:
+    def __init__(self, budgets=None) -> None:
+        """
+        CommandProfiler counts and times every WebDriver command of a bot, grouped by high-level
+        operation (the outermost span of the bot's tracer, e.g. "change_photo") and by call site.
+
+        Each command is an HTTP round trip to the driver, so the count is a latency measure that does not
+        depend on Canva's response times. Profiling is opt-in, bots without a profiler pay nothing.
+
+        Args:
+        - budgets: {operation: max_commands} or {operation: (max_commands, max_seconds)}, checked for every call of the operation.
+
+        Example:
+        >>> profiler = CommandProfiler(budgets={"change_photo": 80})
+        >>> profiler.attach(bot)
+        >>> bot.change_photo("~path/to/your/image.jpg")
+        >>> print(profiler.report())
+        >>> profiler.assert_budgets()
+        >>> profiler.detach()
+        """
+        self.budgets = {}
+        for operation, budget in (budgets or {}).items():
+            max_commands, max_seconds = budget if isinstance(budget, tuple) else (budget, None)
+            self.set_budget(operation, max_commands, max_seconds)
+        self.violations = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._operations = {}
+        self._sites = {}
+        self._tracer = None
+        self._driver = None
+        self._execute = None
+
+    def attach(self, bot) -> None:
+        """
+        Profiles the driver of 'bot'. Operations are delimited by the spans of 'bot.tracer'.
+        A profiler follows one bot at a time, call detach before attaching it to another.
+
+        Args:
+        - bot: Object with a 'driver' whose execute method sends the WebDriver commands and a 'tracer', e.g. a CanvaBot.
+        """
+        if self._driver is not None:
+            raise RuntimeError("CommandProfiler is attached already, detach it first")
+        self._tracer = bot.tracer
+        bot.tracer.add_listener(self._span_finished)
+
+        execute = self._execute = bot.driver.execute
+        self._driver = bot.driver
+
+        def profiled(driver_command, *args, **kwargs):
+            started = perf_counter()
+            try:
+                return execute(driver_command, *args, **kwargs)
+            finally:
+                self._record(driver_command, perf_counter() - started, sys._getframe(1))
+        bot.driver.execute = profiled
+
+    def detach(self) -> None:
+        """
+        Stops profiling: restores the driver's execute method and removes the listener from the tracer,
+        which bots without a tracer of their own share. The recorded counts are kept.
+        """
+        if self._driver is None:
+            return
+        self._driver.execute = self._execute
+        self._tracer.remove_listener(self._span_finished)
+        self._driver = self._execute = None
+
+    def set_budget(self, operation, max_commands=None, max_seconds=None) -> None:
+        """
+        Sets the largest number of commands and seconds a single call of 'operation' may use.
+        """
+        self.budgets[operation] = (max_commands, max_seconds)
+
+    def _pending(self) -> dict:
+        if not hasattr(self._local, "pending"):
+            self._local.pending = {}
+        return self._local.pending
+
+    def _operation(self, name) -> dict:
+        if name not in self._operations:
+            self._operations[name] = {"calls": 0, "commands": 0, "seconds": 0.0, "max_commands": 0, "max_seconds": 0.0, "by_command": Counter()}
+        return self._operations[name]
+
+    def _record(self, driver_command, seconds, frame) -> None:
+        operation = self._tracer.root() if self._tracer else None
+        site, caller = _call_site(frame)
+
+        # Counts of the operation call still running in this thread
+        pending = self._pending().setdefault(operation, [0, 0.0])
+        pending[0] += 1
+        pending[1] += seconds
+
+        with self._lock:
+            totals = self._operation(operation)
+            totals["commands"] += 1
+            totals["seconds"] += seconds
+            totals["by_command"][driver_command] += 1
+
+            key = (site, caller)
+            if key not in self._sites:
+                self._sites[key] = {"site": site, "caller": caller, "count": 0, "seconds": 0.0, "operations": Counter(), "commands": Counter()}
+            entry = self._sites[key]
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["operations"][operation] += 1
+            entry["commands"][driver_command] += 1
+
+    def _span_finished(self, record) -> None:
+        # Only the outermost spans are operations
+        if record["parent"] is not None:
+            return
+        operation = record["name"]
+        commands, seconds = self._pending().pop(operation, [0, 0.0])
+
+        with self._lock:
+            totals = self._operation(operation)
+            totals["calls"] += 1
+            totals["max_commands"] = max(totals["max_commands"], commands)
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+
+            max_commands, max_seconds = self.budgets.get(operation, (None, None))
+            if max_commands is not None and commands > max_commands:
+                self.violations.append("{} sent {} WebDriver commands, budget is {}".format(operation, commands, max_commands))
+            if max_seconds is not None and seconds > max_seconds:
+                self.violations.append("{} spent {:.3f}s in WebDriver commands, budget is {}s".format(operation, seconds, max_seconds))
+
+    def operations(self) -> dict:
+        """
+        Returns per operation: number of calls, total and per-call maximum commands and seconds, and commands by name.
+        Commands sent outside of any operation are listed under None.
+        """
+        with self._lock:
+            return {name: dict(totals, by_command=dict(totals["by_command"])) for name, totals in self._operations.items()}
+
+    def hottest(self, top=20, by="seconds") -> list:
+        """
+        Returns the 'top' call sites ranked by 'by' ("seconds" or "count").
+
+        Every entry holds the 'site' sending the commands ("file:line function"), its 'caller' in
+        another file, 'count', 'seconds', and the commands and operations it was seen in.
+        """
+        with self._lock:
+            entries = [dict(entry, operations=dict(entry["operations"]), commands=dict(entry["commands"])) for entry in self._sites.values()]
+        return sorted(entries, key=lambda entry: entry[by], reverse=True)[:top]
+
+    def report(self, top=20, by="seconds") -> str:
+        """
+        Renders the operations and the hottest call sites as a text table.
+        """
+        lines = ["{:<24} {:>6} {:>9} {:>9} {:>10}".format("operation", "calls", "commands", "max/call", "seconds")]
+        for name, totals in sorted(self.operations().items(), key=lambda item: item[1]["seconds"], reverse=True):
+            lines.append("{:<24} {:>6} {:>9} {:>9} {:>10.3f}".format(str(name), totals["calls"], totals["commands"], totals["max_commands"], totals["seconds"]))
+
+        lines.append("")
+        lines.append("{:>6} {:>10}  call site".format("count", "seconds"))
+        for entry in self.hottest(top, by):
+            commands = ", ".join("{} x{}".format(name, count) for name, count in Counter(entry["commands"]).most_common(3))
+            lines.append("{:>6} {:>10.3f}  {} <- {} [{}]".format(entry["count"], entry["seconds"], entry["site"], entry["caller"], commands))
+        return "\n".join(lines)
+
+    def assert_budget(self, operation, max_commands=None, max_seconds=None) -> None:
+        """
+        Raises CommandBudgetExceeded if a recorded call of 'operation' went over the given limits.
+        """
+        totals = self.operations().get(operation)
+        if not totals or not totals["calls"]:
+            raise CommandBudgetExceeded("{} was never called".format(operation))
+        if max_commands is not None and totals["max_commands"] > max_commands:
+            raise CommandBudgetExceeded("{} sent up to {} WebDriver commands per call, budget is {}".format(operation, totals["max_commands"], max_commands))
+        if max_seconds is not None and totals["max_seconds"] > max_seconds:
+            raise CommandBudgetExceeded("{} spent up to {:.3f}s in WebDriver commands per call, budget is {}s".format(operation, totals["max_seconds"], max_seconds))
+
+    def assert_budgets(self) -> None:
+        """
+        Raises CommandBudgetExceeded listing every call that went over the budgets given to the profiler.
+        """
+        with self._lock:
+            violations = list(self.violations)
+        if violations:
+            raise CommandBudgetExceeded("\n".join(violations))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self._sites.clear()
+            self.violations.clear()
+
+
+def _call_site(frame):
+    """
+    Returns the innermost frame outside of libraries as "file:line function", and the next such frame in another file.
+    """
+    site = caller = None
+    site_file = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith("<"):
+            filename = os.path.realpath(filename)
+        if not filename.startswith(_LIBRARY_PATHS + ("<",)) and filename not in _OWN_FILES:
+            location = "{}:{} {}".format(os.path.basename(filename), frame.f_lineno, frame.f_code.co_name)
+            if site is None:
+                site, site_file = location, filename
+            elif filename != site_file:
+                caller = location
+                break
+        frame = frame.f_back
+    return site, caller
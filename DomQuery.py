@@ -0,0 +1,55 @@
+_QUERY_SCRIPT = """
+const [root, selector, texts, contains, attribute, value, offset, closest, inner, last, all, prop] = arguments;
+const elements = Array.from((root || document).querySelectorAll(selector));
+const matches = [];
+const order = elements.map((_, i) => i);
+if (last) order.reverse();
+for (const i of order) {
+    const element = elements[i];
+    if (texts.length) {
+        const text = (element.innerText || '').trim();
+        if (!texts.some(t => contains ? text.includes(t) : text === t)) continue;
+    }
+    if (attribute !== null && element.getAttribute(attribute) !== value) continue;
+    let target = elements[i + offset];
+    if (target && closest) target = target.closest(closest);
+    if (target && inner) target = target.querySelector(inner);
+    if (!target) continue;
+    matches.push(prop ? target[prop] : target);
+    if (!all) break;
+}
+return all ? matches : (matches.length ? matches[0] : null);
+"""
+
+
+def query(driver, selector, *texts, contains=False, attribute=None, value=None, offset=0,
+          closest=None, inner=None, last=False, all=False, prop=None, root=None):
+    """
+    Finds elements by text or attribute inside the browser with a single WebDriver round trip,
+    instead of reading '.text' or 'get_attribute' of every candidate from Python.
+
+    Args:
+    - driver: Webdriver instance.
+    - selector: CSS selector of the candidates, e.g. 'span', 'li' or '.Ve4yyQ'.
+    - texts: Candidate matches if its trimmed innerText equals one of 'texts' (any text if empty).
+    - contains: Match texts as substrings instead of exact values.
+    - attribute, value: Candidate matches if its 'attribute' equals 'value', e.g. attribute='aria-label', value='More'.
+    - offset: Return the candidate 'offset' positions after the match, e.g. 1 for the next span.
+    - closest: Return the closest ancestor (or the element itself) matching this CSS selector.
+    - inner: Return the first descendant matching this CSS selector.
+    - last: Search from the end of the document, the most recently rendered match wins.
+    - all: Return every match as a list.
+    - prop: Return this DOM property of the match (e.g. 'href', 'value', 'innerText') instead of the element.
+    - root: Element to search in instead of the whole document.
+
+    Returns:
+    - The matching WebElement (or property value), None if nothing matches, or a list if 'all' is True.
+
+    Example:
+    >>> more_button = query(driver, 'button', attribute='aria-label', value='More', last=True)
+    >>> uploads_tab = query(driver, '.Ve4yyQ', 'Uploads')
+    """
+    return driver.execute_script(
+        _QUERY_SCRIPT, root, selector, list(texts), contains, attribute, value,
+        offset, closest, inner, last, all, prop,
+    )
@@ -0,0 +1,114 @@
+import os, re, threading
+from uuid import uuid4
+import Waits
+
+# Suffixes Chrome uses for files that are still being written
+PARTIAL_SUFFIXES = (".crdownload", ".tmp", ".part")
+# Characters Chrome replaces in download file names
+_UNSAFE_CHARACTERS = re.compile(r'[\\/:*?"<>|~]')
+
+
+class DownloadManager:
+    def __init__(self, driver, directory=None) -> None:
+        """
+        DownloadManager points the downloads of one Chrome instance to its own directory
+        and hands back the path of a downloaded file as soon as Chrome has finalized it.
+
+        Chrome writes a download to a '.crdownload' file and renames it once it is complete,
+        so a file with its final name in the directory is a finished download. Every driver gets
+        its own directory, several bots on one host never see each other's files.
+
+        Tabs of one browser share its directory (see TabPool). A download returned by 'wait' is claimed,
+        so it is never handed to another tab, and 'stem' tells concurrent downloads apart by their file name.
+
+        Args:
+        - driver: Chrome webdriver instance.
+        - directory: Download directory, defaults to a new 'downloads/<random id>' directory.
+
+        Example:
+        >>> downloads = DownloadManager(driver)
+        >>> before = downloads.snapshot()
+        >>> # ... start a download ...
+        >>> path = downloads.wait(since=before, suffix=".mp4")
+        """
+        self.directory = os.path.abspath(directory or os.path.join("downloads", uuid4().hex))
+        os.makedirs(self.directory, exist_ok=True)
+        self._claimed = set()
+        self._lock = threading.Lock()
+        self.attach(driver)
+
+    def attach(self, driver) -> None:
+        """
+        Points the downloads of 'driver' to the directory, e.g. of the new browser of a restarted bot.
+        """
+        self.driver = driver
+        # Works in headless mode too, where Chrome ignores the download preferences
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": self.directory,
+        })
+
+    def snapshot(self) -> set:
+        """
+        Returns the names of the files currently in the download directory.
+        """
+        return set(os.listdir(self.directory))
+
+    def finished(self, name=None, since=None, suffix=None, stem=None):
+        """
+        Condition returning the path of a finalized download, for use with Waits.AdaptiveWait.
+        The returned file is claimed and not matched again.
+
+        Args:
+        - name: Expected file name. Without it, any unclaimed file not in 'since' matches.
+        - since: Snapshot of file names taken before the download started.
+        - suffix: Only match file names ending with this suffix, e.g. '.mp4'.
+        - stem: Only match files named 'stem' plus an extension, e.g. the design title. Chrome's " (1)" suffixes of repeated names are ignored.
+        """
+        def condition(driver):
+            if name is not None:
+                path = os.path.join(self.directory, name)
+                return path if os.path.exists(path) else False
+
+            with self._lock:
+                for file in sorted(os.listdir(self.directory)):
+                    if file.endswith(PARTIAL_SUFFIXES) or file in self._claimed or (since is not None and file in since):
+                        continue
+                    if (suffix and not file.endswith(suffix)) or (stem and not _same_stem(file, stem)):
+                        continue
+                    self._claimed.add(file)
+                    return os.path.join(self.directory, file)
+            return False
+        return condition
+
+    def started(self, since, stem=None):
+        """
+        Condition true once any unclaimed file not in 'since' (and named 'stem') exists, finished or still being written.
+        """
+        return lambda driver: any(
+            file not in since and file not in self._claimed
+            # Chrome names a download "Unconfirmed <id>.crdownload" until its file name is known
+            and (not stem or _same_stem(file, stem) or file.startswith("Unconfirmed "))
+            for file in os.listdir(self.directory)
+        )
+
+    def wait(self, name=None, since=None, suffix=None, timeout=600, stem=None) -> str:
+        """
+        Waits for a download to be finalized and returns its path.
+
+        Raises:
+        - TimeoutException: Raised if no matching download is finished within 'timeout' seconds.
+        """
+        return Waits.AdaptiveWait(self.driver, timeout).until(
+            self.finished(name, since, suffix, stem), "Download did not finish in {}".format(self.directory)
+        )
+
+
+def _same_stem(file, stem) -> bool:
+    """
+    True if 'file' is named 'stem' plus extensions, allowing for the partial suffixes and the " (1)" Chrome adds.
+    """
+    while file.endswith(PARTIAL_SUFFIXES):
+        file = os.path.splitext(file)[0]
+    name = re.sub(r" \(\d+\)$", "", os.path.splitext(file)[0])
+    return name.strip(" .") == _UNSAFE_CHARACTERS.sub("_", stem).strip(" .")
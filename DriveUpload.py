@@ -1,73 +1,491 @@
 from google.oauth2 import service_account
-import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import sleep, time
+import os, json, socket, threading, hashlib
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 SERVICE_ACCOUNT_FILE = os.environ.get("SERVICE_ACCOUNT_JSON")
 PARENT_FOLDER_ID = os.environ.get("DRIVE_PARENT_FOLDER_ID")
+# Overrides the Drive endpoint, e.g. "http://127.0.0.1:8080/drive/v3/" for a local fake Drive server
+API_ENDPOINT = os.environ.get("DRIVE_API_ENDPOINT")
 
-creds = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+CHUNK_SIZE = 8 * 1024 * 1024  # Resumable upload chunk size, must be a multiple of 256 KiB
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 5
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+# Reasons of the 403 responses Drive sends instead of 429 when a rate limit is hit
+RATE_LIMIT_REASONS = ('userRateLimitExceeded', 'rateLimitExceeded')
+MANIFEST_FILE = "drive_manifest.json"
+FILE_ID_TTL = 3600  # Seconds a cached name -> file ID entry stays valid
+SHARE_BATCH_SIZE = 100  # Permission creates per batch request, Drive allows at most 100
+LINK_PERMISSION = {
+    'type': 'anyone',
+    'role': 'reader',
+}
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
 
-def upload_folder_to_drive(file_path, folder_name):
-    from googleapiclient.discovery import build
+_lock = threading.Lock()
+_manifest_lock = threading.Lock()
+_file_ids_lock = threading.Lock()
+_file_ids = {}  # (name, parent ID or None) -> (file ID, expiry time)
+_local = threading.local()
+_creds = None
+_discovery = None
+
+def get_credentials():
+    """
+    Loads the service account credentials on first use and shares them between all clients.
+    """
+    global _creds
+    with _lock:
+        if _creds is None:
+            _creds = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+        return _creds
+
+def _discovery_document():
+    """
+    Parses the Drive v3 discovery document shipped with google-api-python-client once per process.
+    """
+    from googleapiclient import discovery_cache
+    global _discovery
+    with _lock:
+        if _discovery is None:
+            _discovery = json.loads(discovery_cache.get_static_doc('drive', 'v3'))
+        return _discovery
+
+def get_drive_service():
+    """
+    Returns the Drive client of the calling thread, building it on first use.
+
+    httplib2 connections are not thread-safe, so every thread keeps one client with its own
+    keep-alive HTTP connection, while credentials and the parsed discovery document are shared.
+    With DRIVE_API_ENDPOINT set and no service account, requests are sent unauthenticated.
+    """
+    service = getattr(_local, "service", None)
+    if service is None:
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.http import build_http
+        # build_http keeps 308 (resumable upload "incomplete") from being followed as a redirect
+        http = build_http()
+        if SERVICE_ACCOUNT_FILE or not API_ENDPOINT:
+            http = AuthorizedHttp(get_credentials(), http=http)
+        document, client_options = _discovery_document(), None
+        if API_ENDPOINT:
+            # Media uploads are addressed from rootUrl, point it at the same server
+            from urllib.parse import urlparse
+            endpoint = urlparse(API_ENDPOINT)
+            document = dict(document, rootUrl=f'{endpoint.scheme}://{endpoint.netloc}/')
+            client_options = {"api_endpoint": API_ENDPOINT}
+        service = _local.service = build_from_document(document, http=http, client_options=client_options)
+    return service
+
+def _retryable(error):
+    """
+    Returns whether a Drive request that failed with the HttpError 'error' is worth retrying:
+    a RETRYABLE_STATUS, or a 403 whose reason is one of RATE_LIMIT_REASONS.
+    """
+    if error.resp.status in RETRYABLE_STATUS:
+        return True
+    if error.resp.status != 403:
+        return False
+    try:
+        errors = json.loads(error.content.decode('utf-8'))['error'].get('errors', [])
+        return any(item.get('reason') in RATE_LIMIT_REASONS for item in errors)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+def print_progress(name, fraction):
+    print(f'Uploading "{name}": {fraction:.0%}')
+
+def upload_file(local_file_path, parent_id, file_id=None, chunk_size=CHUNK_SIZE, retries=UPLOAD_RETRIES, progress=print_progress):
+    """
+    Uploads one file with a chunked resumable upload and returns its Drive file ID.
+    With 'file_id', the content of that existing Drive file is replaced instead.
+
+    A failed chunk is retried with exponential backoff, also after a 403 for a Drive rate limit. The upload session resumes from the
+    last offset Drive confirmed, so a dropped connection does not restart a large file from zero.
+
+    Args:
+    - local_file_path: Path of the file to upload.
+    - parent_id: ID of the Drive folder to upload into.
+    - file_id: ID of an existing Drive file to overwrite.
+    - chunk_size: Bytes sent per request, a multiple of 256 KiB.
+    - retries: Consecutive failures of one chunk before giving up.
+    - progress: Callable receiving the file name and the uploaded fraction, or None.
+    """
+    import httplib2
+    from googleapiclient.errors import HttpError
     from googleapiclient.http import MediaFileUpload
-    import os
+
+    name = os.path.basename(local_file_path)
+    media = MediaFileUpload(local_file_path, chunksize=chunk_size, resumable=True)
+    if file_id:
+        request = get_drive_service().files().update(fileId=file_id, media_body=media, fields='id')
+    else:
+        request = get_drive_service().files().create(
+            body={'name': name, 'parents': [parent_id]},
+            media_body=media,
+            fields='id',
+        )
+
+    response = None
+    failures = 0
+    while response is None:
+        try:
+            status, response = request.next_chunk()
+            failures = 0
+            if status and progress:
+                progress(name, status.progress())
+        except (HttpError, httplib2.HttpLib2Error, ConnectionError, socket.timeout) as e:
+            if isinstance(e, HttpError) and not _retryable(e):
+                raise
+            failures += 1
+            if failures > retries:
+                raise
+            sleep(min(2 ** failures, 60))
+
+    if progress:
+        progress(name, 1.0)
+    remember_file_id(name, response['id'], parent_id)
+    return response['id']
+
+def upload_files(paths, parent_id, max_workers=UPLOAD_WORKERS, existing=None, **upload_kwargs):
+    """
+    Uploads several files at once with a thread pool.
+
+    Args:
+    - paths: Paths of the files to upload.
+    - parent_id: ID of the Drive folder to upload into.
+    - max_workers: Number of files uploaded in parallel.
+    - existing: File name -> Drive file ID of files to overwrite instead of creating.
+    - upload_kwargs: Keyword arguments passed to upload_file.
+
+    Returns:
+    - dict: File name -> Drive file ID.
+    """
+    paths = list(paths)
+    existing = existing or {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        ids = executor.map(
+            lambda path: upload_file(path, parent_id, file_id=existing.get(os.path.basename(path)), **upload_kwargs),
+            paths,
+        )
+        return {os.path.basename(path): file_id for path, file_id in zip(paths, ids)}
+
+def create_folder(folder_name, parent_id=None):
+    """
+    Creates a Drive folder and returns its ID.
+    """
+    file_metadata = {
+        'name': folder_name,
+        'mimeType': FOLDER_MIME_TYPE,
+        'parents': [parent_id or PARENT_FOLDER_ID]
+    }
+    return get_drive_service().files().create(body=file_metadata, fields='id').execute()['id']
+
+def _quote(value):
+    """
+    Escapes a string literal for a Drive 'q' query.
+    """
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def list_files(query, fields='id, name'):
+    """
+    Returns every file matching a Drive 'q' query, following pagination, with only the requested fields.
+    """
+    service = get_drive_service()
+    files, page_token = [], None
+    while True:
+        response = service.files().list(
+            q=query,
+            fields=f'nextPageToken, files({fields})',
+            pageSize=1000,
+            pageToken=page_token,
+        ).execute()
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+def find_folder(folder_name, parent_id=None):
+    """
+    Returns the ID of the folder 'folder_name' in 'parent_id', or None if there is none.
+    """
+    folders = list_files(
+        f"name = {_quote(folder_name)} and mimeType = '{FOLDER_MIME_TYPE}' "
+        f"and {_quote(parent_id or PARENT_FOLDER_ID)} in parents and trashed = false",
+        fields='id',
+    )
+    return folders[0]['id'] if folders else None
+
+def _md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+@contextmanager
+def _manifest_locked(manifest_path):
+    """
+    Holds an exclusive lock on the manifest, shared by the threads of this process and by other processes,
+    through the lock file 'manifest_path' + '.lock'.
+    """
+    with _manifest_lock, open(manifest_path + '.lock', 'a+') as file:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            while True:
+                try:
+                    # Gives up after 10 seconds, keep waiting
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        yield
+
+def _folder_exists(folder_id):
+    """
+    Returns False if the Drive folder 'folder_id' has been deleted or trashed.
+    """
+    from googleapiclient.errors import HttpError
+    try:
+        folder = get_drive_service().files().get(fileId=folder_id, fields='id, trashed').execute()
+    except HttpError as e:
+        if e.resp.status == 404:
+            return False
+        raise
+    return not folder.get('trashed')
+
+def _load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as file:
+        return json.load(file)
+
+def _save_manifest(manifest, manifest_path):
+    temporary = manifest_path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary, manifest_path)
+
+def sync_folder_to_drive(file_path, folder_name, manifest_path=MANIFEST_FILE, max_workers=UPLOAD_WORKERS, **upload_kwargs):
+    """
+    Incrementally syncs the files under 'file_path' to the Drive folder 'folder_name'.
+
+    A local manifest keeps the MD5 hash, size, mtime and Drive file ID of every synced file, so
+    unchanged files are not hashed again. Files already in the Drive folder with a matching
+    'md5Checksum' are skipped, changed files are overwritten in place and new files are uploaded
+    (see upload_files). The Drive folder is reused across calls, and found or created again once it
+    has been deleted. Drive is the source of truth, so a stale or lost manifest only costs re-hashing,
+    never a duplicate upload.
+
+    Syncs sharing a manifest, in this or other processes, run one after another under a lock file next to it,
+    and each saves the manifest it read under the lock, so none of them loses the entries of another.
+
+    Args:
+    - file_path: Local folder to sync.
+    - folder_name: Name of the Drive folder in DRIVE_PARENT_FOLDER_ID.
+    - manifest_path: Path of the JSON manifest.
+    - max_workers: Number of files uploaded in parallel.
+    - upload_kwargs: Keyword arguments passed to upload_file.
+
+    Returns:
+    - dict: {'folder_id': str, 'uploaded': {name: file ID}, 'skipped': {name: file ID}}, or {'error': str}.
+    """
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        with _manifest_locked(manifest_path):
+            manifest = _load_manifest(manifest_path)
+            folder = manifest.setdefault(folder_name, {'id': None, 'files': {}})
+            if folder['id'] and not _folder_exists(folder['id']):
+                folder['id'] = None
+            if not folder['id']:
+                folder['id'] = find_folder(folder_name) or create_folder(folder_name)
+
+            remote = {
+                file['name']: file
+                for file in list_files(f"{_quote(folder['id'])} in parents and trashed = false", fields='id, name, md5Checksum')
+            }
+
+            entries, pending, skipped = {}, {}, {}
+            for root, dirs, files in os.walk(file_path):
+                for name in files:
+                    # Files still being copied into the folder
+                    if name.endswith('.part'):
+                        continue
+                    local_file_path = os.path.join(root, name)
+                    stat = os.stat(local_file_path)
+                    entry = folder['files'].get(name)
+                    if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                        entry = {'md5': _md5(local_file_path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'id': None}
+                    entries[name] = entry
+
+                    remote_file = remote.get(name)
+                    if remote_file and remote_file.get('md5Checksum') == entry['md5']:
+                        entry['id'] = skipped[name] = remote_file['id']
+                        remember_file_id(name, remote_file['id'], folder['id'])
+                    else:
+                        pending[name] = local_file_path
 
-        file_metadata = {
-            'name': folder_name,
-            'mimeType': 'application/vnd.google-apps.folder',
-            'parents': [PARENT_FOLDER_ID]
-        }
+            existing = {name: remote[name]['id'] for name in pending if name in remote}
+            uploaded = upload_files(pending.values(), folder['id'], max_workers=max_workers, existing=existing, **upload_kwargs)
+            for name, file_id in uploaded.items():
+                entries[name]['id'] = file_id
 
-        drive_folder = drive_service.files().create(body=file_metadata).execute()
+            # Files moved away locally are dropped from the manifest, their Drive copies stay
+            folder['files'] = entries
+            _save_manifest(manifest, manifest_path)
+            return {'folder_id': folder['id'], 'uploaded': uploaded, 'skipped': skipped}
 
+    except Exception as e:
+        return {'error': str(e)}
+
+def upload_folder_to_drive(file_path, folder_name, max_workers=UPLOAD_WORKERS, **upload_kwargs):
+    """
+    Creates the Drive folder 'folder_name' and uploads every file under 'file_path' into it,
+    'max_workers' files at a time with resumable chunked uploads (see upload_file).
+    """
+    try:
+        folder_id = create_folder(folder_name)
+
+        paths = []
         for root, dirs, files in os.walk(file_path):
             for file in files:
-                local_file_path = os.path.join(root, file)
-                media = MediaFileUpload(local_file_path)
-                file_metadata = {
-                    'name': file,
-                    'parents': [drive_folder.get('id')]
-                }
-                drive_service.files().create(body=file_metadata, media_body=media).execute()
+                paths.append(os.path.join(root, file))
+        upload_files(paths, folder_id, max_workers=max_workers, **upload_kwargs)
         return f'Folder "{folder_name}" uploaded to Google Drive as "{folder_name}"'
 
     except Exception as e:
         return f'error: {e}'
     
-def get_file_download_link(videoname):
-    from googleapiclient.discovery import build
-    try:
-        drive_service = build('drive', 'v3', credentials=creds)
-        file_id = videoname + '.mp4'
+def remember_file_id(name, file_id, parent_id=None, ttl=FILE_ID_TTL):
+    """
+    Caches the Drive file ID of 'name', for lookups with and without its parent folder.
+    """
+    expires = time() + ttl
+    with _file_ids_lock:
+        _file_ids[(name, None)] = (file_id, expires)
+        if parent_id:
+            _file_ids[(name, parent_id)] = (file_id, expires)
+
+def invalidate_file_id(name=None):
+    """
+    Drops the cached file ID of 'name', or the whole cache without a name.
+    """
+    with _file_ids_lock:
+        if name is None:
+            _file_ids.clear()
+        else:
+            for key in [key for key in _file_ids if key[0] == name]:
+                del _file_ids[key]
 
-        results = drive_service.files().list().execute()
+def find_file_id(name, parent_id=None):
+    """
+    Returns the ID of the file called 'name' (in 'parent_id' if given), or None if there is none.
 
-        download_url = None
-        for file in results.get('files', []):
-            if file_id == file['name']:
-                download_url = 'https://drive.google.com/uc?export=download&id={}'.format(file['id'])
-                preview_url = "https://drive.google.com/uc?id={}".format(file['id'])
-                break
+    Files uploaded by this process are answered from the cache. Other names are looked up with a
+    Drive query on name and parent, following pagination; the most recently modified match wins.
+    """
+    with _file_ids_lock:
+        cached = _file_ids.get((name, parent_id))
+    if cached and cached[1] > time():
+        return cached[0]
 
-        return {"downloadUrl": download_url, "previewUrl": preview_url, 'driveId': file['id']}
+    query = f"name = {_quote(name)} and trashed = false"
+    if parent_id:
+        query += f" and {_quote(parent_id)} in parents"
+    files = list_files(query, fields='id, modifiedTime')
+    if not files:
+        return None
+
+    file_id = max(files, key=lambda file: file.get('modifiedTime', ''))['id']
+    remember_file_id(name, file_id, parent_id)
+    return file_id
+
+def get_file_download_link(videoname, parent_id=None):
+    try:
+        file_id = find_file_id(videoname + '.mp4', parent_id)
+        if file_id is None:
+            return None
+
+        download_url = 'https://drive.google.com/uc?export=download&id={}'.format(file_id)
+        preview_url = "https://drive.google.com/uc?id={}".format(file_id)
+        return {"downloadUrl": download_url, "previewUrl": preview_url, 'driveId': file_id}
     except:
         return None
     
 def share_file_with_link(file_id):
-    from googleapiclient.discovery import build
-    service = build('drive', 'v3', credentials=creds)
-    permission = {
-        'type': 'anyone',
-        'role': 'reader',
-    }
+    service = get_drive_service()
 
     request = service.permissions().create(
         fileId=file_id,
-        body=permission,
+        body=LINK_PERMISSION,
         fields='id',
     )
     response = request.execute()
 
-    print(f'File shared with link. Permission ID: {response["id"]}')
\ No newline at end of file
+    print(f'File shared with link. Permission ID: {response["id"]}')
+
+def share_files_with_link(file_ids, batch_size=SHARE_BATCH_SIZE, retries=UPLOAD_RETRIES):
+    """
+    Shares many files with "anyone with the link" using batched HTTP requests.
+
+    Permission creates are sent 'batch_size' at a time (Drive accepts at most 100 per batch).
+    Items failing with a retryable status or a rate limit, or whose whole batch failed to send, are retried
+    in a new batch with exponential backoff, up to 'retries' times.
+
+    Args:
+    - file_ids: Drive file IDs to share.
+    - batch_size: Permission creates per batch request.
+    - retries: Retries of a failing item.
+
+    Returns:
+    - dict: File ID -> {'permissionId': str} or {'error': str}.
+
+    Example:
+    >>> share_files_with_link(['1AbC...', '1DeF...'])
+    {'1AbC...': {'permissionId': 'anyoneWithLink'}, '1DeF...': {'error': '<HttpError 404 ...>'}}
+    """
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    service = get_drive_service()
+    results = {}
+    pending = list(dict.fromkeys(file_ids))
+    attempt = 0
+    while pending:
+        retry = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = {'permissionId': response['id']}
+            elif isinstance(exception, HttpError) and _retryable(exception) and attempt < retries:
+                retry.append(request_id)
+            else:
+                results[request_id] = {'error': str(exception)}
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=callback)
+            for file_id in chunk:
+                batch.add(service.permissions().create(fileId=file_id, body=LINK_PERMISSION, fields='id'), request_id=file_id)
+            try:
+                batch.execute()
+            except (HttpError, httplib2.HttpLib2Error, ConnectionError, socket.timeout) as e:
+                for file_id in chunk:
+                    if attempt < retries:
+                        retry.append(file_id)
+                    else:
+                        results[file_id] = {'error': str(e)}
+
+        pending = retry
+        attempt += 1
+        if pending:
+            sleep(min(2 ** attempt, 60))
+    return results
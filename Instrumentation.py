@@ -0,0 +1,250 @@
+import json, os, tempfile, threading, functools
+from collections import deque
+from contextlib import contextmanager
+from time import time, perf_counter
+
+# Durations kept per span name for the percentiles
+MAX_SAMPLES = 10000
+
+
+class Tracer:
+    def __init__(self, trace_file=None) -> None:
+        """
+        Tracer records named spans around bot operations and their phases: duration, number of
+        WebDriver commands and outcome ("ok", "failed" or "error").
+
+        Finished spans are appended to 'trace_file' as JSON lines, and aggregated into
+        p50/p95/p99 histograms per span name (see histograms and export_metrics).
+
+        Args:
+        - trace_file: JSONL file spans are appended to, defaults to $CANVABOT_TRACE_FILE (no file if unset).
+
+        Example:
+        >>> tracer = Tracer("traces.jsonl")
+        >>> bot = CanvaImage(tracer=tracer)
+        >>> bot.change_text("New Text Content")
+        >>> tracer.histograms()["change_text"]["p95"]
+        """
+        self.trace_file = trace_file or os.environ.get("CANVABOT_TRACE_FILE")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._samples = {}
+        self._totals = {}
+        self._listeners = []
+
+    def attach(self, driver) -> None:
+        """
+        Counts every WebDriver command sent by 'driver'. All commands, element reads included, go through driver.execute.
+        """
+        execute = driver.execute
+        local = self._local
+
+        def counted(*args, **kwargs):
+            local.commands = getattr(local, "commands", 0) + 1
+            return execute(*args, **kwargs)
+        driver.execute = counted
+
+    def add_listener(self, callback) -> None:
+        """
+        Calls callback(record) with every finished span, in the thread that ran it.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback) -> None:
+        """
+        Stops calling a callback added with add_listener.
+        """
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def root(self):
+        """
+        Returns the name of the outermost open span of the current thread, None outside of spans.
+        """
+        stack = self._stack()
+        return stack[0]["name"] if stack else None
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _open(self, name, attributes) -> dict:
+        stack = self._stack()
+        record = {
+            "name": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "start": time(),
+            "outcome": "ok",
+            "error": None,
+            "pid": os.getpid(),
+            "_started": perf_counter(),
+            "_commands": getattr(self._local, "commands", 0),
+            "_phase": None,
+        }
+        record.update(attributes)
+        stack.append(record)
+        return record
+
+    def _close(self, record) -> None:
+        if record["_phase"] is not None:
+            phase, record["_phase"] = record["_phase"], None
+            # The phase that was running when the span failed is the one that failed
+            if record["outcome"] != "ok":
+                phase["outcome"], phase["error"] = record["outcome"], record["error"]
+            self._close(phase)
+
+        self._stack().remove(record)
+        record["duration"] = perf_counter() - record.pop("_started")
+        record["commands"] = getattr(self._local, "commands", 0) - record.pop("_commands")
+        record.pop("_phase")
+        self._record(record)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Context manager recording a span. It yields the span record; set record["outcome"] = "failed"
+        for operations that report failure without raising. Exceptions mark the span as "error".
+        """
+        record = self._open(name, attributes)
+        try:
+            yield record
+        except BaseException as e:
+            record["outcome"], record["error"] = "error", repr(e)
+            raise
+        finally:
+            self._close(record)
+
+    def phase(self, name, **attributes) -> None:
+        """
+        Starts the next phase of the innermost open span, ending its previous phase.
+        Phases are recorded as child spans named "<span>.<phase>".
+        """
+        stack = self._stack()
+        if not stack:
+            return
+        # Skip phase records, they are not meant to hold phases themselves
+        owner = next((record for record in reversed(stack) if not record.get("_is_phase")), None)
+        if owner is None:
+            return
+        if owner["_phase"] is not None:
+            phase, owner["_phase"] = owner["_phase"], None
+            self._close(phase)
+        owner["_phase"] = self._open("{}.{}".format(owner["name"], name), dict(attributes, _is_phase=True))
+
+    def _record(self, record) -> None:
+        record.pop("_is_phase", None)
+        name = record["name"]
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=MAX_SAMPLES)).append(record["duration"])
+            totals = self._totals.setdefault(name, {"count": 0, "sum": 0.0, "commands": 0, "ok": 0, "failed": 0, "error": 0})
+            totals["count"] += 1
+            totals["sum"] += record["duration"]
+            totals["commands"] += record["commands"]
+            totals[record["outcome"]] += 1
+
+            if self.trace_file:
+                with open(self.trace_file, "a") as file:
+                    file.write(json.dumps(record, default=str) + "\n")
+
+        for callback in list(self._listeners):
+            callback(record)
+
+    def histograms(self) -> dict:
+        """
+        Returns per span name: count, outcomes, mean/max duration, p50/p95/p99 duration (seconds) and mean WebDriver commands.
+        """
+        with self._lock:
+            snapshot = {name: (sorted(samples), dict(self._totals[name])) for name, samples in self._samples.items()}
+
+        histograms = {}
+        for name, (samples, totals) in snapshot.items():
+            histograms[name] = {
+                "count": totals["count"],
+                "ok": totals["ok"],
+                "failed": totals["failed"],
+                "error": totals["error"],
+                "mean": totals["sum"] / totals["count"],
+                "max": samples[-1],
+                "p50": _percentile(samples, 50),
+                "p95": _percentile(samples, 95),
+                "p99": _percentile(samples, 99),
+                "commands_mean": totals["commands"] / totals["count"],
+            }
+        return histograms
+
+    def metrics_text(self, **labels) -> str:
+        """
+        Renders the histograms in the Prometheus text exposition format. 'labels' are added to every series,
+        e.g. worker="1234" to tell apart the files of several processes.
+        """
+        extra = "".join(',{}="{}"'.format(key, value) for key, value in sorted(labels.items()))
+        lines = [
+            "# TYPE canvabot_span_duration_seconds summary",
+        ]
+        histograms = self.histograms()
+        with self._lock:
+            totals = {name: dict(values) for name, values in self._totals.items()}
+        for name, histogram in sorted(histograms.items()):
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append('canvabot_span_duration_seconds{{span="{}",quantile="{}"{}}} {}'.format(name, quantile, extra, histogram[key]))
+            lines.append('canvabot_span_duration_seconds_sum{{span="{}"{}}} {}'.format(name, extra, totals[name]["sum"]))
+            lines.append('canvabot_span_duration_seconds_count{{span="{}"{}}} {}'.format(name, extra, histogram["count"]))
+        lines.append("# TYPE canvabot_span_outcomes_total counter")
+        for name, histogram in sorted(histograms.items()):
+            for outcome in ("ok", "failed", "error"):
+                lines.append('canvabot_span_outcomes_total{{span="{}",outcome="{}"{}}} {}'.format(name, outcome, extra, histogram[outcome]))
+        lines.append("# TYPE canvabot_span_webdriver_commands_total counter")
+        for name in sorted(histograms):
+            lines.append('canvabot_span_webdriver_commands_total{{span="{}"{}}} {}'.format(name, extra, totals[name]["commands"]))
+        return "\n".join(lines) + "\n"
+
+    def export_metrics(self, path, **labels) -> None:
+        """
+        Writes metrics_text(**labels) to 'path' atomically, e.g. for the node_exporter textfile collector.
+        Concurrent exports to the same path each write their own temporary file, the last one wins.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                file.write(self.metrics_text(**labels))
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def _percentile(samples, percent):
+    """
+    Nearest-rank percentile of sorted samples.
+    """
+    rank = max(0, -(-percent * len(samples) // 100) - 1)
+    return samples[int(rank)]
+
+
+def traced(name, failed=lambda result: not result):
+    """
+    Decorator recording a bot method as a span of the bot's tracer ('self.tracer').
+    The span is marked "failed" when failed(return value) is true, pass failed=None for methods without a failure value.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name) as record:
+                result = method(self, *args, **kwargs)
+                if failed and failed(result):
+                    record["outcome"] = "failed"
+                return result
+        return wrapper
+    return decorator
+
+
+# Tracer shared by bots created without their own
+tracer = Tracer()
@@ -0,0 +1,348 @@
+import argparse, json, os, queue, threading
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing import util
+from time import time
+
+# Seconds a worker waits for a free account slot before failing the job
+ACCOUNT_TIMEOUT = 600
+# Seconds an account is left out of rotation after a bot failed to start on it for another reason than its login
+START_COOLDOWN = 60
+
+# Bots owned by the current worker process, created on first use per job kind.
+# In tab mode every kind has a TabPool of '_tabs' tabs in one browser instead.
+_bots = {}
+_bot_accounts = {}
+_bot_kwargs = {}
+_bots_lock = threading.Lock()
+_metrics_dir = None
+_scheduler = None
+_tabs = 0
+
+
+def read_jobs(path):
+    """
+    Reads a JSONL job file, one job per line. Blank lines are skipped. A line that is not a JSON object is yielded as
+    {'id': line number, 'invalid': reason}, which run_job fails without touching a bot, so one bad line does not stop the run.
+
+    Every job is a dictionary with:
+    - kind: "image" or "video".
+    - text: New text of the design (optional for images).
+    - media: Path of the image or video to upload (optional for images).
+    - folder: Google Drive folder name for videos (optional).
+    - id: Job identifier (optional, defaults to the line number).
+    """
+    with open(path, "r") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                yield {"id": number, "invalid": "Line {} is not valid JSON: {}".format(number, e)}
+                continue
+            if not isinstance(job, dict):
+                yield {"id": number, "invalid": "Line {} is not a JSON object".format(number)}
+                continue
+            job.setdefault("id", number)
+            yield job
+
+
+def _init_worker(bot_kwargs, trace_file=None, metrics_dir=None, scheduler=None, tabs=0) -> None:
+    global _metrics_dir, _scheduler, _tabs
+    _bot_kwargs.update(bot_kwargs)
+    _metrics_dir = metrics_dir
+    _scheduler = scheduler
+    _tabs = tabs
+    if trace_file:
+        import Instrumentation
+        Instrumentation.tracer.trace_file = trace_file
+    # Pool workers leave through multiprocessing's exit handlers, not atexit
+    util.Finalize(None, _close_bots, exitpriority=10)
+
+
+def _close_bots() -> None:
+    for kind in list(_bots):
+        _close_bot(kind)
+
+
+def _close_bot(kind) -> None:
+    bot = _bots.pop(kind)
+    try:
+        if _tabs:
+            # A TabPool closes its tabs and quits the browser they share
+            bot.close()
+        else:
+            bot.Close()
+    except Exception as e:
+        print("Closing the {} bot failed: {}".format(kind, e))
+    _bot_accounts.pop(kind, None)
+
+
+def _get_bot(kind):
+    """
+    Returns the logged-in bot of this worker for 'kind', replacing it if its browser died.
+    In tab mode it returns the TabPool of 'kind' instead.
+
+    With an account scheduler, a bot holds a slot of its account while it logs in and while it runs a job
+    (see _leased_bot), an idle bot holds none. An account whose login is rejected is taken out of rotation and the next account is tried. Any other start
+    failure, e.g. of Chrome or the network, only pauses the account for START_COOLDOWN seconds and fails the job.
+    """
+    from CanvaBot import CanvaImage, CanvaVideo, LoginError
+
+    with _bots_lock:
+        bot = _bots.get(kind)
+        if bot is not None and not bot.is_healthy():
+            _close_bot(kind)
+            bot = None
+
+        if bot is None:
+            bot_class = {"image": CanvaImage, "video": CanvaVideo}[kind]
+            if _tabs:
+                from TabPool import TabPool
+                factory = lambda **kwargs: TabPool(bot_class, size=_tabs, **kwargs)
+            else:
+                factory = bot_class
+            if _scheduler is None:
+                bot = _bots[kind] = factory(**_bot_kwargs)
+                return bot
+
+            while bot is None:
+                # Raises once every account is out of rotation
+                account = _scheduler.acquire(ACCOUNT_TIMEOUT, holder=os.getpid())
+                try:
+                    bot = _bots[kind] = factory(account=account, **_bot_kwargs)
+                    _bot_accounts[kind] = account["name"]
+                except LoginError as e:
+                    print("Login with account {} failed: {}".format(account["name"], e))
+                    _scheduler.mark_failed(account["name"])
+                except Exception:
+                    _scheduler.mark_failed(account["name"], cooldown=START_COOLDOWN)
+                    raise
+                finally:
+                    _scheduler.release(account["name"], holder=os.getpid())
+        return bot
+
+
+@contextmanager
+def _leased_bot(kind):
+    """
+    Context manager yielding the bot to run a job of 'kind' on, a leased tab in tab mode.
+    With an account scheduler, a slot of the bot's account is held until the job is done.
+    """
+    bot = _get_bot(kind)
+    account = _bot_accounts.get(kind)
+    if account is not None:
+        _scheduler.acquire(ACCOUNT_TIMEOUT, name=account, holder=os.getpid())
+    try:
+        if not _tabs:
+            yield bot
+            return
+        with bot.leased(ACCOUNT_TIMEOUT) as tab:
+            yield tab
+    finally:
+        if account is not None:
+            _scheduler.release(account, holder=os.getpid())
+
+
+def run_job(job) -> dict:
+    """
+    Runs one job on the bot of the current process and returns its result record.
+    """
+    result = {"id": job.get("id"), "kind": job.get("kind"), "status": "failed", "link": None, "error": None, "worker": os.getpid()}
+    started = time()
+    try:
+        if job.get("invalid"):
+            raise ValueError(job["invalid"])
+        kind = job["kind"]
+        if kind not in ("image", "video"):
+            raise ValueError("Unknown job kind: {}".format(kind))
+
+        with _leased_bot(kind) as bot:
+            if kind in _bot_accounts:
+                result["account"] = _bot_accounts[kind]
+            result["timings"] = {"bot_ready": round(time() - started, 3)}
+
+            # A repeated job is answered from the result cache, without a render and outside the rate limit
+            if kind == "image":
+                cached = bot.cached("image", job.get("text"), job["media"]) if job.get("media") else None
+            else:
+                cached = bot.cached("video", job["text"], job["media"], folder=job.get("folder", ""))
+            if cached:
+                result["cached"] = True
+                result["link"] = cached.get("imagelink")
+            else:
+                if kind in _bot_accounts:
+                    # Waits for the rate limit of the account
+                    _scheduler.throttle(_bot_accounts[kind])
+
+                if kind == "image":
+                    if job.get("text") and not bot.change_text(job["text"]):
+                        raise RuntimeError("Failed to change the text")
+                    if job.get("media"):
+                        photo = bot.change_photo(job["media"])
+                        if not photo["imagelink"]:
+                            raise RuntimeError("Failed to change the photo")
+                        result["link"] = photo["imagelink"]
+                else:
+                    if not bot.change_video_text(job["text"]):
+                        raise RuntimeError("Failed to change the video text")
+                    if not bot.change_video(job["media"], job.get("folder", "")):
+                        raise RuntimeError("Failed to change the video")
+
+            if kind == "video" and job.get("folder"):
+                import DriveUpload
+                link = DriveUpload.get_file_download_link(job["text"].replace(" ", "_"))
+                result["link"] = link["downloadUrl"] if link else None
+
+        result["status"] = "ok"
+
+    except Exception as e:
+        result["error"] = str(e)
+
+    finished = time()
+    result.setdefault("timings", {})
+    result["timings"].update({"started": started, "finished": finished, "duration": round(finished - started, 3)})
+
+    if _metrics_dir:
+        import Instrumentation
+        try:
+            # One file per worker. The textfile collector rejects a series repeated in several files,
+            # so the series of every worker carry its pid
+            Instrumentation.tracer.export_metrics(os.path.join(_metrics_dir, "canvabot_{}.prom".format(os.getpid())), worker=os.getpid())
+        except Exception as e:
+            # The job is done, a failed export must not lose its result
+            print(e)
+    return result
+
+
+def _tab_worker(jobs, results, tabs, *init_args) -> None:
+    """
+    Worker process of tab mode: 'tabs' threads take jobs from the 'jobs' queue until they get None,
+    and run them on the tabs of the worker's browsers.
+    """
+    _init_worker(*init_args, tabs=tabs)
+
+    def work():
+        for job in iter(jobs.get, None):
+            results.put(run_job(job))
+
+    threads = [threading.Thread(target=work) for _ in range(tabs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _tab_results(jobs_path, workers, tabs, initargs):
+    """
+    Runs the jobs on 'workers' tab mode processes and yields every result as soon as its job finishes.
+    """
+    jobs, results = multiprocessing.Queue(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_tab_worker, args=(jobs, results, tabs) + initargs) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    count = 0
+    for job in read_jobs(jobs_path):
+        jobs.put(job)
+        count += 1
+    for _ in range(workers * tabs):
+        jobs.put(None)
+
+    received = 0
+    while received < count:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                print("Every worker exited, {} jobs have no result".format(count - received))
+                break
+            continue
+        received += 1
+        yield result
+    for process in processes:
+        process.join()
+
+
+def run_jobs(jobs_path, results_path, workers=2, trace_file=None, metrics_dir=None,
+             accounts_path="accounts.json", strategy="round_robin", tabs=0, cache=None, **bot_kwargs) -> dict:
+    """
+    Drains a JSONL job file across 'workers' processes, each owning its own logged-in bots,
+    and appends every result to 'results_path' as soon as the job finishes.
+
+    Args:
+    - jobs_path: Path of the JSONL job file.
+    - results_path: Path of the JSONL result file.
+    - workers: Number of worker processes (browsers per job kind).
+    - trace_file: JSONL file every worker appends its spans to (see Instrumentation.Tracer).
+    - metrics_dir: Directory every worker writes its span histograms to after each job, as "canvabot_<pid>.prom".
+    - accounts_path: accounts.json the workers' bots are spread over (see AccountScheduler), None to let every bot use the first account.
+    - strategy: Account assignment, "round_robin" or "least_loaded".
+    - tabs: Run this many jobs at once per worker, as tabs of one browser per job kind (see TabPool).
+      The account needs as many designs per kind. 0 runs one job at a time per worker and browser.
+    - cache: SQLite file of a ResultCache shared by the workers. Jobs repeating an earlier one are answered from it.
+    - bot_kwargs: Keyword arguments passed to CanvaImage/CanvaVideo.
+
+    Returns:
+    - A dictionary with the number of finished and failed jobs.
+
+    Example:
+    >>> run_jobs("jobs.jsonl", "results.jsonl", workers=4)
+    """
+    summary = {"ok": 0, "failed": 0, "cached": 0}
+    if cache:
+        bot_kwargs["cache"] = cache
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    # One scheduler process shared by all workers
+    manager = scheduler = None
+    if accounts_path:
+        from AccountScheduler import load_accounts, shared_scheduler
+        manager, scheduler = shared_scheduler(load_accounts(accounts_path), strategy=strategy)
+
+    initargs = (bot_kwargs, trace_file, metrics_dir, scheduler)
+    try:
+        with open(results_path, "a") as output:
+            if tabs:
+                results = _tab_results(jobs_path, workers, tabs, initargs)
+                pool = None
+            else:
+                pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+                results = pool.imap_unordered(run_job, read_jobs(jobs_path))
+            for result in results:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                summary[result["status"]] += 1
+                summary["cached"] += bool(result.get("cached"))
+                print("Job {} {}".format(result["id"], result["status"]))
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if scheduler is not None:
+            summary["accounts"] = scheduler.stats()
+    finally:
+        if manager is not None:
+            manager.shutdown()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run CanvaImage/CanvaVideo jobs from a JSONL file across parallel browsers.")
+    parser.add_argument("jobs", help="JSONL job file")
+    parser.add_argument("results", help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--trace", help="JSONL file the spans of every bot step are appended to")
+    parser.add_argument("--metrics", help="directory the per-worker span histograms are written to")
+    parser.add_argument("--accounts", default="accounts.json", help="accounts file the bots are spread over")
+    parser.add_argument("--strategy", choices=("round_robin", "least_loaded"), default="round_robin", help="account assignment")
+    parser.add_argument("--tabs", type=int, default=0, help="jobs run at once per worker, as tabs of one browser")
+    parser.add_argument("--cache", help="SQLite result cache, repeated jobs are answered from it")
+    args = parser.parse_args()
+
+    print(run_jobs(args.jobs, args.results, workers=args.workers, trace_file=args.trace, metrics_dir=args.metrics,
+                   accounts_path=args.accounts, strategy=args.strategy, tabs=args.tabs, cache=args.cache,
+                   headless=not args.headed))
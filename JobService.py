@@ -0,0 +1,466 @@
+import argparse, json, os, queue, signal, threading, uuid
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+import JobRunner
+
+# Jobs accepted but not yet started, submissions beyond it are answered with 429
+MAX_QUEUE = 100
+# Finished jobs whose status and result are kept for GET /jobs/<id>
+MAX_FINISHED = 10000
+# Seconds a client is asked to wait before submitting again when the queue is full
+RETRY_AFTER = 5
+# Seconds between two checks of the worker processes
+SUPERVISE_INTERVAL = 1
+# Seconds a worker and its browsers get to exit after SIGTERM before they are killed
+KILL_GRACE = 10
+
+
+def _service_worker(jobs, events, preload, tabs, *init_args) -> None:
+    """
+    Worker process of the service: runs the jobs received on the 'jobs' connection until it gets None, on 'tabs'
+    threads in tab mode, and sends ("started", id) and ("finished", id, result) on the 'events' connection.
+
+    The connections are the worker's own and it leads a process group of its own, which its Chrome and chromedriver
+    processes join, so the service can kill it with its browsers without leaving a lock shared with other workers held.
+    """
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    JobRunner._init_worker(*init_args, tabs=tabs)
+    receiving, sending = threading.Lock(), threading.Lock()
+
+    def send(*event):
+        with sending:
+            events.send(event)
+
+    # Log in before the first job arrives, so it does not pay for the browser start
+    for kind in preload:
+        try:
+            JobRunner._get_bot(kind)
+        except Exception as e:
+            print("Preloading the {} bot failed: {}".format(kind, e))
+
+    def work():
+        while True:
+            with receiving:
+                job = jobs.recv()
+            if job is None:
+                return
+            send("started", job["id"])
+            send("finished", job["id"], JobRunner.run_job(job))
+
+    threads = [threading.Thread(target=work) for _ in range(max(tabs, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class JobService:
+    def __init__(self, workers=2, max_queue=MAX_QUEUE, job_timeout=None, preload=("image",), trace_file=None,
+                 metrics_dir=None, accounts_path="accounts.json", strategy="round_robin", tabs=0, cache=None, **bot_kwargs) -> None:
+        """
+        JobService keeps logged-in CanvaImage/CanvaVideo workers running and feeds them jobs submitted
+        over HTTP (see serve), so a request costs a render instead of a browser start and a login.
+
+        Jobs wait in a bounded queue: once 'max_queue' jobs wait, submissions are refused (HTTP 429)
+        until the workers catch up. The service hands a job to a worker once it has a free thread.
+        Workers are separate processes supervised by the service: a worker that dies, or runs a job longer
+        than 'job_timeout', is killed together with its browsers and replaced, the account slots it held are
+        freed and the jobs handed to it are marked failed.
+
+        Jobs and their results are the same as those of JobRunner (see JobRunner.read_jobs and JobRunner.run_job).
+
+        Args:
+        - workers: Number of worker processes (browsers per job kind).
+        - max_queue: Largest number of jobs waiting for a worker.
+        - job_timeout: Seconds a job may run before its worker is replaced, no limit if None.
+        - preload: Job kinds whose bots every worker logs in before taking jobs.
+        - trace_file, metrics_dir, accounts_path, strategy, tabs, cache: As in JobRunner.run_jobs.
+        - bot_kwargs: Keyword arguments passed to CanvaImage/CanvaVideo.
+
+        Example:
+        >>> service = JobService(workers=2, job_timeout=1800)
+        >>> service.start()
+        >>> job = service.submit({"kind": "image", "text": "New Text Content", "media": "path/to/image.jpg"})
+        >>> service.status(job["id"])["status"]
+        'queued'
+        >>> service.stop()
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.preload = tuple(preload or ())
+        self.tabs = tabs
+        self.restarts = 0
+        if cache:
+            bot_kwargs["cache"] = cache
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+
+        self._manager = self._scheduler = None
+        if accounts_path:
+            from AccountScheduler import load_accounts, shared_scheduler
+            self._manager, self._scheduler = shared_scheduler(load_accounts(accounts_path), strategy=strategy)
+        self._initargs = (bot_kwargs, trace_file, metrics_dir, self._scheduler)
+
+        self._jobs = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        # Notified when a worker takes a job, finishes one, starts or exits
+        self._changed = threading.Condition(self._lock)
+        self._records = OrderedDict()
+        # Per worker pid: its (jobs, events) connections, the jobs handed to it and not finished, and why it is being replaced
+        self._connections = {}
+        self._running = {}
+        self._errors = {}
+        self._processes = []
+        # Set by stop: no jobs are taken or handed out anymore. Events are received until every worker is gone
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        """
+        Starts the worker processes and the threads supervising them.
+        """
+        self._processes = [self._start_worker() for _ in range(self.workers)]
+        self._threads = [threading.Thread(target=target, daemon=True) for target in (self._dispatch, self._receive, self._supervise)]
+        for thread in self._threads:
+            thread.start()
+
+    def _start_worker(self):
+        job_reader, job_writer = multiprocessing.Pipe(duplex=False)
+        event_reader, event_writer = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_service_worker, args=(job_reader, event_writer, self.preload, self.tabs) + self._initargs)
+        process.start()
+        # Only the worker keeps its ends, so its events connection reports EOF once the worker is gone
+        job_reader.close()
+        event_writer.close()
+        with self._lock:
+            self._connections[process.pid] = (job_writer, event_reader)
+            self._running[process.pid] = set()
+            self._changed.notify_all()
+        return process
+
+    def submit(self, job) -> dict:
+        """
+        Queues a job and returns its status record.
+
+        Raises:
+        - ValueError: Raised if the job is invalid or its id is already taken.
+        - queue.Full: Raised if 'max_queue' jobs are waiting.
+        """
+        if self._stopping.is_set():
+            raise RuntimeError("JobService is stopping")
+        if not isinstance(job, dict):
+            raise ValueError("A job is a JSON object")
+        if job.get("kind") not in ("image", "video"):
+            raise ValueError("Unknown job kind: {}".format(job.get("kind")))
+        if job["kind"] == "video" and not (job.get("text") and job.get("media")):
+            raise ValueError("Video jobs need a text and a media file")
+
+        job = dict(job)
+        job["id"] = str(job.get("id") or uuid.uuid4().hex)
+        with self._lock:
+            if job["id"] in self._records:
+                raise ValueError("Job {} already exists".format(job["id"]))
+            record = {"id": job["id"], "kind": job["kind"], "status": "queued", "submitted": time(),
+                      "started": None, "finished": None, "worker": None, "result": None}
+            self._records[job["id"]] = record
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._records[job["id"]]
+            raise
+        return dict(record)
+
+    def status(self, job_id):
+        """
+        Returns the status record of a job, None if it is unknown. 'status' is "queued", "running", "ok" or "failed",
+        and 'result' the JobRunner result once the job finished.
+        """
+        with self._lock:
+            record = self._records.get(str(job_id))
+            return dict(record) if record is not None else None
+
+    def health(self) -> dict:
+        """
+        Returns the number of live workers, worker restarts and jobs per status.
+        """
+        with self._lock:
+            jobs = {"queued": 0, "running": 0, "ok": 0, "failed": 0}
+            for record in self._records.values():
+                jobs[record["status"]] += 1
+        health = {
+            "workers": sum(process.is_alive() for process in self._processes),
+            "restarts": self.restarts,
+            "jobs": jobs,
+            # As submit sees it, jobs handed to a worker that has not started them yet do not count
+            "saturated": self._jobs.qsize() >= self.max_queue,
+        }
+        if self._scheduler is not None:
+            health["accounts"] = self._scheduler.stats()
+        return health
+
+    def _dispatch(self) -> None:
+        """
+        Hands the queued jobs to the workers with a free thread, the least busy first.
+        """
+        while not self._stopping.is_set():
+            try:
+                job = self._jobs.get(timeout=SUPERVISE_INTERVAL)
+            except queue.Empty:
+                continue
+
+            with self._changed:
+                while True:
+                    free = [pid for pid, running in self._running.items() if len(running) < max(self.tabs, 1)]
+                    if free or self._stopping.is_set():
+                        break
+                    self._changed.wait(SUPERVISE_INTERVAL)
+                if not free:
+                    if job["id"] in self._records:
+                        self._fail(self._records[job["id"]], "JobService stopped")
+                    return
+                pid = min(free, key=lambda pid: len(self._running[pid]))
+                self._running[pid].add(job["id"])
+                try:
+                    self._connections[pid][0].send(job)
+                except (OSError, ValueError) as e:
+                    # The worker is gone, the job fails with its other jobs once its events are read
+                    print(e)
+
+    def _receive(self) -> None:
+        """
+        Applies the events of the workers to the job records, and fails the jobs of a worker once it is gone.
+        It keeps going while stop waits for the workers, so the jobs they finish meanwhile keep their result.
+        """
+        while not self._stopped.is_set():
+            with self._lock:
+                readers = {connections[1]: pid for pid, connections in self._connections.items()}
+            for reader in wait(list(readers), SUPERVISE_INTERVAL):
+                pid = readers[reader]
+                try:
+                    event, *values = reader.recv()
+                except (EOFError, OSError):
+                    self._reap(pid)
+                    continue
+
+                with self._changed:
+                    if event == "finished":
+                        self._running.get(pid, set()).discard(values[0])
+                        self._changed.notify_all()
+                    record = self._records.get(values[0])
+                    if record is None:
+                        continue
+                    if event == "started":
+                        record.update(status="running", started=time(), worker=pid)
+                    else:
+                        record.update(status=values[1]["status"], finished=time(), result=values[1])
+                        self._forget()
+
+    def _reap(self, pid) -> None:
+        """
+        Fails the jobs handed to a worker that is gone. Its events are all read by then, so jobs it finished keep their result.
+        """
+        with self._changed:
+            error = self._errors.pop(pid, None) or "Worker {} exited".format(pid)
+            connections = self._connections.pop(pid, ())
+            for job_id in self._running.pop(pid, ()):
+                if job_id in self._records:
+                    self._fail(self._records[job_id], error)
+            self._changed.notify_all()
+        for connection in connections:
+            connection.close()
+
+    def _fail(self, record, error) -> None:
+        record.update(status="failed", finished=time(), result={"id": record["id"], "kind": record["kind"], "status": "failed",
+                                                                "link": None, "error": error, "worker": record["worker"]})
+        self._forget()
+
+    def _forget(self) -> None:
+        """
+        Drops the oldest finished jobs beyond MAX_FINISHED.
+        """
+        finished = [job_id for job_id, record in self._records.items() if record["finished"] is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self._records[job_id]
+
+    def _supervise(self) -> None:
+        """
+        Replaces workers that died or run a job past 'job_timeout', failing the jobs they were running.
+        """
+        while not self._stopping.wait(SUPERVISE_INTERVAL):
+            for index, process in enumerate(self._processes):
+                error = None
+                if not process.is_alive():
+                    error = "Worker {} exited with code {}".format(process.pid, process.exitcode)
+                elif self.job_timeout is not None:
+                    with self._lock:
+                        started = [self._records[job_id]["started"] for job_id in self._running.get(process.pid, ())
+                                   if job_id in self._records]
+                    if any(time() - value > self.job_timeout for value in started if value):
+                        error = "Job timed out after {} seconds".format(self.job_timeout)
+                if error is None or self._stopping.is_set():
+                    continue
+
+                print("{}, restarting it".format(error))
+                with self._lock:
+                    if process.pid in self._connections:
+                        self._errors[process.pid] = error
+                self._kill(process)
+                self._processes[index] = self._start_worker()
+                self.restarts += 1
+
+    def _kill(self, process) -> None:
+        """
+        Ends a worker with its browsers and frees the account slots it held.
+
+        SIGTERM, then SIGKILL after KILL_GRACE seconds, goes to the worker's process group, so Chrome and chromedriver
+        end with it instead of being left running. Elsewhere than on POSIX only the worker is terminated.
+        """
+        if hasattr(os, "killpg"):
+            for sig in (signal.SIGTERM, signal.SIGKILL):
+                try:
+                    os.killpg(process.pid, sig)
+                except OSError:
+                    # The group is gone already
+                    break
+                if sig == signal.SIGTERM:
+                    process.join(KILL_GRACE)
+        else:
+            process.terminate()
+        process.join()
+        if self._scheduler is not None:
+            try:
+                self._scheduler.release_holder(process.pid)
+            except Exception as e:
+                print(e)
+
+    def stop(self, timeout=60) -> None:
+        """
+        Stops taking jobs, lets every worker finish the jobs handed to it (up to 'timeout' seconds) and closes their browsers.
+        Jobs still queued are marked failed.
+        """
+        self._stopping.set()
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                if job["id"] in self._records:
+                    self._fail(self._records[job["id"]], "JobService stopped")
+        with self._changed:
+            self._changed.notify_all()
+            for connection, _ in self._connections.values():
+                try:
+                    for _ in range(max(self.tabs, 1)):
+                        connection.send(None)
+                except (OSError, ValueError):
+                    pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                self._kill(process)
+
+        # Every worker is gone, wait for their last events to be applied
+        with self._changed:
+            self._changed.wait_for(lambda: not self._connections, SUPERVISE_INTERVAL * 10)
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        # Jobs of workers whose events connection never closed
+        with self._lock:
+            pids = list(self._connections)
+            for pid in pids:
+                self._errors.setdefault(pid, "JobService stopped")
+        for pid in pids:
+            self._reap(pid)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def serve(self, host="127.0.0.1", port=8080) -> None:
+        """
+        Starts the service and answers HTTP requests on host:port until interrupted:
+        - POST /jobs: Queues the job in the JSON body, 202 with its status record, 429 when the queue is full.
+        - GET /jobs/<id>: Status record of a job, 404 if it is unknown.
+        - GET /health: Workers, restarts and jobs per status.
+        """
+        server = ThreadingHTTPServer((host, port), type("Handler", (_Handler,), {"service": self}))
+        self.start()
+        print("Serving jobs on http://{}:{}".format(host, port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            return self._reply(404, {"error": "Not found"})
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+            record = self.service.submit(job)
+        except queue.Full:
+            return self._reply(429, {"error": "Queue is full"}, {"Retry-After": str(RETRY_AFTER)})
+        except RuntimeError as e:
+            return self._reply(503, {"error": str(e)})
+        except ValueError as e:
+            return self._reply(400, {"error": str(e)})
+        self._reply(202, record, {"Location": "/jobs/{}".format(record["id"])})
+
+    def do_GET(self) -> None:
+        path = self.path.rstrip("/")
+        if path == "/health":
+            return self._reply(200, self.service.health())
+        if path.startswith("/jobs/"):
+            record = self.service.status(path[len("/jobs/"):])
+            if record is not None:
+                return self._reply(200, record)
+        self._reply(404, {"error": "Not found"})
+
+    def _reply(self, code, body, headers=None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve CanvaImage/CanvaVideo jobs over HTTP from long-running workers.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes")
+    parser.add_argument("--queue", type=int, default=MAX_QUEUE, help="jobs waiting before submissions are refused")
+    parser.add_argument("--job-timeout", type=float, help="seconds a job may run before its worker is replaced")
+    parser.add_argument("--preload", default="image", help="comma separated job kinds logged in at start")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--trace", help="JSONL file the spans of every bot step are appended to")
+    parser.add_argument("--metrics", help="directory the per-worker span histograms are written to")
+    parser.add_argument("--accounts", default="accounts.json", help="accounts file the bots are spread over")
+    parser.add_argument("--strategy", choices=("round_robin", "least_loaded"), default="round_robin", help="account assignment")
+    parser.add_argument("--tabs", type=int, default=0, help="jobs run at once per worker, as tabs of one browser")
+    parser.add_argument("--cache", help="SQLite result cache, repeated jobs are answered from it")
+    args = parser.parse_args()
+
+    JobService(workers=args.workers, max_queue=args.queue, job_timeout=args.job_timeout,
+               preload=[kind for kind in args.preload.split(",") if kind], trace_file=args.trace, metrics_dir=args.metrics,
+               accounts_path=args.accounts, strategy=args.strategy, tabs=args.tabs, cache=args.cache,
+               headless=not args.headed).serve(args.host, args.port)
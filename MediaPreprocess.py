@@ -0,0 +1,189 @@
+import hashlib, json, os, shutil, subprocess, threading
+from collections import OrderedDict
+from uuid import uuid4
+from MediaValidator import validate_media, MediaValidationError
+
+# Pillow is optional, without it images are uploaded unchanged
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+CACHE_DIR = "media_cache"
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+HASH_CHUNK = 1024 * 1024
+# Digests remembered by file_digest, the least recently used are forgotten beyond it
+MAX_DIGESTS = 10000
+
+# SHA-256 of files by (path, size, modification time), shared by every user of file_digest
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def file_digest(path) -> str:
+    """
+    Returns the SHA-256 of the file content. Digests are remembered per path, size and modification time,
+    so a file is only read again after it has changed. At most MAX_DIGESTS digests are remembered.
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if signature in _digests:
+            _digests.move_to_end(signature)
+            return _digests[signature]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    with _digests_lock:
+        _digests[signature] = digest.hexdigest()
+        while len(_digests) > MAX_DIGESTS:
+            _digests.popitem(last=False)
+    return digest.hexdigest()
+
+
+class MediaPreprocessor:
+    def __init__(self, cache_dir=CACHE_DIR, max_cache_bytes=MAX_CACHE_BYTES, jpeg_quality=85,
+                 video_crf=23, video_preset="veryfast", max_video_bitrate=8_000_000, ffmpeg=None) -> None:
+        """
+        MediaPreprocessor shrinks media to the size of the design before it is uploaded to Canva.
+
+        Images larger than the target size are resized and recompressed with Pillow. Videos larger than the
+        target size, or above 'max_video_bitrate', are transcoded to H.264 with a local ffmpeg. Without Pillow
+        or ffmpeg the original file is uploaded. Results are cached on disk by the SHA-256 of the input
+        and the settings, so repeated inputs are processed once. The least recently used results are evicted
+        once the cache grows beyond 'max_cache_bytes'.
+
+        Args:
+        - cache_dir: Directory of the processed files.
+        - max_cache_bytes: Largest total size of the cache directory.
+        - jpeg_quality: Quality of recompressed JPEG images (1-95).
+        - video_crf: H.264 constant rate factor of transcoded videos, lower is better quality.
+        - video_preset: x264 preset, slower presets give smaller files.
+        - max_video_bitrate: Videos above this bitrate (bits/s) are transcoded even if they fit the target size.
+        - ffmpeg: Path of the ffmpeg executable, found on PATH by default.
+
+        Example:
+        >>> preprocessor = MediaPreprocessor(max_cache_bytes=512 * 1024 ** 2)
+        >>> bot = CanvaImage(preprocess=preprocessor)
+        >>> preprocessor.process("photo.jpg", (1080, 1080))
+        '/abs/path/media_cache/5f0c...e1.jpg'
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_cache_bytes = max_cache_bytes
+        self.jpeg_quality = jpeg_quality
+        self.video_crf = video_crf
+        self.video_preset = video_preset
+        self.max_video_bitrate = max_video_bitrate
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def process(self, path, size) -> str:
+        """
+        Returns the path of the file to upload for 'path': a cached smaller copy fitting into 'size' (width, height),
+        or the original when it already fits, can not be processed or processing would not make it smaller.
+        """
+        try:
+            media = validate_media(path)
+        except MediaValidationError as e:
+            print(e)
+            return path
+
+        if media["kind"] == "mp4":
+            bitrate = media["size"] * 8 / media["duration"] if media["duration"] else 0
+            if self.ffmpeg is None or (_fits(media, size) and bitrate <= self.max_video_bitrate):
+                return path
+            extensions, settings, convert = (".mp4",), [self.video_crf, self.video_preset, self.max_video_bitrate], self._transcode
+        else:
+            if Image is None or (_fits(media, size) and media["kind"] == "jpeg"):
+                return path
+            # Transparent PNGs stay PNG, everything else becomes JPEG
+            extensions, settings, convert = (".jpg", ".png"), [self.jpeg_quality], self._resize
+
+        key = hashlib.sha256(json.dumps([file_digest(path), list(size), settings]).encode()).hexdigest()
+        for extension in extensions + (".skip",):
+            cached = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(cached):
+                # Mark as recently used for the eviction
+                os.utime(cached)
+                return path if extension == ".skip" else cached
+
+        temporary = os.path.join(self.cache_dir, "{}.{}.tmp".format(key, uuid4().hex))
+        try:
+            output_extension = convert(path, temporary, size)
+            if os.path.getsize(temporary) >= media["size"]:
+                # Not worth it, remember to upload the original
+                open(os.path.join(self.cache_dir, key + ".skip"), "w").close()
+                return path
+            output = os.path.join(self.cache_dir, key + output_extension)
+            os.replace(temporary, output)
+            self._evict(keep=key + output_extension)
+            return output
+        except Exception as e:
+            print("Preprocessing {} failed: {}".format(path, e))
+            return path
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def _resize(self, path, output, size) -> str:
+        with Image.open(path) as image:
+            # The output has no EXIF, apply its rotation to the pixels before fitting them
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(size, Image.LANCZOS)
+            if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+                image.save(output, "PNG", optimize=True)
+                return ".png"
+            image.convert("RGB").save(output, "JPEG", quality=self.jpeg_quality, optimize=True, progressive=True)
+            return ".jpg"
+
+    def _transcode(self, path, output, size) -> str:
+        width, height = size
+        # Fit into the target size without upscaling, H.264 needs even dimensions
+        scale = "scale='min({},iw)':'min({},ih)':force_original_aspect_ratio=decrease,scale=trunc(iw/2)*2:trunc(ih/2)*2".format(width, height)
+        subprocess.run([
+            self.ffmpeg, "-y", "-v", "error", "-i", path,
+            "-vf", scale,
+            "-c:v", "libx264", "-preset", self.video_preset, "-crf", str(self.video_crf),
+            "-maxrate", str(self.max_video_bitrate), "-bufsize", str(2 * self.max_video_bitrate),
+            "-c:a", "aac", "-b:a", "128k",
+            "-movflags", "+faststart", "-f", "mp4", output,
+        ], check=True, capture_output=True)
+        validate_media(output, kinds=("mp4",))
+        return ".mp4"
+
+    def _evict(self, keep=None) -> None:
+        """
+        Removes the least recently used files, except 'keep', until the cache fits into 'max_cache_bytes'.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _fits(media, size) -> bool:
+    if not media.get("width"):
+        return False
+    width, height = size
+    # EXIF orientations 5 to 8 turn the image by 90 degrees
+    shown = (media["height"], media["width"]) if media.get("orientation", 1) >= 5 else (media["width"], media["height"])
+    return shown[0] <= width and shown[1] <= height
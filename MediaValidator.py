@@ -0,0 +1,206 @@
+import mmap, os, struct
+
+# Top-level MP4 boxes every playable file needs
+REQUIRED_BOXES = (b"ftyp", b"moov", b"mdat")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers carrying the image size (not DHT, JPG and DAC)
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class MediaValidationError(ValueError):
+    """
+    Raised when a media file is missing, truncated or not a valid MP4, JPEG or PNG file.
+    """
+
+
+def validate_media(path, kinds=None) -> dict:
+    """
+    Checks the container structure of a media file without reading it into memory and returns its metadata.
+
+    The file is memory-mapped and only headers are touched: the box tree of MP4/MOV files, the segment
+    headers and end marker of JPEG files and the chunk headers of PNG files. Checking a multi-gigabyte video
+    takes milliseconds, so broken files are rejected before they are uploaded to Canva.
+
+    Args:
+    - path: Path of the media file.
+    - kinds: Accepted kinds ("mp4", "jpeg", "png"), any of them if None.
+
+    Returns:
+    - dict: {'kind', 'size'} plus 'width' and 'height' in px (as stored, before any EXIF rotation),
+      for videos 'duration' in seconds and 'brand', and for JPEG images the EXIF 'orientation' (1-8, 1 if there is none).
+
+    Raises:
+    - MediaValidationError: Raised if the file is missing, of another kind or corrupt.
+
+    Example:
+    >>> validate_media("video.mp4", kinds=("mp4",))
+    {'kind': 'mp4', 'size': 1048576, 'brand': 'isom', 'duration': 10.0, 'width': 1080, 'height': 1920}
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError as e:
+        raise MediaValidationError("{}: {}".format(path, e.strerror))
+    if size == 0:
+        raise MediaValidationError("{}: empty file".format(path))
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:3] == b"\xff\xd8\xff":
+            kind, parse = "jpeg", _parse_jpeg
+        elif data[:8] == PNG_SIGNATURE:
+            kind, parse = "png", _parse_png
+        elif data[4:8] == b"ftyp":
+            kind, parse = "mp4", _parse_mp4
+        else:
+            raise MediaValidationError("{}: not an MP4, JPEG or PNG file".format(path))
+
+        if kinds is not None and kind not in kinds:
+            raise MediaValidationError("{}: expected {}, got {}".format(path, " or ".join(kinds), kind))
+
+        try:
+            metadata = parse(data, size)
+        except (struct.error, IndexError):
+            raise MediaValidationError("{}: truncated {} header".format(path, kind))
+        except MediaValidationError as e:
+            raise MediaValidationError("{}: {}".format(path, e))
+
+    return dict({"kind": kind, "size": size}, **metadata)
+
+
+def _boxes(data, start, end):
+    """
+    Yields (type, payload start, box end) of the boxes between 'start' and 'end', checking that every box fits.
+    """
+    offset = start
+    while offset < end:
+        if end - offset < 8:
+            raise MediaValidationError("{} stray bytes after the last box".format(end - offset))
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size, = struct.unpack_from(">Q", data, offset + 8)
+            header = 16
+        elif size == 0:
+            # The box extends to the end of its parent
+            size = end - offset
+        if size < header:
+            raise MediaValidationError("invalid size {} of '{}' box".format(size, kind.decode("latin-1")))
+        if offset + size > end:
+            raise MediaValidationError("'{}' box ends {} bytes after its container, the file is truncated".format(kind.decode("latin-1"), offset + size - end))
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def _parse_mp4(data, size) -> dict:
+    top = {}
+    for kind, start, end in _boxes(data, 0, size):
+        if not top and kind != b"ftyp":
+            raise MediaValidationError("first box is '{}', not 'ftyp'".format(kind.decode("latin-1")))
+        top.setdefault(kind, (start, end))
+
+    missing = [kind.decode() for kind in REQUIRED_BOXES if kind not in top]
+    if missing:
+        raise MediaValidationError("missing '{}' box".format("', '".join(missing)))
+
+    metadata = {"brand": data[top[b"ftyp"][0]:top[b"ftyp"][0] + 4].decode("latin-1").strip(), "duration": None, "width": None, "height": None}
+    for kind, start, end in _boxes(data, *top[b"moov"]):
+        if kind == b"mvhd":
+            if data[start] == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, start + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, start + 12)
+            if not timescale:
+                raise MediaValidationError("'mvhd' box has a zero timescale")
+            metadata["duration"] = duration / timescale
+        elif kind == b"trak" and metadata["width"] is None:
+            for child, child_start, child_end in _boxes(data, start, end):
+                if child == b"tkhd":
+                    offset = child_start + (88 if data[child_start] == 1 else 76)
+                    width, height = struct.unpack_from(">II", data, offset)
+                    # Audio tracks have no size, keep looking for the video track
+                    if width and height:
+                        metadata["width"], metadata["height"] = width >> 16, height >> 16
+
+    if metadata["duration"] is None:
+        raise MediaValidationError("'moov' box has no 'mvhd' box")
+    return metadata
+
+
+def _parse_jpeg(data, size) -> dict:
+    # Encoders may pad the file after the end-of-image marker
+    end = size
+    while end > 2 and data[end - 1] == 0:
+        end -= 1
+    if data[end - 2:end] != b"\xff\xd9":
+        raise MediaValidationError("missing JPEG end-of-image marker, the file is truncated")
+
+    width = height = None
+    orientation = 1
+    offset = 2
+    while offset < end:
+        if data[offset] != 0xFF:
+            raise MediaValidationError("invalid JPEG segment at byte {}".format(offset))
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before the marker
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length, = struct.unpack_from(">H", data, offset + 2)
+        if length < 2 or offset + 2 + length > end:
+            raise MediaValidationError("JPEG segment at byte {} exceeds the file".format(offset))
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, offset + 5)
+        if marker == 0xE1:
+            orientation = _exif_orientation(data[offset + 4:offset + 2 + length])
+        if marker == 0xDA:
+            # Entropy-coded data follows the start-of-scan header up to the end marker
+            break
+        offset += 2 + length
+
+    if not width or not height:
+        raise MediaValidationError("JPEG has no frame header before its image data")
+    return {"width": width, "height": height, "orientation": orientation}
+
+
+def _exif_orientation(segment) -> int:
+    """
+    Returns the orientation tag of an APP1 segment, 1 if it is not EXIF or has none. A broken EXIF block does not make the image invalid.
+    """
+    if segment[:6] != b"Exif\0\0":
+        return 1
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    try:
+        ifd, = struct.unpack_from(order + "I", tiff, 4)
+        count, = struct.unpack_from(order + "H", tiff, ifd)
+        for entry in range(ifd + 2, ifd + 2 + 12 * count, 12):
+            tag, _, _, value = struct.unpack_from(order + "HHIH", tiff, entry)
+            if tag == 0x0112:
+                return value if 1 <= value <= 8 else 1
+    except (TypeError, struct.error):
+        pass
+    return 1
+
+
+def _parse_png(data, size) -> dict:
+    offset = 8
+    width = height = None
+    while True:
+        if offset + 12 > size:
+            raise MediaValidationError("PNG ends without an 'IEND' chunk, the file is truncated")
+        length, kind = struct.unpack_from(">I4s", data, offset)
+        if offset + 12 + length > size:
+            raise MediaValidationError("'{}' chunk exceeds the file, the file is truncated".format(kind.decode("latin-1")))
+        if width is None:
+            if kind != b"IHDR" or length != 13:
+                raise MediaValidationError("first PNG chunk is not 'IHDR'")
+            width, height = struct.unpack_from(">II", data, offset + 8)
+        offset += 12 + length
+        if kind == b"IEND":
+            break
+
+    if not width or not height:
+        raise MediaValidationError("PNG has a zero width or height")
+    return {"width": width, "height": height}
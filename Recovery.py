@@ -0,0 +1,110 @@
+from time import sleep
+
+# Recovery actions, from the cheapest to the most expensive
+RETRY = "retry"
+RELOAD = "reload"
+RESTART = "restart"
+
+
+class RecoveryPolicy:
+    def __init__(self, retries=1, reloads=1, restarts=1, delay=1) -> None:
+        """
+        RecoveryPolicy decides how a bot recovers from a failed step of an operation, inside the same session
+        instead of throwing the browser away.
+
+        A failed step is first retried after dismissing open menus, then after reloading the editor, and only
+        then after restarting the browser (a new Chrome, logged in with the saved session, on the same design).
+        Steps completed before the failure are not repeated. Steps that do not use the browser, e.g. the Drive
+        sync, are only retried.
+
+        Args:
+        - retries: Times a failed step is retried in place.
+        - reloads: Times the editor is reloaded and the step retried once the retries are used up.
+        - restarts: Times the browser is restarted and the step retried once the reloads are used up.
+        - delay: Seconds waited before every attempt after a failure.
+
+        Example:
+        >>> bot = CanvaVideo(recovery=RecoveryPolicy(retries=2, reloads=1, restarts=0))
+        """
+        self.retries = retries
+        self.reloads = reloads
+        self.restarts = restarts
+        self.delay = delay
+
+    def actions(self, browser=True) -> list:
+        """
+        Returns the recovery actions for one failing step in the order they are tried, only retries for steps without 'browser'.
+        """
+        actions = [RETRY] * self.retries
+        if browser:
+            actions += [RELOAD] * self.reloads + [RESTART] * self.restarts
+        return actions
+
+
+# Policy of bots created without one
+DEFAULT_POLICY = RecoveryPolicy()
+# Fails an operation at its first failing step
+NO_RECOVERY = RecoveryPolicy(retries=0, reloads=0, restarts=0)
+
+
+class Checkpoints:
+    def __init__(self, bot, operation, key=(), browser=True) -> None:
+        """
+        Checkpoints holds the completed steps of one run of a bot operation and the values they returned.
+
+        An operation that failed keeps its checkpoints on the bot, and running it again with the same
+        arguments skips the steps completed before, e.g. a video whose export failed is not uploaded again.
+
+        Args:
+        - bot: CanvaBot the operation runs on, it provides the recovery policy and the recovery actions.
+        - operation: Name of the operation, e.g. "change_photo".
+        - key: Arguments identifying the run, a run with other arguments starts over.
+        - browser: False for operations that do not use the browser.
+        """
+        self.bot = bot
+        self.operation = operation
+        self.key = key
+        self.browser = browser
+        self.done = {}
+        self.failed = False
+        self._steps = {}
+
+    def run(self, name, step, needs=(), browser=True):
+        """
+        Runs step() as the step 'name' of the operation and returns its value. A completed step is not run again.
+
+        A failing step is recovered with the actions of the bot's recovery policy (see RecoveryPolicy),
+        and its exception is raised again once they are used up.
+
+        Args:
+        - name: Step name, unique within the operation.
+        - step: Callable without arguments.
+        - needs: Earlier steps whose state in the editor the step relies on, e.g. an open panel.
+          They run again before the step after the editor is reloaded or the browser restarted.
+        - browser: False for steps that do not use the browser, they are only retried.
+        """
+        self._steps[name] = step
+        if name in self.done:
+            return self.done[name]
+
+        policy = self.bot.recovery
+        actions = policy.actions(browser)
+        rerun = False
+        while True:
+            try:
+                if rerun:
+                    for dependency in needs:
+                        self.done[dependency] = self._steps[dependency]()
+                    rerun = False
+                self.done[name] = step()
+                return self.done[name]
+            except Exception as e:
+                if not actions:
+                    raise
+                action = actions.pop(0)
+                print("{} failed at step '{}': {}. Recovering with {}".format(self.operation, name, e, action))
+                sleep(policy.delay)
+                # Steps without the browser may run next to a browser step of another thread, e.g. in VideoPipeline
+                if browser:
+                    self.bot.recover(action, step=name)
+                rerun = rerun or action != RETRY
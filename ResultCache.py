@@ -0,0 +1,121 @@
+import hashlib, json, os, sqlite3, threading
+from time import time
+from MediaPreprocess import file_digest
+
+CACHE_FILE = "result_cache.sqlite"
+# Seconds a result stays valid, Canva download links expire
+DEFAULT_TTL = 24 * 3600
+MAX_ENTRIES = 10000
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES) -> None:
+        """
+        ResultCache remembers the results of renders in a SQLite file, so a job repeating an earlier one
+        (same design, text and media content) costs a hash lookup instead of a Canva render.
+
+        Results are keyed by the design URL, the kind of render, the text, the SHA-256 of the media file
+        and render options such as the Drive folder. Results expire after 'ttl' seconds, and the least
+        recently used results are evicted beyond 'max_entries'. Several processes can share one file.
+
+        Args:
+        - path: SQLite file of the cache.
+        - ttl: Seconds a result is returned after it was stored, forever if None.
+        - max_entries: Largest number of results kept.
+
+        Example:
+        >>> cache = ResultCache(ttl=3600)
+        >>> bot = CanvaImage(cache=cache)
+        >>> bot.change_text("New Text Content")
+        >>> bot.change_photo("path/to/image.jpg")  # renders
+        >>> bot.change_photo("path/to/image.jpg")  # returned from the cache
+        {'imagelink': 'https://...', 'imagepath': '...', 'media': {...}, 'cached': True}
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        # Readers do not block the writing process
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    @staticmethod
+    def key(design, kind, text, media=None, **options) -> str:
+        """
+        Returns the cache key of rendering 'text' and the media file 'media' (or None) on 'design'.
+        'options' are further render settings that change the result, e.g. folder="...".
+        """
+        digest = file_digest(media) if media else None
+        return hashlib.sha256(json.dumps([design, kind, text, digest, options], sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the result stored under 'key', None if there is none, it has expired or a file it names is gone.
+        """
+        now = time()
+        with self._lock:
+            row = self._connection.execute("SELECT result, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+            result = json.loads(row[0]) if row is not None else None
+            # A result pointing at a deleted or moved file is no longer usable
+            if result is not None and any(path and not os.path.exists(path) for path in _paths(result)):
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                result = None
+
+            if result is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return result
+
+    def put(self, key, result) -> None:
+        """
+        Stores 'result' (a JSON serializable dictionary) under 'key' and evicts expired and least recently used results.
+        """
+        now = time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, result, created, used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now),
+            )
+            if self.ttl is not None:
+                self._connection.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM results")
+
+    def stats(self) -> dict:
+        """
+        Returns the number of stored results ('entries') and the 'hits' and 'misses' of this instance.
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def _paths(result) -> list:
+    """
+    Local files a result names, they have to exist for the result to be returned.
+    """
+    return [result.get(key) for key in ("imagepath", "path")]
@@ -0,0 +1,370 @@
+import queue, threading
+from contextlib import contextmanager
+from time import monotonic, sleep
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.remote.command import Command
+
+# Element lookups a tab's implicit wait applies to, and those answering with a list instead of raising
+_FIND_COMMANDS = (Command.FIND_ELEMENT, Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENT, Command.FIND_CHILD_ELEMENTS)
+_FIND_MANY = (Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENTS)
+# Session commands that do not act on a window
+_WINDOWLESS = (Command.NEW_WINDOW, Command.W3C_GET_WINDOW_HANDLES, Command.GET_TIMEOUTS, Command.SET_TIMEOUTS, Command.QUIT)
+# Polling interval of emulated implicit waits in seconds, growing by 1.5 up to the maximum
+MIN_POLL = 0.05
+MAX_POLL = 0.5
+
+# Marks the end of the results of TabPool.map
+_DONE = object()
+
+
+class TabBrowser:
+    def __init__(self, bot=None, **bot_kwargs) -> None:
+        """
+        TabBrowser shares one logged-in Chrome between several editor tabs, so every additional design
+        costs a tab instead of a browser process and a login.
+
+        All WebDriver commands of the browser go through one dispatcher. Each thread is bound to a tab
+        (see bind and tab) and every command is sent to the tab of the thread that sends it, switching
+        windows when another tab sent the previous command. Commands are sent one at a time, so tabs
+        interleave between commands: while one tab waits for an upload or an export, the others keep working.
+
+        Implicit waits are kept per thread and emulated: a lookup is retried without holding the browser,
+        instead of blocking every tab inside chromedriver.
+
+        Args:
+        - bot: Logged-in CanvaBot whose browser is shared, a new CanvaBot if None.
+        - bot_kwargs: Keyword arguments passed to the new CanvaBot (headless, session_file, account, login_hook, ...).
+
+        Example:
+        >>> browser = TabBrowser(headless=True)
+        >>> bot = CanvaImage(browser=browser, design_url="https://www.canva.com/design/.../edit")
+        >>> bot.change_text("New Text Content")
+        """
+        if bot is None:
+            from CanvaBot import CanvaBot
+            bot = CanvaBot(**bot_kwargs)
+        self.bot = bot
+        self.driver = bot.driver
+        self.downloads = bot.downloads
+        self._execute = bot.driver.execute
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tabs = set()
+        # Threads not bound to a tab use the window of the logged-in bot
+        self._home = self._current = self._execute(Command.W3C_GET_CURRENT_WINDOW_HANDLE)["value"]
+        self._execute(Command.SET_TIMEOUTS, {"implicit": 0})
+        bot.driver.execute = self.execute
+
+    def open_tab(self) -> "_TabDriver":
+        """
+        Opens a new tab, binds the current thread to it and returns its driver.
+        """
+        with self._lock:
+            handle = self._execute(Command.NEW_WINDOW, {"type": "tab"})["value"]["handle"]
+            self._tabs.add(handle)
+        self.bind(handle)
+        return _TabDriver(self, handle)
+
+    def close_tab(self, handle) -> None:
+        """
+        Closes a tab opened by open_tab.
+        """
+        with self._lock:
+            if handle not in self._tabs:
+                return
+            self._tabs.discard(handle)
+            try:
+                if self._current != handle:
+                    self._execute(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                self._execute(Command.CLOSE)
+            finally:
+                self._current = None
+
+    def bind(self, handle) -> None:
+        """
+        Sends the following commands of the current thread to the tab 'handle', None for the window of the logged-in bot.
+        """
+        self._local.handle = handle
+
+    @contextmanager
+    def tab(self, handle):
+        """
+        Context manager binding the current thread to the tab 'handle' and restoring the previous binding on exit.
+        """
+        previous = getattr(self._local, "handle", None)
+        self.bind(handle)
+        try:
+            yield
+        finally:
+            self.bind(previous)
+
+    def is_healthy(self) -> bool:
+        """
+        Checks that the shared browser is still running and logged in.
+        """
+        with self.tab(None):
+            return self.bot.is_healthy()
+
+    def execute(self, driver_command, params=None):
+        """
+        Replaces driver.execute: sends a command to the tab of the current thread.
+        """
+        local = self._local
+        if driver_command == Command.SET_TIMEOUTS and params and "implicit" in params:
+            local.implicit = params["implicit"] / 1000
+            params = {key: value for key, value in params.items() if key != "implicit"}
+            if not params:
+                return {"value": None}
+
+        implicit = getattr(local, "implicit", 0)
+        if driver_command not in _FIND_COMMANDS or not implicit:
+            return self._send(driver_command, params)
+
+        # Retry the lookup until the implicit wait of the tab ends, other tabs use the browser in between
+        deadline = monotonic() + implicit
+        interval = MIN_POLL
+        while True:
+            try:
+                response = self._send(driver_command, params)
+                if driver_command not in _FIND_MANY or response["value"] or monotonic() > deadline:
+                    return response
+            except NoSuchElementException:
+                if monotonic() > deadline:
+                    raise
+            sleep(interval)
+            interval = min(interval * 1.5, MAX_POLL)
+
+    def _send(self, driver_command, params):
+        handle = getattr(self._local, "handle", None) or self._home
+        with self._lock:
+            if driver_command == Command.SWITCH_TO_WINDOW:
+                # The thread moves to the other window, e.g. a sign-in popup
+                response = self._execute(driver_command, params)
+                self._current = params["handle"]
+                if getattr(self._local, "handle", None):
+                    self.bind(params["handle"])
+                else:
+                    self._home = params["handle"]
+                return response
+
+            if self._current != handle and driver_command not in _WINDOWLESS:
+                self._execute(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                self._current = handle
+            response = self._execute(driver_command, params)
+            if driver_command == Command.CLOSE:
+                self._current = None
+            elif driver_command == Command.GET_TIMEOUTS:
+                response["value"]["implicit"] = int(getattr(self._local, "implicit", 0) * 1000)
+            return response
+
+    def close(self) -> None:
+        """
+        Closes the browser with all its tabs.
+        """
+        self.bot.Close()
+
+
+class _TabDriver:
+    """
+    Driver of one tab: the shared driver, except that quit closes only the tab.
+    """
+    def __init__(self, browser, handle) -> None:
+        self.browser = browser
+        self.handle = handle
+
+    def __getattr__(self, name):
+        return getattr(self.browser.driver, name)
+
+    def quit(self) -> None:
+        self.browser.close_tab(self.handle)
+
+
+class TabPool:
+    def __init__(self, bot_class, design_urls=None, size=None, browser=None, **bot_kwargs) -> None:
+        """
+        TabPool keeps one CanvaImage or CanvaVideo per design as tabs of a single logged-in browser,
+        the multi-tab counterpart of BrowserPool. A host runs as many tabs as its CPU allows instead of
+        as many browsers as its memory allows.
+
+        Every tab needs its own design, tabs editing the same design would overwrite each other.
+        Downloads of the tabs are told apart by the design title (see DownloadManager), so concurrent jobs
+        should give their designs different titles.
+
+        Args:
+        - bot_class: CanvaImage, CanvaVideo or another CanvaBot subclass.
+        - design_urls: Designs opened in the tabs, by default the designs the account lists for 'bot_class'
+          ("canvaimage" or "canvavideo" in "accounts.json" may hold a list of URLs).
+        - size: Number of tabs, every design of 'design_urls' if None.
+        - browser: TabBrowser the tabs are opened in, a new one is started and closed with the pool if None.
+        - bot_kwargs: Keyword arguments passed to the TabBrowser and to 'bot_class'.
+
+        A thread leasing a bot is bound to its tab until the bot is returned. Leased bots are health
+        checked and reset when they are returned, tabs failing either are closed and reopened on the next lease.
+
+        Example:
+        >>> pool = TabPool(CanvaImage, ["https://www.canva.com/design/A/edit", "https://www.canva.com/design/B/edit"])
+        >>> for index, result, error in pool.map(lambda bot, text: bot.change_text(text), ["First", "Second"]):
+        ...     print(index, result, error)
+        >>> pool.close()
+        """
+        self.bot_class = bot_class
+        self.bot_kwargs = bot_kwargs
+        self._own_browser = browser is None
+        self.browser = browser or TabBrowser(**bot_kwargs)
+
+        if design_urls is None:
+            design_urls = self.browser.bot.acc_dict[bot_class.design_key]
+        if isinstance(design_urls, str):
+            design_urls = [design_urls]
+        if size is not None:
+            if size > len(design_urls):
+                raise ValueError("{} tabs need {} designs, got {}".format(size, size, len(design_urls)))
+            design_urls = design_urls[:size]
+        self.design_urls = list(design_urls)
+        self.size = len(self.design_urls)
+        self._idle = queue.Queue()
+        self._closed = False
+
+        # Designs load in parallel, each tab waits for its own editor
+        bots = {}
+        threads = [threading.Thread(target=lambda url=url: bots.update({url: self._new_bot(url)})) for url in self.design_urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for url in self.design_urls:
+            self._idle.put(bots[url] or url)
+
+    def _new_bot(self, url):
+        """
+        Opens a tab on 'url', returns None if it failed so the tab is retried on the next lease.
+        """
+        try:
+            return self.bot_class(browser=self.browser, **dict(self.bot_kwargs, design_url=url))
+        except Exception as e:
+            print(e)
+            return None
+        finally:
+            self.browser.bind(None)
+
+    def lease(self, timeout=None):
+        """
+        Takes a ready bot out of the pool, waiting up to 'timeout' seconds for one to be returned,
+        and binds the current thread to its tab.
+
+        Raises:
+        - queue.Empty: Raised if no bot is returned within 'timeout'.
+        - RuntimeError: Raised if the pool is closed or a replacement tab can not be opened.
+        """
+        if self._closed:
+            raise RuntimeError("TabPool is closed")
+
+        bot = self._idle.get(timeout=timeout)
+        if isinstance(bot, str):
+            url, bot = bot, self._new_bot(bot)
+            if bot is None:
+                self._idle.put(url)
+                raise RuntimeError("Failed to open a replacement tab for {}".format(url))
+
+        self.browser.bind(bot.driver.handle)
+        return bot
+
+    def release(self, bot) -> None:
+        """
+        Returns a leased bot to the pool after a health check and a reset to its starting state,
+        and unbinds the current thread from its tab.
+        """
+        try:
+            healthy = not self._closed and bot.is_healthy() and bot.reset()
+        finally:
+            self.browser.bind(None)
+
+        if healthy:
+            self._idle.put(bot)
+            return
+
+        self._close_bot(bot)
+        if not self._closed:
+            self._idle.put(bot.design_url)
+
+    @contextmanager
+    def leased(self, timeout=None):
+        """
+        Context manager leasing a bot and returning it to the pool on exit.
+        """
+        bot = self.lease(timeout)
+        try:
+            yield bot
+        finally:
+            self.release(bot)
+
+    def map(self, func, items):
+        """
+        Calls func(bot, item) for every item, running as many calls at once as the pool has tabs,
+        and yields (index, result, error) as soon as each call finishes. 'error' is the exception
+        raised by 'func' (result None), or None.
+        """
+        pending = queue.Queue()
+        for index, item in enumerate(items):
+            pending.put((index, item))
+        results = queue.Queue()
+
+        def work():
+            try:
+                while True:
+                    try:
+                        index, item = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        with self.leased() as bot:
+                            results.put((index, func(bot, item), None))
+                    except Exception as e:
+                        results.put((index, None, e))
+            finally:
+                results.put(_DONE)
+
+        workers = [threading.Thread(target=work, daemon=True) for _ in range(min(self.size, pending.qsize()))]
+        for worker in workers:
+            worker.start()
+
+        finished = 0
+        while finished < len(workers):
+            result = results.get()
+            if result is _DONE:
+                finished += 1
+            else:
+                yield result
+
+    def is_healthy(self) -> bool:
+        """
+        Checks that the shared browser of the pool is still running and logged in.
+        """
+        return self.browser.is_healthy()
+
+    def _close_bot(self, bot) -> None:
+        try:
+            bot.Close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """
+        Closes every idle tab, and the browser if the pool started it. Tabs still leased are closed when they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                bot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(bot, str):
+                self._close_bot(bot)
+        if self._own_browser:
+            self.browser.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,116 @@
+import queue, threading
+from time import time
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class VideoPipeline:
+    def __init__(self, bot, foldername="", queue_size=2, post_workers=1, share=True) -> None:
+        """
+        VideoPipeline overlaps the browser work of CanvaVideo with the post-processing of earlier videos.
+
+        The browser stage runs change_video_text and render_video (upload, background, export, download).
+        Each rendered video goes through a bounded queue to the post stage, which runs publish_video
+        (copy, Drive sync, move) and shares the uploaded file. While video N is uploading to Drive, the
+        browser already renders video N+1, so throughput approaches the slowest stage instead of the sum of all stages.
+
+        Args:
+        - bot: Logged-in CanvaVideo instance, only used by the browser stage.
+        - foldername: Name of the google drive folder. Without it videos stay in "tvideo" and are not shared.
+        - queue_size: Rendered videos waiting for the post stage before the browser stage blocks.
+        - post_workers: Number of post stage threads.
+        - share: Share every uploaded video with "anyone with the link" and return its link.
+
+        Example:
+        >>> pipeline = VideoPipeline(CanvaVideo(), "custom_folder")
+        >>> for result in pipeline.run([("Former Text", "video1.mp4"), ("Latter Text", "video2.mp4")]):
+        ...     print(result["index"], result["status"], result["link"])
+        """
+        self.bot = bot
+        self.foldername = foldername
+        self.queue_size = queue_size
+        self.post_workers = post_workers
+        self.share = share
+
+    def run(self, jobs):
+        """
+        Processes (text, video_path) pairs and yields a result for each job as soon as it finishes.
+
+        Every result is a dictionary with 'index' (position in 'jobs'), 'text', 'video', 'status'
+        ("ok" or "failed"), 'link' (Drive download link when shared), 'error' and 'timings'
+        ('render' and 'publish' in seconds).
+        """
+        rendered = queue.Queue(self.queue_size)
+        results = queue.Queue()
+
+        stages = [threading.Thread(target=self._browser_stage, args=(jobs, rendered, results), daemon=True)]
+        stages += [threading.Thread(target=self._post_stage, args=(rendered, results), daemon=True) for _ in range(self.post_workers)]
+        for stage in stages:
+            stage.start()
+
+        finished = 0
+        while finished < self.post_workers:
+            result = results.get()
+            if result is _DONE:
+                finished += 1
+            else:
+                yield result
+
+    def _browser_stage(self, jobs, rendered, results) -> None:
+        try:
+            for index, (text, video_path) in enumerate(jobs):
+                result = {"index": index, "text": text, "video": video_path, "status": "failed", "link": None, "error": None, "timings": {}}
+                started = time()
+                if not self.bot.change_video_text(text):
+                    result["error"] = "Failed to change the video text"
+                    results.put(result)
+                    continue
+
+                video = self.bot.render_video(video_path)
+                result["timings"]["render"] = round(time() - started, 3)
+                if not video:
+                    result["error"] = "Failed to render the video"
+                    results.put(result)
+                    continue
+
+                # Blocks while the post stage is 'queue_size' videos behind
+                rendered.put((result, video))
+        finally:
+            for _ in range(self.post_workers):
+                rendered.put(_DONE)
+
+    def _post_stage(self, rendered, results) -> None:
+        while True:
+            item = rendered.get()
+            if item is _DONE:
+                results.put(_DONE)
+                return
+
+            result, video = item
+            started = time()
+            try:
+                if not self.bot.publish_video(video["path"], video["caption"], self.foldername):
+                    result["error"] = "Failed to publish the video"
+                elif self.foldername and self.share:
+                    result["link"] = self._share(video["caption"])
+                    result["status"] = "ok"
+                else:
+                    result["status"] = "ok"
+            except Exception as e:
+                result["error"] = str(e)
+            result["timings"]["publish"] = round(time() - started, 3)
+            results.put(result)
+
+    def _share(self, caption_text):
+        """
+        Shares the uploaded video with "anyone with the link" and returns its download link.
+        """
+        import DriveUpload
+        link = DriveUpload.get_file_download_link(caption_text)
+        if not link:
+            raise RuntimeError("Uploaded video {}.mp4 not found on Drive".format(caption_text))
+        shared = DriveUpload.share_files_with_link([link["driveId"]])[link["driveId"]]
+        if "error" in shared:
+            raise RuntimeError(shared["error"])
+        return link["downloadUrl"]
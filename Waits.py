@@ -0,0 +1,243 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    ElementNotVisibleException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from DomQuery import query
+
+# Timeout in seconds of every named step, override per bot with CanvaBot(timeouts={...})
+DEFAULT_TIMEOUTS = {
+    "default": 30,      # anything without a more specific step
+    "page": 30,         # page loads and login windows
+    "element": 15,      # elements of an already loaded editor
+    "menu": 10,         # context menus and side panels opening
+    "settle": 3,        # best-effort waits for the UI to reflect typed input
+    "font": 1.5,        # caption height re-rendering after a font size change
+    "upload": 300,      # media upload finishing
+    "export": 300,      # Canva rendering an export
+    "download": 600,    # exported file arriving on disk
+    "download_start": 15,  # exported file appearing on disk when Canva offers its download link instead
+}
+
+
+class AdaptiveWait(WebDriverWait):
+    def __init__(self, driver, timeout, min_poll=0.05, max_poll=1.0, backoff=1.5, ignored_exceptions=None) -> None:
+        """
+        WebDriverWait polling quickly at first and backing off towards 'max_poll',
+        so fast UI reactions are noticed within milliseconds while long waits stay cheap.
+
+        The implicit wait of the driver is disabled while polling, otherwise every
+        failing lookup in a condition would block for the implicit wait.
+
+        Args:
+        - driver: Webdriver instance.
+        - timeout: Seconds to wait before raising TimeoutException.
+        - min_poll: First polling interval in seconds.
+        - max_poll: Longest polling interval in seconds.
+        - backoff: Factor the polling interval grows by after every unsuccessful poll.
+        - ignored_exceptions: Exceptions treated as "not ready yet".
+        """
+        ignored = (NoSuchElementException, StaleElementReferenceException, ElementNotVisibleException)
+        if ignored_exceptions:
+            ignored += tuple(ignored_exceptions)
+        super().__init__(driver, timeout, poll_frequency=min_poll, ignored_exceptions=ignored)
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+
+    def _wait_for(self, method, negate, message):
+        # Not named _poll, WebDriverWait keeps its poll frequency in that attribute
+        driver = self._driver
+        previous = None
+        try:
+            previous = driver.timeouts.implicit_wait
+            driver.implicitly_wait(0)
+        except Exception:
+            pass
+
+        try:
+            interval = self.min_poll
+            end_time = time.monotonic() + self._timeout
+            while True:
+                try:
+                    value = method(driver)
+                    if negate and not value:
+                        return True
+                    if not negate and value:
+                        return value
+                except self._ignored_exceptions:
+                    if negate:
+                        return True
+                if time.monotonic() > end_time:
+                    break
+                time.sleep(interval)
+                interval = min(interval * self.backoff, self.max_poll)
+            raise TimeoutException(message)
+        finally:
+            if previous:
+                driver.implicitly_wait(previous)
+
+    def until(self, method, message=""):
+        return self._wait_for(method, False, message)
+
+    def until_not(self, method, message=""):
+        return self._wait_for(method, True, message)
+
+    def settle(self, method):
+        """
+        Best-effort wait for UI that may not report readiness. Returns the condition value or False on timeout.
+        """
+        try:
+            return self.until(method)
+        except TimeoutException:
+            return False
+
+
+# Readiness conditions. Each returns a callable taking the driver, as used by WebDriverWait.until.
+
+def element_present(by, value):
+    """
+    Returns the first element matching the locator once it exists.
+    """
+    def condition(driver):
+        elements = driver.find_elements(by, value)
+        return elements[0] if elements else False
+    return condition
+
+
+def element_gone(by, value):
+    """
+    True once no element matches the locator.
+    """
+    return lambda driver: not driver.find_elements(by, value)
+
+
+def element_with_text(selector, *texts, last=False):
+    """
+    Returns the first (or last) element matching the CSS selector whose text is one of 'texts'.
+    """
+    return lambda driver: query(driver, selector, *texts, last=last) or False
+
+
+def button_with_label(label):
+    """
+    Returns the last button whose aria-label is 'label', the most recently opened toolbar wins.
+    """
+    return lambda driver: query(driver, 'button', attribute='aria-label', value=label, last=True) or False
+
+
+def menu_open(*items):
+    """
+    Returns the menu entry ('li') with one of the given texts once the menu is rendered.
+    """
+    return element_with_text('li', *items, last=True)
+
+
+# Messages of Google Sign-In for an unknown email and a wrong password
+SIGN_IN_REJECTED = ("Couldn't find your Google Account", "Wrong password")
+
+
+def sign_in_rejected(driver):
+    """
+    Returns the message Google Sign-In shows for rejected credentials, False while there is none.
+    """
+    for message in SIGN_IN_REJECTED:
+        if driver.find_elements(By.XPATH, '//*[contains(text(), "{}")]'.format(message)):
+            return message
+    return False
+
+
+def signed_in(driver):
+    """
+    True once the sign-in window has left accounts.google.com, or has been closed by Canva.
+    """
+    try:
+        return "accounts.google.com" not in driver.current_url
+    except NoSuchWindowException:
+        return True
+
+
+def upload_in_progress(driver):
+    """
+    True while Canva shows the upload progress indicator.
+    """
+    return bool(driver.find_elements(By.CLASS_NAME, '_7tmBZQ'))
+
+
+# Media listed in the Uploads panel, newest first
+UPLOAD_ITEM = '[draggable="true"] img'
+
+
+def upload_count(driver):
+    """
+    Returns the number of media items listed in the Uploads panel.
+    """
+    return len(driver.find_elements(By.CSS_SELECTOR, UPLOAD_ITEM))
+
+
+def uploads_loaded(quiet=0.5):
+    """
+    True once the Uploads panel shows no progress indicator and its item count has not changed for 'quiet' seconds.
+    A freshly opened panel adds the thumbnails of earlier uploads one by one while they load.
+    """
+    last = {"count": None, "since": None}
+
+    def condition(driver):
+        count = None if upload_in_progress(driver) else upload_count(driver)
+        now = time.monotonic()
+        if count is None or count != last["count"]:
+            last["count"], last["since"] = count, now
+            return False
+        return now - last["since"] >= quiet
+    return condition
+
+
+def upload_shown(before):
+    """
+    True once no upload progress indicator is left and the Uploads panel lists more items than 'before',
+    the number it listed before the upload started.
+    Unlike the progress indicator, which a small file may never show long enough to be seen, the new item always appears.
+    """
+    return lambda driver: not upload_in_progress(driver) and upload_count(driver) > before
+
+
+def export_dialog_rendered(driver):
+    """
+    Returns the submit button of the export dialog once it is rendered and enabled.
+    """
+    buttons = driver.find_elements(By.CSS_SELECTOR, 'button[type="submit"]')
+    if buttons and buttons[0].is_enabled():
+        return buttons[0]
+    return False
+
+
+def download_settings_rendered(driver):
+    """
+    Returns the 'File type' label of the download selection dialog once it is rendered.
+    """
+    return element_with_text('p', 'File type')(driver)
+
+
+def download_completed(panel_class):
+    """
+    True once the last paragraph of the export panel reads 'Completed'.
+    """
+    def condition(driver):
+        status = query(driver, '.{} p'.format(panel_class), last=True, prop='innerText')
+        return (status or '').strip() == 'Completed'
+    return condition
+
+
+def input_value_near(by, value, number, tolerance=1.0):
+    """
+    True once the input's value (e.g. "120 px") is within 'tolerance' of 'number'.
+    """
+    def condition(driver):
+        current = driver.find_element(by, value).get_attribute('value')
+        return abs(float(current.rstrip(" px")) - float(number)) <= tolerance
+    return condition
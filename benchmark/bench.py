@@ -0,0 +1,302 @@
+"""
+Offline benchmark of CanvaImage and CanvaVideo against the mock editor in benchmark/fixture.
+
+The fixture is served on a local port and opened as the design of headless bots. Login is skipped
+through CanvaBot's login_hook, so no canva.com access or Google account is needed. Every operation is
+measured for latency (p50/p95/p99), WebDriver commands and memory (JS heap of the page, plus the RSS of
+the browser processes when psutil is installed).
+
+Usage:
+    python benchmark/bench.py --kind all --iterations 5
+    python benchmark/bench.py --kind image --export 200 --budget change_photo=80 --json bench.json
+    python benchmark/bench.py --kind image --tabs 4
+"""
+import argparse, base64, functools, json, os, shutil, struct, sys, tempfile, threading
+from time import perf_counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, "benchmark", "fixture")
+sys.path.insert(0, ROOT)
+
+from CanvaBot import CanvaImage, CanvaVideo
+from CommandProfiler import CommandProfiler, CommandBudgetExceeded
+from Instrumentation import Tracer
+from TabPool import TabPool
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixture():
+    """
+    Serves the fixture directory on a free local port from a background thread.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=FIXTURE))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bypass_login(bot) -> None:
+    """
+    login_hook of the benchmark bots: nothing to log in to, only make room for the fixed click positions of the bot.
+    """
+    bot.driver.set_window_size(1366, 900)
+    bot.driver.execute_cdp_cmd("Performance.enable", {})
+
+
+def _box(kind, payload) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def write_sample_mp4(path, size=2 * 1024 * 1024, width=1080, height=1920, duration=10) -> str:
+    """
+    Writes an MP4 container (ftyp, moov with mvhd and tkhd, mdat) of about 'size' bytes. The media data is empty,
+    the mock editor only echoes the file back as the export.
+    """
+    matrix = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    mvhd = _box(b"mvhd", struct.pack(">I4I", 0, 0, 0, 1000, duration * 1000) + struct.pack(">IH10x", 0x00010000, 0x0100) + matrix + bytes(24) + struct.pack(">I", 2))
+    tkhd = _box(b"tkhd", struct.pack(">I5I8x4H", 3, 0, 0, 1, 0, duration * 1000, 0, 0, 0, 0) + matrix + struct.pack(">II", width << 16, height << 16))
+    header = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41") + _box(b"moov", mvhd + _box(b"trak", tkhd))
+
+    data = max(0, size - len(header) - 8)
+    with open(path, "wb") as file:
+        file.write(header + struct.pack(">I4s", 8 + data, b"mdat"))
+        chunk = bytes(1024 * 1024)
+        while data > 0:
+            file.write(chunk[:min(data, len(chunk))])
+            data -= len(chunk)
+    return path
+
+
+def write_sample_jpeg(driver, path, width=1080, height=1080) -> str:
+    """
+    Writes a JPEG rendered by the browser, so the benchmark needs no image library.
+    """
+    data_url = driver.execute_script("""
+        const canvas = document.createElement('canvas');
+        canvas.width = arguments[0];
+        canvas.height = arguments[1];
+        const context = canvas.getContext('2d');
+        context.fillStyle = '#3a7';
+        context.fillRect(0, 0, canvas.width, canvas.height);
+        return canvas.toDataURL('image/jpeg', 0.9);
+    """, width, height)
+    with open(path, "wb") as file:
+        file.write(base64.b64decode(data_url.split(",", 1)[1]))
+    return path
+
+
+def memory(bot) -> dict:
+    """
+    Returns the JS heap of the page and the RSS of the driver and browser processes in MB (None if unavailable).
+    """
+    sample = {"js_heap": None, "rss": None}
+    try:
+        metrics = bot.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        sample["js_heap"] = next(metric["value"] for metric in metrics if metric["name"] == "JSHeapUsedSize") / 2 ** 20
+    except Exception:
+        heap = bot.driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null;")
+        sample["js_heap"] = heap / 2 ** 20 if heap else None
+
+    if psutil is not None:
+        try:
+            process = psutil.Process(bot.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            sample["rss"] = sum(child.memory_info().rss for child in processes) / 2 ** 20
+        except Exception:
+            pass
+    return sample
+
+
+def run_operation(bot, samples, name, method, *args):
+    """
+    Runs one bot operation and samples the memory after it. Latency and commands are recorded by the bot's tracer.
+    """
+    result = method(*args)
+    samples.setdefault(name, []).append(memory(bot))
+    return result
+
+
+def bench_image(bot, iterations, media, samples, label="") -> bool:
+    for i in range(iterations):
+        if not run_operation(bot, samples, "change_text", bot.change_text, "Benchmark headline {}{}".format(i, label)):
+            return False
+        if run_operation(bot, samples, "change_photo", bot.change_photo, media)["imagelink"] is False:
+            return False
+        bot.reset(reload=True)
+    return True
+
+
+def bench_video(bot, iterations, media, samples, label="") -> bool:
+    for i in range(iterations):
+        if not run_operation(bot, samples, "change_video_text", bot.change_video_text, "Benchmark caption {}{}".format(i, label)):
+            return False
+        if not run_operation(bot, samples, "change_video", bot.change_video, media):
+            return False
+        bot.reset(reload=True)
+    return True
+
+
+def bench_variants(bot, iterations, media, samples, label="") -> bool:
+    variants = [("Benchmark variant {}{}".format(i, label), media) for i in range(iterations)]
+    results = run_operation(bot, samples, "render_variants", bot.render_variants, variants)
+    return all(result["imagelink"] is not False for result in results)
+
+
+def bench_tabs(pool, bench, iterations, media, samples) -> bool:
+    """
+    Runs 'bench' on every tab of the pool at once, each tab with its own design titles.
+    """
+    def run(bot, tab):
+        # Tabs are opened without the login hook
+        bypass_login(bot)
+        return bench(bot, iterations, media, samples, label=" tab {}".format(tab))
+
+    passed = True
+    for tab, result, error in pool.map(run, range(pool.size)):
+        if error is not None:
+            print("Tab {}: {}".format(tab, error))
+        passed = passed and bool(result) and error is None
+    return passed
+
+
+def summarize(tracer, profiler, samples) -> dict:
+    """
+    Combines latency histograms, command counts and memory samples per span.
+    """
+    operations = profiler.operations()
+    summary = {}
+    for name, histogram in sorted(tracer.histograms().items()):
+        row = dict(histogram)
+        if name in operations:
+            row["commands_max"] = operations[name]["max_commands"]
+        for key in ("js_heap", "rss"):
+            values = [sample[key] for sample in samples.get(name, []) if sample[key] is not None]
+            row[key + "_max"] = max(values) if values else None
+        summary[name] = row
+    return summary
+
+
+def print_summary(summary) -> None:
+    def number(value, pattern):
+        return pattern.format(value) if value is not None else "-"
+
+    print("{:<32} {:>5} {:>6} {:>8} {:>8} {:>8} {:>9} {:>9} {:>9}".format(
+        "span", "count", "failed", "p50 s", "p95 s", "p99 s", "cmds/call", "heap MB", "rss MB"))
+    for name, row in summary.items():
+        print("{:<32} {:>5} {:>6} {:>8.3f} {:>8.3f} {:>8.3f} {:>9.1f} {:>9} {:>9}".format(
+            name, row["count"], row["failed"] + row["error"], row["p50"], row["p95"], row["p99"], row["commands_mean"],
+            number(row["js_heap_max"], "{:.1f}"), number(row["rss_max"], "{:.0f}")))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the bots against a local mock Canva editor.")
+    parser.add_argument("--kind", choices=("image", "variants", "video", "all"), default="all", help="flows to run")
+    parser.add_argument("--iterations", type=int, default=3, help="runs of every flow")
+    parser.add_argument("--upload", type=int, default=300, help="simulated upload time in ms (plus size / bandwidth)")
+    parser.add_argument("--bandwidth", type=float, default=50, help="simulated upload bandwidth in MB/s")
+    parser.add_argument("--export", type=int, default=1000, help="simulated export time in ms")
+    parser.add_argument("--render", type=int, default=50, help="simulated re-render delay after a font size change in ms")
+    parser.add_argument("--video-mb", type=float, default=2, help="size of the sample video in MB")
+    parser.add_argument("--tabs", type=int, default=1, help="run the flows on this many tabs of one browser at once")
+    parser.add_argument("--budget", action="append", default=[], metavar="OPERATION=COMMANDS", help="fail if a call of OPERATION sends more WebDriver commands")
+    parser.add_argument("--json", help="write the summary and the hottest call sites to this file")
+    parser.add_argument("--profile", action="store_true", help="print the ranked WebDriver call sites")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--keep", action="store_true", help="keep the working directory with the downloads")
+    args = parser.parse_args()
+
+    tracer = Tracer()
+    profiler = CommandProfiler()
+    for budget in args.budget:
+        operation, commands = budget.split("=")
+        profiler.set_budget(operation, int(commands))
+
+    server = serve_fixture()
+    query = "upload={}&bandwidth={}&export={}&render={}".format(args.upload, args.bandwidth, args.export, args.render)
+    base_url = "http://127.0.0.1:{}/editor.html?{}".format(server.server_address[1], query)
+
+    # Downloads, "tvideo" and error screenshots stay out of the repository
+    workdir = tempfile.mkdtemp(prefix="canvabot-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    os.makedirs("tvideo")
+
+    samples = {}
+    passed = True
+    try:
+        flows = [("image", CanvaImage, bench_image), ("variants", CanvaImage, bench_variants), ("video", CanvaVideo, bench_video)]
+        for kind, bot_class, bench in flows:
+            if args.kind not in (kind, "all"):
+                continue
+            design_url = "{}&kind={}".format(base_url, "video" if kind == "video" else "image")
+            if args.tabs > 1:
+                # One design per tab, the tab parameter only makes the URLs distinct
+                pool = TabPool(bot_class, ["{}&tab={}".format(design_url, tab) for tab in range(args.tabs)],
+                               headless=not args.headed, session_file=None, tracer=tracer, login_hook=bypass_login)
+                bot = pool.browser.bot
+            else:
+                pool = None
+                bot = bot_class(headless=not args.headed, session_file=None, tracer=tracer,
+                                login_hook=bypass_login, design_url=design_url)
+            try:
+                if kind != "video":
+                    media = write_sample_jpeg(bot.driver, os.path.join(workdir, "sample.jpg"))
+                else:
+                    media = write_sample_mp4(os.path.join(workdir, "sample.mp4"), int(args.video_mb * 2 ** 20))
+                profiler.attach(bot)
+                started = perf_counter()
+                if pool is not None:
+                    flow_passed = bench_tabs(pool, bench, args.iterations, media, samples)
+                else:
+                    flow_passed = bench(bot, args.iterations, media, samples)
+                print("{} flow: {} iterations on {} tab(s) in {:.1f} s".format(kind, args.iterations * args.tabs, args.tabs, perf_counter() - started))
+                if not flow_passed:
+                    print("{} flow failed, see {}".format(kind, os.path.join(workdir, "error.png")))
+                    passed = False
+            finally:
+                # The next flow attaches the profiler to its own bot, on the same tracer
+                profiler.detach()
+                try:
+                    if pool is not None:
+                        pool.close()
+                    else:
+                        bot.Close()
+                except Exception:
+                    pass
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    summary = summarize(tracer, profiler, samples)
+    print_summary(summary)
+    if args.profile:
+        print()
+        print(profiler.report(top=15))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"summary": summary, "hottest": profiler.hottest(15)}, file, indent=2)
+
+    try:
+        profiler.assert_budgets()
+    except CommandBudgetExceeded as e:
+        print(e)
+        passed = False
+
+    if args.keep or not passed:
+        print("Working directory: {}".format(workdir))
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
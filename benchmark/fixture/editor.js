@@ -0,0 +1,192 @@
+// Behaviour of the mock editor. Latencies are read from the query string:
+//   kind=image|video  which design the page plays
+//   upload=ms         fixed upload time, plus size / bandwidth
+//   bandwidth=MB/s    upload bandwidth
+//   export=ms         time Canva takes to render an export
+//   render=ms         delay before the position panel reflects a font size change
+const params = new URLSearchParams(location.search);
+const config = {
+    kind: params.get('kind') || 'image',
+    upload: Number(params.get('upload') || 300),
+    bandwidth: Number(params.get('bandwidth') || 50),
+    exportTime: Number(params.get('export') || 1000),
+    render: Number(params.get('render') || 50),
+};
+
+let uploaded = null;
+let dragging = false;
+let placed = false;
+let selectedText = null;
+// File type kept by 'Save download settings'
+let savedFileType = null;
+
+function open(templateId) {
+    const element = document.getElementById(templateId).content.firstElementChild.cloneNode(true);
+    const existing = document.getElementById(element.id);
+    if (existing) existing.remove();
+    document.body.appendChild(element);
+    return element;
+}
+
+function close(id) {
+    const element = document.getElementById(id);
+    if (element) element.remove();
+}
+
+function later(ms, callback) {
+    setTimeout(callback, ms);
+}
+
+function download(blob, name) {
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(blob);
+    link.download = name;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    return link.href;
+}
+
+// Design text and video caption ------------------------------------------------------------------
+
+document.querySelector('.design-text').addEventListener('dblclick', () => { selectedText = document.querySelector('.design-text'); });
+document.querySelector('.pTC3Qw span').addEventListener('dblclick', () => { selectedText = document.querySelector('.pTC3Qw span'); });
+
+function selectedHeight() {
+    const element = selectedText || document.querySelector(config.kind === 'video' ? '.pTC3Qw span' : '.design-text');
+    return element.getBoundingClientRect().height;
+}
+
+function openPosition() {
+    const panel = open('position-panel');
+    panel.querySelector('#height').value = selectedHeight().toFixed(1) + ' px';
+    panel.querySelector('#font-size').addEventListener('keydown', (event) => {
+        if (event.key !== 'Enter') return;
+        const caption = document.querySelector('.pTC3Qw span');
+        caption.style.fontSize = Number(event.target.value) + 'px';
+        // Canva re-renders the element before the panel shows the new height
+        later(config.render, () => { panel.querySelector('#height').value = caption.getBoundingClientRect().height.toFixed(1) + ' px'; });
+    });
+    panel.querySelector('#pos-y').addEventListener('keydown', (event) => {
+        if (event.key !== 'Enter') return;
+        const y = parseFloat(event.target.value);
+        later(config.render, () => { event.target.value = y + ' px'; });
+    });
+}
+
+document.getElementById('image-position').addEventListener('click', openPosition);
+document.getElementById('video-position').addEventListener('click', openPosition);
+
+// Uploads -------------------------------------------------------------------------------------------
+
+document.querySelectorAll('.Ve4yyQ').forEach((tab) => tab.addEventListener('click', () => {
+    if (tab.innerText.trim() === 'Uploads') document.getElementById('side-panel').classList.add('open');
+}));
+
+document.querySelector('.bpyLaw').addEventListener('change', (event) => {
+    const file = event.target.files[0];
+    if (!file) return;
+    const progress = document.createElement('div');
+    progress.className = '_7tmBZQ';
+    document.getElementById('side-panel').appendChild(progress);
+
+    later(config.upload + file.size / (config.bandwidth * 1024 * 1024) * 1000, () => {
+        progress.remove();
+        uploaded = file;
+        const thumbnail = document.createElement('div');
+        thumbnail.className = 'upload-thumbnail';
+        // Listed like a Canva upload: a draggable item holding the media thumbnail
+        thumbnail.draggable = true;
+        thumbnail.appendChild(document.createElement('img'));
+        // Where CanvaImage drags the image from and CanvaVideo clicks the video
+        thumbnail.style.top = (config.kind === 'video' ? 223 : 417) + 'px';
+        document.getElementById('side-panel').appendChild(thumbnail);
+    });
+});
+
+// Placing is tracked with pointer events, a native drag would swallow the pointerup
+document.addEventListener('dragstart', (event) => event.preventDefault());
+
+document.addEventListener('pointerdown', (event) => {
+    dragging = Boolean(event.target.closest('.upload-thumbnail'));
+});
+
+document.addEventListener('pointerup', (event) => {
+    const target = document.elementFromPoint(event.clientX, event.clientY);
+    if (dragging && target && target.closest('.Zp7NQw')) placed = true;
+    dragging = false;
+});
+
+// Menus and exports ---------------------------------------------------------------------------------
+
+document.getElementById('more').addEventListener('click', () => {
+    const menu = open(config.kind === 'video' ? 'video-menu' : 'image-menu');
+    menu.querySelector('button').addEventListener('click', () => {
+        close('menu');
+        if (config.kind === 'video') {
+            document.getElementById('page').style.background = '#222';
+        } else {
+            openDownloadSelection();
+        }
+    });
+});
+
+function openDownloadSelection() {
+    const panel = open('download-selection');
+    const fileType = panel.querySelector('p');
+    fileType.addEventListener('click', () => {
+        const types = open('file-types');
+        types.querySelectorAll('div').forEach((option) => option.addEventListener('click', () => {
+            fileType.parentElement.querySelector(':scope > div > div').innerText = option.innerText;
+            types.remove();
+        }));
+    });
+    const checkbox = panel.querySelector('.mq8XRA span');
+    checkbox.addEventListener('click', () => { checkbox.className = 'checkbox box checked on'; });
+    if (savedFileType) {
+        fileType.parentElement.querySelector(':scope > div > div').innerText = savedFileType;
+        checkbox.className = 'checkbox box checked on';
+    }
+    panel.querySelector('#download-selection-submit').addEventListener('click', () => {
+        if (checkbox.classList.contains('checked')) savedFileType = fileType.parentElement.querySelector(':scope > div > div').innerText;
+        exportImage(panel);
+    });
+}
+
+function exportImage(panel) {
+    const status = document.createElement('div');
+    status.className = 'ahXO_w';
+    status.innerHTML = '<p>Downloading</p><p>Preparing your design</p>';
+    panel.appendChild(status);
+
+    later(config.exportTime, () => {
+        const canvas = document.createElement('canvas');
+        canvas.width = 1080;
+        canvas.height = 1080;
+        const context = canvas.getContext('2d');
+        context.fillStyle = placed ? '#446' : '#ccc';
+        context.fillRect(0, 0, canvas.width, canvas.height);
+        context.fillStyle = 'white';
+        context.font = '48px sans-serif';
+        context.fillText(document.querySelector('.design-text').innerText, 40, 80);
+        canvas.toBlob((blob) => {
+            // Named after the design title like Canva names downloads
+            const href = download(blob, document.querySelector('.YjmJuQ').innerText.trim() + '.jpg');
+            status.insertAdjacentHTML('beforeend', '<span>If your download hasn\'t started, <a>click here</a></span><p>Completed</p>');
+            status.querySelector('a').href = href;
+        }, 'image/jpeg', 0.9);
+    });
+}
+
+document.getElementById('share').addEventListener('click', () => {
+    const panel = open('share-panel');
+    panel.querySelector('button').addEventListener('click', () => {
+        close('share-panel');
+        const dialog = open('export-dialog');
+        dialog.querySelector('button').addEventListener('click', () => {
+            dialog.remove();
+            // The export is the uploaded video, renamed like Canva names downloads
+            later(config.exportTime, () => download(uploaded, document.querySelector('.YjmJuQ').innerText.trim() + '.mp4'));
+        });
+    });
+});
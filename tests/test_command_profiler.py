@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from CommandProfiler import CommandBudgetExceeded, CommandProfiler
+from Instrumentation import Tracer
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.sent = []
+
+    def execute(self, driver_command, params=None):
+        self.sent.append(driver_command)
+        return {"value": None}
+
+
+def make_bot():
+    return SimpleNamespace(driver=FakeDriver(), tracer=Tracer())
+
+
+def run(bot, operation, commands):
+    with bot.tracer.span(operation):
+        for _ in range(commands):
+            bot.driver.execute("findElement")
+
+
+def test_budget_passes():
+    bot = make_bot()
+    profiler = CommandProfiler(budgets={"change_text": 3})
+    profiler.attach(bot)
+
+    run(bot, "change_text", 3)
+
+    profiler.assert_budgets()
+    profiler.assert_budget("change_text", max_commands=3)
+    assert profiler.operations()["change_text"]["max_commands"] == 3
+    assert len(bot.driver.sent) == 3
+
+
+def test_budget_fails():
+    bot = make_bot()
+    profiler = CommandProfiler(budgets={"change_text": 3})
+    profiler.attach(bot)
+
+    run(bot, "change_text", 2)
+    run(bot, "change_text", 5)
+
+    with pytest.raises(CommandBudgetExceeded, match="change_text sent 5 WebDriver commands, budget is 3"):
+        profiler.assert_budgets()
+    with pytest.raises(CommandBudgetExceeded):
+        profiler.assert_budget("change_text", max_commands=4)
+    with pytest.raises(CommandBudgetExceeded, match="never called"):
+        profiler.assert_budget("change_photo", max_commands=80)
+
+
+def test_detach_restores_driver_and_tracer():
+    bot = make_bot()
+    execute = bot.driver.execute
+    profiler = CommandProfiler(budgets={"change_text": 1})
+    profiler.attach(bot)
+    run(bot, "change_text", 1)
+    profiler.detach()
+
+    run(bot, "change_text", 5)
+
+    assert bot.driver.execute == execute
+    assert bot.tracer._listeners == []
+    assert profiler.operations()["change_text"]["calls"] == 1
+    profiler.assert_budgets()
+
+    # A detached profiler can follow another bot on the same tracer
+    other = SimpleNamespace(driver=FakeDriver(), tracer=bot.tracer)
+    profiler.attach(other)
+    run(other, "change_text", 1)
+    assert profiler.operations()["change_text"]["calls"] == 2
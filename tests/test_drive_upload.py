@@ -0,0 +1,133 @@
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import DriveUpload
+
+
+class FakeDrive(ThreadingHTTPServer):
+    """
+    Minimal Drive v3 resumable upload endpoint. The first request of every upload session can be answered
+    with 'fail_status', and the number of uploads running at once is tracked.
+    """
+
+    def __init__(self, fail_status=None, delay=0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fail_status = fail_status
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.failed = set()
+        self.files = {}
+        self.statuses = []
+        self.active = self.max_active = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        # Starts an upload session for the metadata in the body
+        metadata = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        session = "/session/{}".format(metadata["name"])
+        self.send_response(200)
+        self.send_header("Location", "http://127.0.0.1:{}{}".format(self.server.server_address[1], session))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self) -> None:
+        server = self.server
+        name = self.path.rsplit("/", 1)[-1]
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Range", "").startswith("bytes */"):
+            # Status query after a failed chunk: nothing has been received
+            return self._reply(308, None)
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            fail = server.fail_status is not None and name not in server.failed
+            server.failed.add(name)
+        try:
+            threading.Event().wait(server.delay)
+            if fail:
+                reason = "userRateLimitExceeded" if server.fail_status == 403 else "backendError"
+                return self._reply(server.fail_status, {"error": {"code": server.fail_status, "message": "try again", "errors": [{"reason": reason}]}})
+            with server.lock:
+                server.files[name] = body
+            self._reply(200, {"id": "id-" + name})
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, code, body) -> None:
+        self.server.statuses.append(code)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = FakeDrive(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(DriveUpload, "API_ENDPOINT", "http://127.0.0.1:{}/drive/v3/".format(server.server_address[1]))
+        monkeypatch.setattr(DriveUpload, "SERVICE_ACCOUNT_FILE", None)
+        # Retries back off without waiting, and every thread builds a client for this server
+        monkeypatch.setattr(DriveUpload, "sleep", lambda seconds: None)
+        monkeypatch.setattr(DriveUpload, "_local", threading.local())
+        DriveUpload.invalidate_file_id()
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def write_files(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / "video{}.mp4".format(index)
+        path.write_bytes(b"x" * (1000 + index))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("status", [503, 429, 403])
+def test_upload_file_retries(drive, tmp_path, status):
+    server = drive(fail_status=status)
+    path, = write_files(tmp_path, 1)
+
+    assert DriveUpload.upload_file(path, "folder", progress=None) == "id-video0.mp4"
+    assert server.statuses == [status, 308, 200]
+    assert server.files["video0.mp4"] == b"x" * 1000
+    assert DriveUpload.find_file_id("video0.mp4", "folder") == "id-video0.mp4"
+
+
+def test_upload_file_gives_up(drive, tmp_path):
+    server = drive(fail_status=404)
+    path, = write_files(tmp_path, 1)
+
+    with pytest.raises(HttpError):
+        DriveUpload.upload_file(path, "folder", progress=None)
+    assert server.statuses == [404]
+
+
+def test_upload_files_in_parallel(drive, tmp_path):
+    server = drive(fail_status=503, delay=0.2)
+    paths = write_files(tmp_path, 4)
+
+    ids = DriveUpload.upload_files(paths, "folder", max_workers=4, progress=None)
+
+    assert ids == {"video{}.mp4".format(index): "id-video{}.mp4".format(index) for index in range(4)}
+    assert sorted(server.files) == sorted(ids)
+    assert server.max_active > 1